@@ -1,21 +1,53 @@
 import asyncio
 import json
+import os
 import platform
+import uuid
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from src.models.gemini_llm import GeminiAgent
+from src.models.gemini_llm import (
+    MODEL_NAME,
+    GeminiAgent,
+    gemini_breaker,
+    hedger,
+    parse_stats,
+)
 from src.models.sentiment import SentimentAnalyzer
 from src.models.toxicity import ToxicityAnalyzer
+from src.utils.logger import get_logger, request_id_var
+from src.utils.admission import AdmissionController, AdmissionTicket, Overloaded
+from src.utils.article_compaction import compaction_status
+from src.utils.deadlines import parse_budget, start_deadline
+from src.utils.delta_store import UNSETTLED_VERDICTS, DeltaScanStore, text_hash
+from src.utils.fingerprint_store import (
+    FingerprintStore,
+    matching_etag,
+    scan_fingerprint,
+)
+from src.utils.serialization import dumps, prefers_media_type
+from src.utils.scheduling import gemini_slots, parse_priority, priority_var
+from src.utils.tracing import add_timing, stage, start_trace
+
+logger = get_logger("api")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spawn the regex process pool before the first large scan, not inside it
+    await asyncio.to_thread(toxicity_engine.warm_parallel_pool)
+    yield
 
-app = FastAPI(title="VnContentGuard Pro API", version="2.1")
+
+app = FastAPI(title="VnContentGuard Pro API", version="2.1", lifespan=lifespan)
 
 # Enable CORS for Chrome Extension
 app.add_middleware(
@@ -24,30 +56,95 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "ETag"],
 )
 
-print("⏳ Booting up AI Engine...")
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    """Tag every log record of a request with its X-Request-ID."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+logger.info("Booting up AI engine")
 try:
     toxicity_engine = ToxicityAnalyzer()
     gemini_agent = GeminiAgent()
     sentiment_engine = SentimentAnalyzer()
-    print("✅ AI Server Ready!")
-except Exception as e:
-    print(f"❌ Error during initialization: {e}")
+    delta_store = DeltaScanStore()
+    admission = AdmissionController()
+    scan_fingerprints = FingerprintStore()
+    logger.info("AI server ready")
+except Exception:
+    logger.exception("Error during initialization")
     raise
 
+# Part of every scan ETag: a new release, model or blacklist changes results
+ENGINE_FINGERPRINT = scan_fingerprint(
+    app.version,
+    MODEL_NAME,
+    [compiled.pattern for compiled, _ in toxicity_engine.compiled_patterns],
+)
+
+
+def engine_fingerprint() -> str:
+    """
+    ENGINE_FINGERPRINT plus the tables that are reloaded at runtime.
+
+    A refreshed domain reputation table or a re-compacted verdict store can
+    change results for the same request, so they invalidate cached ETags.
+    """
+    store = toxicity_engine.verdict_store
+    return scan_fingerprint(
+        ENGINE_FINGERPRINT,
+        gemini_agent.reputation.version,
+        store.version if store is not None else None,
+    )
+
 
 # ============================================================================
 # Request/Response Models
 # ============================================================================
 
+# Input caps: too many comments is rejected (422), oversized text is truncated
+MAX_COMMENTS = int(os.getenv("SCAN_MAX_COMMENTS", "5000"))
+MAX_KNOWN_HASHES = int(os.getenv("SCAN_MAX_KNOWN_HASHES", "50000"))
+MAX_COMMENT_CHARS = int(os.getenv("SCAN_MAX_COMMENT_CHARS", "10000"))
+MAX_ARTICLE_CHARS = int(os.getenv("SCAN_MAX_ARTICLE_CHARS", "100000"))
+
 
 class ScanRequest(BaseModel):
     """Request model for full content scan from Chrome Extension."""
 
     url: str  # Source URL (Facebook, news site, etc.)
     article_text: str  # Main article/post text
-    comments: List[str] = []  # List of comments to analyze
+    comments: List[str] = Field(
+        default=[], max_length=MAX_COMMENTS
+    )  # Comments to analyze
+
+    # Delta scans: set article_hash to opt in. Comments whose hashes are listed
+    # in known_comment_hashes need not be re-sent; their stored verdicts are
+    # merged into the totals. Hashes are 16 hex chars of SHA-256(text), taken
+    # after the text is cut to MAX_COMMENT_CHARS / MAX_ARTICLE_CHARS code points.
+    article_hash: Optional[str] = None
+    known_comment_hashes: List[str] = Field(default=[], max_length=MAX_KNOWN_HASHES)
+
+    @field_validator("article_text")
+    @classmethod
+    def _cap_article(cls, value: str) -> str:
+        return value[:MAX_ARTICLE_CHARS]
+
+    @field_validator("comments")
+    @classmethod
+    def _cap_comments(cls, value: List[str]) -> List[str]:
+        return [c[:MAX_COMMENT_CHARS] for c in value]
 
 
 class ToxicityResult(BaseModel):
@@ -67,6 +164,46 @@ class FullScanResponse(BaseModel):
     toxicity: dict  # From Toxicity Analyzer
 
 
+# Clients opt into the compact format by listing this media type in their
+# Accept header (with q > 0, ranked at least as high as application/json)
+COMPACT_MEDIA_TYPE = "application/vnd.vncontentguard.compact+json"
+
+
+def compact_toxicity(toxicity: dict) -> dict:
+    """
+    Shrink a toxicity block for clients that already hold the comment text.
+
+    Clean comments are dropped and each flagged comment becomes
+    [index, category_code, confidence], where index is the comment's position
+    in the request and category_code indexes into "categories". "incomplete"
+    (indices of comments without a final verdict) is kept as is.
+    """
+    categories = []
+    codes = {}
+    flagged = []
+
+    for item in toxicity["results"]:
+        if not item["Is Toxic"]:
+            continue
+        category = item["Category"]
+        if category not in codes:
+            codes[category] = len(categories)
+            categories.append(category)
+        flagged.append([item["Index"], codes[category], round(item["Confidence"], 3)])
+
+    compacted = {
+        "total": toxicity["total"],
+        "toxic_count": toxicity["toxic_count"],
+        "categories": categories,
+        "flagged": flagged,
+    }
+    if "incomplete" in toxicity:
+        compacted["incomplete"] = toxicity["incomplete"]
+    if "delta" in toxicity:
+        compacted["delta"] = toxicity["delta"]
+    return compacted
+
+
 # ============================================================================
 # Health Check Endpoint
 # ============================================================================
@@ -75,7 +212,32 @@ class FullScanResponse(BaseModel):
 @app.get("/health")
 def health_check():
     """Check if the server is running."""
-    return {"status": "🟢 VnContentGuard Pro Server is Running"}
+    return {
+        "status": "🟢 VnContentGuard Pro Server is Running",
+        "admission": admission.get_status(),
+        "gemini_scheduler": gemini_slots.get_status(),
+        "domain_reputation": gemini_agent.reputation.get_status(),
+        "gemini_parse": parse_stats(),
+        "gemini_breaker": gemini_breaker.get_status(),
+        "gemini_hedging": hedger.get_status(),
+        "article_compaction": compaction_status(),
+        "scan_etags": scan_fingerprints.get_status(),
+        "verdict_store": (
+            toxicity_engine.verdict_store.get_status()
+            if toxicity_engine.verdict_store is not None
+            else None
+        ),
+        "toxicity_batching": (
+            toxicity_engine.batcher.get_status()
+            if toxicity_engine.batcher is not None
+            else None
+        ),
+        "trivial_prefilter": (
+            toxicity_engine.trivial_filter.get_status()
+            if toxicity_engine.trivial_filter is not None
+            else None
+        ),
+    }
 
 
 # ============================================================================
@@ -83,22 +245,159 @@ def health_check():
 # ============================================================================
 
 
+def scan_etag(req: ScanRequest, request: Request, debug: bool = False):
+    """
+    Strong ETag of a full scan request, or None when it is not cacheable.
+
+    Answers If-None-Match with a 304 (before admission, so an unchanged page
+    costs no analysis) when the fingerprint is known from a settled scan.
+    Debug responses carry per-request traces and are never cached.
+    """
+    if debug or not scan_fingerprints.enabled:
+        return None
+    compact = prefers_media_type(request.headers.get("accept"), COMPACT_MEDIA_TYPE)
+    etag = '"%s"' % scan_fingerprint(
+        engine_fingerprint(),
+        "compact" if compact else "full",
+        req.url,
+        req.article_text,
+        req.article_hash,
+        req.comments,
+        req.known_comment_hashes,
+    )
+    if matching_etag(
+        request.headers.get("If-None-Match"), etag
+    ) and scan_fingerprints.contains(etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+    return etag
+
+
+async def admit_scan(request: Request, etag: Optional[str] = Depends(scan_etag)):
+    """
+    Admission control for full scans.
+
+    Waits on the event loop for an in-flight slot; sheds the request with a
+    503 and Retry-After when the server is over capacity. The X-Scan-Priority
+    header ("interactive", the default, or "bulk") selects the queue class.
+    Depends on scan_etag so a request answered with 304 never takes a slot.
+    """
+    priority = parse_priority(request.headers.get("X-Scan-Priority"))
+    try:
+        ticket = await admission.acquire(priority)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        yield ticket
+    finally:
+        admission.release(ticket)
+
+
 @app.post("/analyze/full_scan", response_model=dict)
-def analyze_content(req: ScanRequest):
+def analyze_content(
+    req: ScanRequest,
+    request: Request,
+    response: Response,
+    debug: bool = False,
+    ticket: AdmissionTicket = Depends(admit_scan),
+    etag: Optional[str] = Depends(scan_etag),
+):
     """
     Full content scan endpoint.
 
     Accepts raw text scraped by Chrome Extension (NOT URLs).
     Returns comprehensive analysis with fake news, sentiment, and toxicity scores.
+    Every response carries a Server-Timing header with per-stage durations.
+
+    Sending `Accept: application/vnd.vncontentguard.compact+json` switches to
+    the compact format: toxicity results are reduced to flagged comment
+    indices with category codes (see compact_toxicity), without comment text.
+
+    Under overload the scan may run degraded (regex and sentiment only, no
+    Gemini calls); such responses carry "degraded": true.
+
+    Gemini calls share one time budget (SCAN_BUDGET_MS, or the client's
+    X-Scan-Budget-Ms header) that includes the time spent queued.
+
+    Non-debug responses carry a strong ETag over the request content; a
+    re-scan sending it in If-None-Match gets 304 Not Modified when the last
+    scan of that content was settled (not degraded, article verdict final,
+    every comment verdict final).
+
+    Comments whose Gemini check failed or was skipped keep their regex
+    verdict and are listed by index in toxicity["incomplete"].
 
     Args:
         req: ScanRequest with url, article_text, and comments
+        debug: Add a nested "trace" breakdown (Gemini attempts, keys, fallbacks)
 
     Returns:
         dict: Analysis results with fake_check, sentiment, and toxicity
     """
-    print(f"📥 Received Scan Request for: {req.url}")
+    compact = prefers_media_type(request.headers.get("accept"), COMPACT_MEDIA_TYPE)
+
+    priority_var.set(ticket.priority)
+    start_deadline(
+        parse_budget(request.headers.get("X-Scan-Budget-Ms")),
+        spent=ticket.queued_seconds,
+    )
+    with start_trace(debug=debug) as trace:
+        add_timing("queue", ticket.queued_seconds)
+        result = _run_full_scan(req, degraded=ticket.degraded)
+        headers = {"Vary": "Accept"}
+        if etag is not None:
+            headers["ETag"] = etag
+            if (
+                not result.get("degraded")
+                and result["fake_check"].get("verdict") not in UNSETTLED_VERDICTS
+                and not result["toxicity"].get("incomplete")
+            ):
+                scan_fingerprints.add(etag)
+        if compact:
+            with stage("serialize"):
+                result["toxicity"] = compact_toxicity(result["toxicity"])
+                if debug:
+                    result["trace"] = trace.to_dict()
+                body = dumps(result)
+            # Rendered last so the serialize stage is in it
+            headers["Server-Timing"] = trace.server_timing_header()
+            return Response(
+                content=body, media_type=COMPACT_MEDIA_TYPE, headers=headers
+            )
+
+        headers["Server-Timing"] = trace.server_timing_header()
+        response.headers.update(headers)
+        if debug:
+            result["trace"] = trace.to_dict()
+    return result
+
+
+def _run_full_scan(req: ScanRequest, degraded: bool = False) -> dict:
+    """
+    Run the fake news, sentiment and toxicity stages for one request.
+    Degraded scans skip every Gemini call.
+    """
+    logger.debug("Received scan request", extra={"url": req.url})
     try:
+        # ========== 0. DELTA SESSION ==========
+        article_key = None
+        session = None
+        if req.article_hash is not None:
+            # The article text wins over the client hash, so an edited article
+            # starts a new session; clients may omit unchanged article text
+            article_key = (
+                text_hash(req.article_text) if req.article_text else req.article_hash
+            )
+            session = delta_store.get(article_key)
+
+        reuse_article = (
+            session is not None
+            and session["fake_check"].get("verdict") not in UNSETTLED_VERDICTS
+        )
+
         # ========== 1. FAKE NEWS CHECK ==========
         fake_data = {
             "risk_score": 0,
@@ -106,10 +405,21 @@ def analyze_content(req: ScanRequest):
             "summary": "No text content found.",
         }
 
-        if len(req.article_text) > 20:  # Lowered threshold
+        if reuse_article:
+            fake_data = session["fake_check"]
+        elif degraded:
+            fake_data = {
+                "risk_score": 0,
+                "verdict": "Skipped",
+                "summary": "Server is busy; fake news check was skipped.",
+            }
+        elif len(req.article_text) > 20:  # Lowered threshold
             try:
-                fake_json = gemini_agent.check_fake_news(req.article_text)
-                fake_data = json.loads(fake_json)
+                with stage("fake_check"):
+                    fake_json = gemini_agent.check_fake_news(
+                        req.article_text, url=req.url
+                    )
+                    fake_data = json.loads(fake_json)
             except json.JSONDecodeError:
                 fake_data = {
                     "risk_score": 0,
@@ -118,7 +428,7 @@ def analyze_content(req: ScanRequest):
                 }
             except Exception as e:
                 error_msg = str(e).lower()
-                print(f"⚠️  Fake news check failed: {e}")
+                logger.warning("Fake news check failed", extra={"error": str(e)})
                 # Handle quota errors gracefully
                 if "429" in str(e) or "quota" in error_msg or "exceeded" in error_msg:
                     fake_data = {
@@ -133,8 +443,9 @@ def analyze_content(req: ScanRequest):
                         "summary": "AI service is temporarily unavailable.",
                     }
         else:
-            print(
-                f"⚠️  Article too short ({len(req.article_text)} chars) for fake news check"
+            logger.debug(
+                "Article too short for fake news check",
+                extra={"chars": len(req.article_text)},
             )
             fake_data = {
                 "risk_score": 0,
@@ -145,62 +456,174 @@ def analyze_content(req: ScanRequest):
         # ========== 2. SENTIMENT ANALYSIS ==========
         sentiment = {"label": "Neutral", "score": 0.0}
 
-        if len(req.article_text) > 5:  # Lowered threshold
+        if reuse_article:
+            sentiment = session["sentiment"]
+        elif len(req.article_text) > 5:  # Lowered threshold
             try:
-                sentiment = sentiment_engine.analyze(req.article_text[:512])
+                with stage("sentiment"):
+                    sentiment = sentiment_engine.analyze(req.article_text[:512])
             except Exception as e:
-                print(f"⚠️  Sentiment analysis failed: {e}")
+                logger.warning("Sentiment analysis failed", extra={"error": str(e)})
                 sentiment = {"label": "Neutral", "score": 0.0}
         else:
-            print(f"⚠️  Article too short for sentiment ({len(req.article_text)} chars)")
+            logger.debug(
+                "Article too short for sentiment",
+                extra={"chars": len(req.article_text)},
+            )
             sentiment = {"label": "Neutral", "score": 0.0}
 
         # Toxicity check - accept empty comments list gracefully
         toxic_results = []
         toxic_count = 0
+        total = len(req.comments)
+        delta_info = None
+        toxicity_failed = False
 
-        if req.comments:
-            actual_comment_count = len(req.comments)
-            print(f"📋 Analyzing {actual_comment_count} comments for toxicity...")
+        if article_key is not None:
+            known_verdicts = session["verdicts"] if session is not None else {}
+            try:
+                with stage("toxicity"):
+                    toxic_results, new_verdicts, delta_info = _analyze_comments_delta(
+                        req.comments,
+                        req.known_comment_hashes,
+                        known_verdicts,
+                        use_ai=not degraded,
+                    )
+                toxic_count = delta_info.pop("toxic_count")
+                total += delta_info["resolved"]
+                # Regex-only verdicts must not stand in for full ones later
+                if not degraded:
+                    delta_store.update(article_key, fake_data, sentiment, new_verdicts)
+            except Exception as e:
+                logger.warning("Toxicity analysis failed", extra={"error": str(e)})
+                toxic_count = 0
+                toxic_results = []
+                toxicity_failed = True
+        elif req.comments:
             try:
-                toxic_results, toxic_count = toxicity_engine.analyze_comments(
-                    req.comments
-                )
-                print(
-                    f"✅ Toxicity check complete: {toxic_count} toxic items found from {actual_comment_count} comments"
-                )
+                with stage("toxicity"):
+                    toxic_results, toxic_count = toxicity_engine.analyze_comments(
+                        req.comments, use_ai=not degraded
+                    )
             except Exception as e:
-                print(f"⚠️  Toxicity analysis failed: {e}")
+                logger.warning("Toxicity analysis failed", extra={"error": str(e)})
                 toxic_count = 0
                 toxic_results = []
+                toxicity_failed = True
         else:
-            print(f"📋 No comments to analyze")
             toxic_results = []
             toxic_count = 0
 
+        if toxicity_failed:
+            incomplete = [i for i, comment in enumerate(req.comments) if comment]
+        else:
+            incomplete = [
+                item["Index"] for item in toxic_results if item.get("Incomplete")
+            ]
+
         # ========== 4. COMPILE RESPONSE ==========
         response = {
             "fake_check": fake_data,
             "sentiment": sentiment,
             "toxicity": {
-                "total": len(req.comments),
+                "total": total,
                 "toxic_count": toxic_count,
                 "results": toxic_results,
             },
         }
-
-        print(
-            f"✅ Analysis complete. Risk Score: {fake_data.get('risk_score', 0)}, Toxics: {toxic_count}"
+        if incomplete:
+            response["toxicity"]["incomplete"] = incomplete
+        if degraded:
+            response["degraded"] = True
+        if article_key is not None:
+            response["article_hash"] = article_key
+            response["toxicity"]["delta"] = delta_info
+
+        logger.info(
+            "Analysis complete",
+            extra={
+                "url": req.url,
+                "risk_score": fake_data.get("risk_score", 0),
+                "comments": len(req.comments),
+                "toxic_count": toxic_count,
+            },
         )
         return response
 
     except Exception as e:
-        print(f"❌ Critical Error: {e}")
+        logger.exception("Critical error during analysis")
         raise HTTPException(
             status_code=500, detail=f"Server error during analysis: {str(e)}"
         )
 
 
+def _analyze_comments_delta(
+    comments: List[str],
+    known_hashes: List[str],
+    known_verdicts: dict,
+    use_ai: bool = True,
+):
+    """
+    Analyze only comments the article's session has no verdict for.
+
+    Sent comments with a stored verdict are answered from the session, and
+    known_hashes (comments the client did not re-send) only add to totals.
+
+    Returns:
+        tuple: (results for sent comments, new settled {hash: verdict} entries,
+        delta summary with counts, unresolved hashes and toxic_count)
+    """
+    hashes = [text_hash(c) if c else "" for c in comments]
+    pending = [
+        i for i, h in enumerate(hashes) if comments[i] and h not in known_verdicts
+    ]
+
+    new_results, _ = toxicity_engine.analyze_comments(
+        [comments[i] for i in pending], use_ai=use_ai
+    )
+    for item in new_results:
+        item["Index"] = pending[item["Index"]]
+
+    # Verdicts whose escalation did not settle are re-analyzed next time
+    new_verdicts = {}
+    for item in new_results:
+        if item.get("Incomplete"):
+            continue
+        new_verdicts[hashes[item["Index"]]] = {
+            "Is Toxic": item["Is Toxic"],
+            "Category": item["Category"],
+            "Confidence": item["Confidence"],
+        }
+
+    reused_results = [
+        {"Index": i, "Comment": comments[i], **known_verdicts[h]}
+        for i, h in enumerate(hashes)
+        if comments[i] and h in known_verdicts
+    ]
+    results = sorted(new_results + reused_results, key=lambda item: item["Index"])
+
+    # Comments that were also re-sent are already counted in results
+    sent = set(hashes)
+    resolved = []
+    unresolved = []
+    for h in dict.fromkeys(known_hashes):
+        if h not in sent:
+            (resolved if h in known_verdicts else unresolved).append(h)
+
+    toxic_count = sum(1 for item in results if item["Is Toxic"]) + sum(
+        1 for h in resolved if known_verdicts[h]["Is Toxic"]
+    )
+
+    delta_info = {
+        "analyzed": len(new_results),
+        "reused": len(reused_results),
+        "resolved": len(resolved),
+        "unresolved": unresolved,
+        "toxic_count": toxic_count,
+    }
+    return results, new_verdicts, delta_info
+
+
 # ============================================================================
 # Error Handlers
 # ============================================================================
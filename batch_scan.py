@@ -0,0 +1,327 @@
+"""
+Offline batch scanner for exported comment dumps.
+
+Streams comments from a JSONL or CSV file, fans them out in chunks to a
+pool of worker processes (each holding its own ToxicityAnalyzer and
+SentimentAnalyzer) and writes one verdict per input row, in input order.
+Only the comment texts cross the process boundary; the other fields of
+each row stay in the parent and are copied to the output as-is.
+
+After every written chunk the next input offset is saved to
+<output>.ckpt, so an interrupted run continues with --resume. Gemini
+escalation is off by default (regex + keyword sentiment only); --use-ai
+turns it on, with every worker rotating through the same key pool.
+
+Input rows are either a JSON string, a JSON object with the text under
+--text-field, or a CSV row with a --text-field column. Other JSON values
+are skipped with a warning and counted in the summary.
+
+A verdict without a final answer (its Gemini escalation failed or timed
+out, or its regex scan ran out of budget) keeps the regex verdict and is
+written with incomplete=true, so it can be rescanned instead of trusted.
+
+Usage:
+    python batch_scan.py comments.jsonl verdicts.jsonl --workers 8
+    python batch_scan.py export.csv verdicts.csv --text-field message
+    python batch_scan.py comments.jsonl verdicts.jsonl --resume
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+OUTPUT_FIELDS = [
+    "offset",
+    "is_toxic",
+    "category",
+    "confidence",
+    "sentiment",
+    "sentiment_score",
+    "incomplete",
+]
+
+# Per-process analyzers, built once by _init_worker
+_toxicity = None
+_sentiment = None
+_use_ai = False
+
+
+# ========== INPUT ==========
+
+
+def _file_format(path: str, override: Optional[str]) -> str:
+    if override:
+        return override
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_rows(
+    path: str,
+    fmt: str,
+    text_field: str,
+    on_skip: Optional[Callable[[int, str], None]] = None,
+) -> Iterator[Tuple[str, Dict]]:
+    """
+    Yield (text, extra fields) for every row of the dump, streaming.
+
+    JSONL lines holding neither a string nor an object are skipped and
+    reported as on_skip(line number, reason).
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                text = row.pop(text_field, "") or ""
+                yield text, row
+            return
+
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if isinstance(row, str):
+                yield row, {}
+            elif isinstance(row, dict):
+                text = row.pop(text_field, "") or ""
+                yield str(text), row
+            elif on_skip is not None:
+                on_skip(line_no, f"not a JSON object or string: {type(row).__name__}")
+
+
+# ========== WORKERS ==========
+
+
+def _init_worker(use_ai: bool):
+    global _toxicity, _sentiment, _use_ai
+    from src.models.sentiment import SentimentAnalyzer
+    from src.models.toxicity import ToxicityAnalyzer
+    from src.utils.scheduling import BULK, priority_var
+
+    if use_ai:
+        _toxicity = ToxicityAnalyzer()
+        # Offline runs have no latency target: never cut Gemini off mid-chunk
+        _toxicity.request_budget = 0
+        # Already one process per core; no nested regex pool
+        _toxicity.parallel_min_comments = 0
+        # Escalations queue behind interactive scans and leave them the
+        # reserved keys (tasks run in this process's main context)
+        priority_var.set(BULK)
+    else:
+        # No client, key pool, verdict store or batcher threads per worker
+        _toxicity = ToxicityAnalyzer.regex_only()
+    _sentiment = SentimentAnalyzer()
+    _use_ai = use_ai
+
+
+def _scan_chunk(texts: List[str]) -> List[Dict]:
+    """Analyze one chunk of comments; returns one verdict per text"""
+    verdicts = []
+    for text in texts:
+        sentiment = _sentiment.analyze(text)
+        verdicts.append(
+            {
+                "is_toxic": False,
+                "category": "Empty",  # Overwritten for every non-empty comment
+                "confidence": 0.0,
+                "sentiment": sentiment["label"],
+                "sentiment_score": sentiment["score"],
+                "incomplete": False,
+            }
+        )
+
+    for result, _ in _toxicity.iter_analyze(texts, use_ai=_use_ai):
+        verdicts[result["Index"]].update(
+            is_toxic=result["Is Toxic"],
+            category=result["Category"],
+            confidence=result["Confidence"],
+            incomplete=bool(result.get("Incomplete")),
+        )
+    return verdicts
+
+
+# ========== OUTPUT ==========
+
+
+class VerdictWriter:
+    """Append verdict rows as JSONL or CSV, flushing after every chunk"""
+
+    def __init__(self, path: str, fmt: str, append: bool, extra_fields: List[str]):
+        self.fmt = fmt
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(
+                self.file,
+                fieldnames=OUTPUT_FIELDS + extra_fields,
+                extrasaction="ignore",
+            )
+            if not exists:
+                self.csv.writeheader()
+
+    def write(self, rows: List[Dict]):
+        if self.csv is not None:
+            self.csv.writerows(rows)
+        else:
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write("\n")
+            self.file.write(buffer.getvalue())
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def load_checkpoint(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return int(json.load(f)["offset"])
+    except FileNotFoundError:
+        return 0
+
+
+def save_checkpoint(path: str, offset: int):
+    """Atomically record the offset of the next unwritten input row"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset}, f)
+    os.replace(tmp, path)
+
+
+# ========== DRIVER ==========
+
+
+def _chunks(rows: Iterator, size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(args) -> Dict:
+    in_fmt = _file_format(args.input, args.input_format)
+    out_fmt = _file_format(args.output, args.output_format)
+    checkpoint = args.output + ".ckpt"
+
+    start_offset = args.start_offset
+    if args.resume:
+        start_offset = load_checkpoint(checkpoint)
+    append = args.resume and start_offset > 0
+
+    skipped = 0
+
+    def skip(line_no: int, reason: str):
+        nonlocal skipped
+        skipped += 1
+        print(f"Skipping line {line_no}: {reason}", file=sys.stderr)
+
+    rows = islice(
+        read_rows(args.input, in_fmt, args.text_field, on_skip=skip),
+        start_offset,
+        None,
+    )
+    extra_fields = [f for f in args.keep_fields.split(",") if f]
+    writer = VerdictWriter(args.output, out_fmt, append, extra_fields)
+
+    offset = start_offset
+    scanned = toxic = incomplete = 0
+    started = time.perf_counter()
+    max_in_flight = args.workers * 2
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(args.use_ai,)
+    ) as pool:
+        pending = deque()
+
+        def drain_one():
+            nonlocal offset, scanned, toxic, incomplete
+            chunk, future = pending.popleft()
+            out = []
+            for (_, extra), verdict in zip(chunk, future.result()):
+                row = {**extra, "offset": offset, **verdict}
+                out.append(row)
+                offset += 1
+                toxic += verdict["is_toxic"]
+                incomplete += verdict["incomplete"]
+            writer.write(out)
+            save_checkpoint(checkpoint, offset)
+            scanned += len(chunk)
+            if not args.quiet:
+                rate = scanned / max(time.perf_counter() - started, 1e-9)
+                print(
+                    f"\r{offset} rows  {toxic} toxic  {rate:,.0f} rows/s",
+                    end="",
+                    file=sys.stderr,
+                )
+
+        try:
+            for chunk in _chunks(rows, args.chunk_size):
+                texts = [text for text, _ in chunk]
+                pending.append((chunk, pool.submit(_scan_chunk, texts)))
+                # Bounded read-ahead keeps memory flat on huge dumps
+                if len(pending) >= max_in_flight:
+                    drain_one()
+            while pending:
+                drain_one()
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        print(file=sys.stderr)
+    return {
+        "start_offset": start_offset,
+        "end_offset": offset,
+        "scanned": scanned,
+        "toxic": toxic,
+        "incomplete": incomplete,
+        "skipped": skipped,
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(scanned / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-scan a comment dump")
+    parser.add_argument("input", help="JSONL or CSV comment dump")
+    parser.add_argument("output", help="Verdicts file (.jsonl or .csv)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument(
+        "--keep-fields",
+        default="",
+        help="Comma-separated input columns to copy into CSV output "
+        "(JSONL output keeps every field)",
+    )
+    parser.add_argument("--input-format", choices=["jsonl", "csv"])
+    parser.add_argument("--output-format", choices=["jsonl", "csv"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--use-ai", action="store_true", help="Escalate regex-clean comments to Gemini"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continue from <output>.ckpt"
+    )
+    parser.add_argument(
+        "--start-offset", type=int, default=0, help="Skip this many input rows"
+    )
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    summary = run(args)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Synthetic Vietnamese/English comment corpus generator.
+
+Produces reproducible comment streams for benchmarks and load tests with a
+controllable toxic ratio, length distribution, teencode density and share
+of English comments. Toxic comments embed a keyword the regex layer knows,
+optionally written with an evasion spelling ("l.ồ.n", "fuuuck", "sh1t").
+An optional share of clean comments is no-signal content (emoji, stickers,
+bare tags, links, "ok").
+"""
+
+import json
+import math
+import random
+from typing import Dict, Iterator, List
+
+CLEAN_VI = [
+    "bài viết",
+    "rất",
+    "hay",
+    "thông tin",
+    "hữu ích",
+    "cảm ơn",
+    "bạn",
+    "mình",
+    "thấy",
+    "đúng",
+    "không",
+    "được",
+    "vậy",
+    "gì",
+    "rồi",
+    "quá",
+    "biết",
+    "ủng hộ",
+    "hôm nay",
+    "trời",
+    "mưa",
+    "đẹp",
+    "chia sẻ",
+    "tác giả",
+    "đồng ý",
+    "ý kiến",
+    "chính phủ",
+    "kinh tế",
+    "giá",
+    "xăng",
+    "tăng",
+    "giảm",
+    "học sinh",
+    "trường",
+    "bóng đá",
+    "đội tuyển",
+    "thắng",
+    "trận",
+    "người dân",
+    "thành phố",
+    "giao thông",
+    "kẹt xe",
+    "buổi sáng",
+    "cà phê",
+    "ngon",
+    "món ăn",
+    "gia đình",
+    "công việc",
+]
+
+CLEAN_EN = [
+    "great",
+    "article",
+    "thanks",
+    "for",
+    "sharing",
+    "I",
+    "think",
+    "this",
+    "is",
+    "really",
+    "helpful",
+    "agree",
+    "with",
+    "you",
+    "the",
+    "news",
+    "today",
+    "very",
+    "interesting",
+    "point",
+    "good",
+    "job",
+    "team",
+    "match",
+    "price",
+    "city",
+]
+
+TOXIC_VI = [
+    "đồ ngu",
+    "óc chó",
+    "đm",
+    "vcl",
+    "con mẹ mày",
+    "thằng bại não",
+    "mất dạy",
+    "bắc kỳ",
+    "nam kỳ",
+    "tao giết",
+    "việc nhẹ lương cao",
+    "nhà cái",
+    "lùa gà",
+    "đĩ",
+    "tự tử",
+    "xử mày",
+    "ba que",
+    "trà xanh",
+    "vô học",
+    "kiếm tiền online",
+]
+
+TOXIC_EN = [
+    "fuck",
+    "shit",
+    "bitch",
+    "kill you",
+    "asshole",
+    "idiot bastard",
+    "kys",
+    "watch your back",
+    "motherfucker",
+    "whore",
+]
+
+# Common teencode substitutions (standard form -> teencode)
+TEENCODE = {
+    "không": "ko",
+    "được": "dc",
+    "vậy": "v",
+    "gì": "j",
+    "rồi": "r",
+    "quá": "wá",
+    "biết": "bít",
+    "bạn": "bn",
+    "mình": "mk",
+    "thấy": "thay",
+    "cảm ơn": "cmon",
+    "ủng hộ": "uh",
+}
+
+# Scraped comments with nothing to judge
+TRIVIAL = [
+    "😂😂😂",
+    "👍",
+    "❤️❤️",
+    "[sticker]",
+    "[GIF]",
+    "@Nguyễn Minh Anh",
+    "@Trang Lê",
+    "https://example.vn/bai-viet/123",
+    "ok",
+    "hay",
+    "hay quá",
+    "hóng",
+    "hahaha",
+    "=)))",
+    "+1",
+    "up",
+]
+
+# Spellings used to slip keywords past exact patterns
+EVASIONS = ("dots", "spaces", "repeat", "leet")
+LEET = {"i": "1", "o": "0", "e": "3", "a": "4"}
+
+
+class CorpusGenerator:
+    """
+    Reproducible synthetic comment generator.
+
+    Args:
+        toxic_ratio: Share of comments containing a toxic keyword (0-1)
+        mean_words: Mean comment length in words (lognormal distribution)
+        length_sigma: Spread of the lognormal length distribution
+        teencode_density: Chance each eligible word is written as teencode
+        english_ratio: Share of comments written in English
+        evasion_ratio: Share of toxic keywords written with an evasion spelling
+        trivial_ratio: Share of comments that are emoji, stickers, tags or links
+        seed: Random seed
+    """
+
+    def __init__(
+        self,
+        toxic_ratio: float = 0.2,
+        mean_words: float = 12,
+        length_sigma: float = 0.8,
+        teencode_density: float = 0.3,
+        english_ratio: float = 0.15,
+        evasion_ratio: float = 0.0,
+        trivial_ratio: float = 0.0,
+        seed: int = 42,
+    ):
+        self.toxic_ratio = toxic_ratio
+        self.mean_words = mean_words
+        self.length_sigma = length_sigma
+        self.teencode_density = teencode_density
+        self.english_ratio = english_ratio
+        self.evasion_ratio = evasion_ratio
+        self.trivial_ratio = trivial_ratio
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def config(self) -> Dict:
+        return {
+            "toxic_ratio": self.toxic_ratio,
+            "mean_words": self.mean_words,
+            "length_sigma": self.length_sigma,
+            "teencode_density": self.teencode_density,
+            "english_ratio": self.english_ratio,
+            "evasion_ratio": self.evasion_ratio,
+            "trivial_ratio": self.trivial_ratio,
+            "seed": self.seed,
+        }
+
+    def _length(self) -> int:
+        # Lognormal with the requested mean: mu = ln(mean) - sigma^2 / 2
+        mu = math.log(self.mean_words) - self.length_sigma**2 / 2
+        return max(1, int(round(self.rng.lognormvariate(mu, self.length_sigma))))
+
+    def _teencode(self, words: List[str]) -> List[str]:
+        return [
+            (
+                TEENCODE[w]
+                if w in TEENCODE and self.rng.random() < self.teencode_density
+                else w
+            )
+            for w in words
+        ]
+
+    def _evade(self, keyword: str) -> str:
+        style = self.rng.choice(EVASIONS)
+        if style == "dots":
+            return " ".join(".".join(word) for word in keyword.split())
+        if style == "spaces":
+            return " ".join(keyword.replace(" ", ""))
+        if style == "repeat":
+            return keyword + keyword[-1] * self.rng.randint(2, 4)
+        return "".join(LEET.get(c, c) for c in keyword)
+
+    def comment(self) -> Dict:
+        """Generate one labeled comment: {"text", "toxic"}"""
+        # Only draw when enabled so existing seeds keep their corpora
+        if self.trivial_ratio and self.rng.random() < self.trivial_ratio:
+            return {"text": self.rng.choice(TRIVIAL), "toxic": False}
+        english = self.rng.random() < self.english_ratio
+        vocab = CLEAN_EN if english else CLEAN_VI
+        words = [self.rng.choice(vocab) for _ in range(self._length())]
+        if not english:
+            words = self._teencode(words)
+
+        toxic = self.rng.random() < self.toxic_ratio
+        if toxic:
+            keyword = self.rng.choice(TOXIC_EN if english else TOXIC_VI)
+            # Only draw when enabled so existing seeds keep their corpora
+            if self.evasion_ratio and self.rng.random() < self.evasion_ratio:
+                keyword = self._evade(keyword)
+            words.insert(self.rng.randint(0, len(words)), keyword)
+
+        return {"text": " ".join(words), "toxic": toxic}
+
+    def comments(self, n: int) -> List[str]:
+        return [self.comment()["text"] for _ in range(n)]
+
+    def iter_labeled(self, n: int) -> Iterator[Dict]:
+        for _ in range(n):
+            yield self.comment()
+
+    def article(self, sentences: int = 8) -> str:
+        return ". ".join(
+            " ".join(
+                self.rng.choice(CLEAN_VI) for _ in range(self._length())
+            ).capitalize()
+            for _ in range(sentences)
+        )
+
+    def write_jsonl(self, path: str, n: int):
+        """Write n labeled comments as JSON lines"""
+        with open(path, "w", encoding="utf-8") as f:
+            for item in self.iter_labeled(n):
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
@@ -0,0 +1,305 @@
+"""
+Local stand-in for the Gemini generateContent API.
+
+Speaks the same REST surface the google-genai SDK calls
+(POST /v1beta/models/{model}:generateContent), so GeminiAgent and
+ToxicityAnalyzer exercise their real rotation, retry and fallback code when
+GEMINI_BASE_URL points here. Behavior is driven by a config dict:
+
+    latency           {"dist": "fixed", "ms": 300}
+                      {"dist": "uniform", "min_ms": 100, "max_ms": 800}
+                      {"dist": "lognormal", "median_ms": 400, "sigma": 0.5}
+                      {"dist": "exponential", "mean_ms": 400}
+    quota_per_key     Successful calls per key before it returns 429 (0 = unlimited)
+    error_rate        Chance of a 429 RESOURCE_EXHAUSTED on any call
+    server_error_rate Chance of a 500 INTERNAL error
+    safety_block_rate Chance of a promptFeedback.blockReason=SAFETY reply
+    malformed_rate    Chance the reply text is not valid JSON
+    fence_rate        Chance the JSON is wrapped in ```json fences (never when
+                      the request asks for responseMimeType application/json)
+    toxic_rate        Share of toxicity prompts judged toxic (batched
+                      prompts get one verdict per numbered comment)
+    keys              Per-key overrides of quota_per_key / error_rate, keyed by
+                      the full API key or its last 4 characters
+    seed              Random seed for repeatable runs
+
+GET /_stats returns per-key call counts by outcome; POST /_reset clears them
+along with the quota counters.
+
+Usage:
+    python -m benchmarks.fake_gemini --port 8765 --config fake.json
+    GEMINI_BASE_URL=http://127.0.0.1:8765 uvicorn api:app
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_CONFIG = {
+    "latency": {"dist": "lognormal", "median_ms": 400, "sigma": 0.5},
+    "quota_per_key": 0,
+    "error_rate": 0.0,
+    "server_error_rate": 0.0,
+    "safety_block_rate": 0.0,
+    "malformed_rate": 0.0,
+    "fence_rate": 0.3,
+    "toxic_rate": 0.2,
+    "keys": {},
+    "seed": 42,
+}
+
+QUOTA_ERROR = {
+    "code": 429,
+    "message": "Resource has been exhausted (e.g. check quota).",
+    "status": "RESOURCE_EXHAUSTED",
+}
+SERVER_ERROR = {
+    "code": 500,
+    "message": "An internal error has occurred.",
+    "status": "INTERNAL",
+}
+
+
+# Numbered comment lines of a batched toxicity prompt: 3. "text"
+_BATCH_ITEM = re.compile(r'^(\d+)\. (".*")$', re.M)
+
+
+class FakeGeminiBackend:
+    """Decides the outcome, latency and reply text for each call"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.rng = random.Random(self.config["seed"])
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.used = defaultdict(int)
+            self.stats = defaultdict(lambda: defaultdict(int))
+
+    def _key_setting(self, api_key: str, name: str):
+        keys = self.config["keys"]
+        override = keys.get(api_key) or keys.get(api_key[-4:]) or {}
+        return override.get(name, self.config[name])
+
+    def _latency(self) -> float:
+        latency = self.config["latency"]
+        dist = latency.get("dist", "fixed")
+        if dist == "fixed":
+            ms = latency.get("ms", 0)
+        elif dist == "uniform":
+            ms = self.rng.uniform(latency["min_ms"], latency["max_ms"])
+        elif dist == "lognormal":
+            ms = latency["median_ms"] * self.rng.lognormvariate(0, latency["sigma"])
+        elif dist == "exponential":
+            ms = self.rng.expovariate(1.0 / latency["mean_ms"])
+        else:
+            raise ValueError(f"Unknown latency distribution: {dist}")
+        return ms / 1000.0
+
+    def handle(self, api_key: str, prompt: str, json_mode: bool = False):
+        """Return (delay_seconds, http_status, body_dict)"""
+        with self.lock:
+            delay = self._latency()
+            roll = self.rng.random
+
+            quota = self._key_setting(api_key, "quota_per_key")
+            if (quota and self.used[api_key] >= quota) or roll() < self._key_setting(
+                api_key, "error_rate"
+            ):
+                outcome = "quota"
+            elif roll() < self.config["server_error_rate"]:
+                outcome = "server_error"
+            elif roll() < self.config["safety_block_rate"]:
+                outcome = "safety_block"
+            elif roll() < self.config["malformed_rate"]:
+                outcome = "malformed"
+            else:
+                outcome = "ok"
+            fenced = roll() < self.config["fence_rate"] and not json_mode
+
+            if outcome in ("ok", "malformed", "safety_block"):
+                self.used[api_key] += 1
+            self.stats[api_key[-4:]][outcome] += 1
+
+        if outcome == "quota":
+            return delay, 429, {"error": QUOTA_ERROR}
+        if outcome == "server_error":
+            return delay, 500, {"error": SERVER_ERROR}
+        if outcome == "safety_block":
+            return delay, 200, {"promptFeedback": {"blockReason": "SAFETY"}}
+
+        if outcome == "malformed":
+            text = "Sorry, I cannot produce JSON for this request {risk_score:"
+        else:
+            text = json.dumps(self._verdict(prompt), ensure_ascii=False)
+            if fenced:
+                text = f"```json\n{text}\n```"
+
+        return delay, 200, self._reply(text, prompt)
+
+    def _verdict(self, prompt: str):
+        # Derived from the prompt so the same input always gets the same answer
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        unit = digest / 0xFFFFFFFF
+
+        if "risk_score" in prompt:
+            score = 1 + digest % 10
+            verdict = (
+                "Reliable"
+                if score <= 3
+                else "Opinion Piece" if score <= 6 else "Likely Fake"
+            )
+            return {
+                "risk_score": score,
+                "verdict": verdict,
+                "summary": "Synthetic assessment from the local Gemini stand-in.",
+            }
+
+        if '"id"' in prompt:
+            return [
+                {"id": int(number), **self._verdict(text)}
+                for number, text in _BATCH_ITEM.findall(prompt)
+            ]
+
+        toxic = unit < self.config["toxic_rate"]
+        return {
+            "is_toxic": toxic,
+            "category": "Insult" if toxic else "Clean",
+            "confidence": round(0.6 + 0.4 * unit, 2),
+            "reasoning": "Synthetic verdict from the local Gemini stand-in.",
+        }
+
+    def _reply(self, text: str, prompt: str) -> Dict:
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                }
+            ],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4,
+            },
+        }
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                "calls": {key: dict(v) for key, v in self.stats.items()},
+                "used": {key[-4:]: n for key, n in self.used.items()},
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    backend: FakeGeminiBackend = None
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # caller gave up (e.g. a deadline or hedge won elsewhere)
+
+    def do_GET(self):
+        if self.path.startswith("/_stats"):
+            return self._send(200, self.backend.get_stats())
+        self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+
+        if self.path.startswith("/_reset"):
+            self.backend.reset()
+            return self._send(200, {"reset": True})
+
+        if ":generateContent" not in self.path:
+            return self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+        try:
+            request = json.loads(raw or b"{}")
+            prompt = "".join(
+                part.get("text", "")
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            generation = request.get("generationConfig") or {}
+            json_mode = generation.get("responseMimeType") == "application/json"
+        except (ValueError, AttributeError):
+            return self._send(400, {"error": {"code": 400, "message": "Bad JSON"}})
+
+        api_key = self.headers.get("x-goog-api-key", "")
+        delay, status, body = self.backend.handle(api_key, prompt, json_mode)
+        time.sleep(delay)
+        self._send(status, body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGeminiServer:
+    """Run the stand-in on a background thread (port 0 = pick a free port)"""
+
+    def __init__(self, config: Optional[Dict] = None, host="127.0.0.1", port=0):
+        self.backend = FakeGeminiBackend(config)
+        handler = type("Handler", (_Handler,), {"backend": self.backend})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", help="JSON file overriding DEFAULT_CONFIG")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+
+    server = FakeGeminiServer(config, args.host, args.port)
+    print(f"Fake Gemini listening on {server.base_url}")
+    print(f"Set GEMINI_BASE_URL={server.base_url} to use it")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+HTTP load generator that replays recorded scan traffic.
+
+Replays a JSONL file of ScanRequest payloads against /analyze/full_scan,
+either open-loop at a fixed arrival rate (latency is measured from each
+request's scheduled send time, so a slow server cannot hide its queueing)
+or closed-loop at a fixed concurrency. Reports throughput, latency
+percentiles, error / fallback / degraded rates, Gemini usage per scan and
+the mean Server-Timing breakdown per stage.
+
+Gemini usage comes in two numbers. gemini_attempts_per_scan counts the
+gemini_attempt events in ?debug traces: one per comment or article sent,
+so micro-batched comments each count although they share a request.
+gemini_calls_per_scan counts HTTP requests that reached Gemini. That is
+only known with --spawn-server, from the stand-in's own request counts.
+
+Usage:
+    python -m benchmarks.load_test --generate scans.jsonl --count 500
+    python -m benchmarks.load_test scans.jsonl --rate 20 --duration 60
+    python -m benchmarks.load_test scans.jsonl --concurrency 8 --spawn-server
+"""
+
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FALLBACK_VERDICTS = {"Unable to Verify", "Quota Limit", "Service Busy", "Parse Error"}
+
+
+def generate_requests(path: str, count: int, seed: int = 42):
+    """Write a synthetic recording of ScanRequest payloads"""
+    generator = CorpusGenerator(seed=seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            payload = {
+                "url": f"https://example.vn/article/{i}",
+                "article_text": generator.article(generator.rng.randint(2, 12)),
+                "comments": generator.comments(generator.rng.randint(0, 60)),
+            }
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+def load_requests(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    timings = {}
+    for part in header.split(","):
+        name, _, rest = part.strip().partition(";")
+        if rest.startswith("dur="):
+            timings[name] = float(rest[4:])
+    return timings
+
+
+class LoadResults:
+    """Thread-safe collection of per-request outcomes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.fallbacks = 0
+        self.degraded = 0
+        self.gemini_attempts = 0
+        self.gemini_calls = None  # HTTP requests, when the backend reports them
+        self.traced = 0
+        self.stage_totals = defaultdict(float)
+
+    def record(self, latency: float, response=None, error: Optional[str] = None):
+        with self.lock:
+            self.latencies.append(latency)
+            if error is not None:
+                self.errors[error] += 1
+                return
+            self.statuses[response.status_code] += 1
+            if response.status_code != 200:
+                return
+
+            for name, ms in parse_server_timing(
+                response.headers.get("Server-Timing", "")
+            ).items():
+                self.stage_totals[name] += ms
+
+            data = response.json()
+            if data.get("fake_check", {}).get("verdict") in FALLBACK_VERDICTS:
+                self.fallbacks += 1
+            if data.get("degraded"):
+                self.degraded += 1
+            if "trace" in data:
+                self.traced += 1
+                self.gemini_attempts += count_gemini_attempts(data["trace"])
+
+    def summary(self, elapsed: float) -> Dict:
+        ordered = sorted(self.latencies)
+        ok = self.statuses.get(200, 0)
+        total = len(ordered)
+
+        def pct(q):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(total - 1, int(q * total))] * 1000, 1)
+
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": pct(0.50),
+                "p90": pct(0.90),
+                "p99": pct(0.99),
+                "max": pct(1.0),
+            },
+            "status_codes": dict(self.statuses),
+            "client_errors": dict(self.errors),
+            "error_rate": round((total - ok) / total, 4) if total else 0.0,
+            "fallback_rate": round(self.fallbacks / ok, 4) if ok else 0.0,
+            "degraded_rate": round(self.degraded / ok, 4) if ok else 0.0,
+            "gemini_attempts_per_scan": (
+                round(self.gemini_attempts / self.traced, 2) if self.traced else None
+            ),
+            "gemini_calls_per_scan": (
+                round(self.gemini_calls / ok, 2)
+                if self.gemini_calls is not None and ok
+                else None
+            ),
+            "server_timing_mean_ms": (
+                {
+                    name: round(total_ms / ok, 2)
+                    for name, total_ms in self.stage_totals.items()
+                }
+                if ok
+                else {}
+            ),
+        }
+
+
+def count_gemini_attempts(node: Dict) -> int:
+    """gemini_attempt events in a trace (batched comments count one each)"""
+    count = sum(1 for e in node.get("events", []) if e["event"] == "gemini_attempt")
+    return count + sum(count_gemini_attempts(child) for child in node.get("stages", []))
+
+
+def send(session, url, payload, headers, scheduled, results, timeout):
+    try:
+        response = session.post(url, json=payload, headers=headers, timeout=timeout)
+        results.record(time.perf_counter() - scheduled, response)
+    except requests.RequestException as e:
+        results.record(time.perf_counter() - scheduled, error=type(e).__name__)
+
+
+def run_open_loop(url, payloads, headers, rate, duration, max_in_flight, timeout):
+    """Send at a fixed arrival rate regardless of how fast responses come back"""
+    results = LoadResults()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_in_flight)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for i, payload in enumerate(itertools.cycle(payloads)):
+            scheduled = start + i * interval
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(
+                send, session, url, payload, headers, scheduled, results, timeout
+            )
+    return results, time.perf_counter() - start
+
+
+def run_closed_loop(url, payloads, headers, concurrency, duration, timeout):
+    """Keep a fixed number of requests in flight"""
+    results = LoadResults()
+    source = itertools.cycle(payloads)
+    source_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def worker():
+        session = requests.Session()
+        while time.perf_counter() - start < duration:
+            with source_lock:
+                payload = next(source)
+            send(session, url, payload, headers, time.perf_counter(), results, timeout)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_http_calls(fake) -> int:
+    """Requests the Gemini stand-in has answered so far, over all keys"""
+    return sum(
+        sum(outcomes.values())
+        for outcomes in fake.backend.get_stats()["calls"].values()
+    )
+
+
+def spawn_local_stack(fake_config: Optional[Dict]):
+    """Start the Gemini stand-in and an API worker that talks to it"""
+    from benchmarks.fake_gemini import FakeGeminiServer
+
+    fake = FakeGeminiServer(fake_config).start()
+    port = _free_port()
+    env = {**os.environ, "GEMINI_BASE_URL": fake.base_url, "LOG_LEVEL": "WARNING"}
+    api = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/health", timeout=1)
+            break
+        except requests.RequestException:
+            time.sleep(0.2)
+    else:
+        api.terminate()
+        fake.stop()
+        raise RuntimeError("API server did not start")
+    return base, fake, api
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scan traffic against the API")
+    parser.add_argument(
+        "requests_file", nargs="?", help="JSONL of ScanRequest payloads"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, help="Open-loop arrivals per second")
+    parser.add_argument(
+        "--concurrency", type=int, help="Closed-loop in-flight requests"
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--priority", choices=["interactive", "bulk"])
+    parser.add_argument("--compact", action="store_true", help="Ask for compact format")
+    parser.add_argument(
+        "--no-trace",
+        action="store_true",
+        help="Skip ?debug traces (no Gemini attempt counts)",
+    )
+    parser.add_argument(
+        "--spawn-server",
+        action="store_true",
+        help="Run the API against the local Gemini stand-in",
+    )
+    parser.add_argument("--fake-config", help="JSON config for the Gemini stand-in")
+    parser.add_argument("--generate", help="Write a synthetic recording and exit")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_requests(args.generate, args.count)
+        print(f"Wrote {args.count} scan requests to {args.generate}")
+        return
+    if not args.requests_file:
+        parser.error("requests_file is required unless --generate is used")
+    if not args.rate and not args.concurrency:
+        args.concurrency = 1
+
+    payloads = load_requests(args.requests_file)
+
+    fake = api = None
+    base = args.url
+    if args.spawn_server:
+        fake_config = None
+        if args.fake_config:
+            with open(args.fake_config, encoding="utf-8") as f:
+                fake_config = json.load(f)
+        base, fake, api = spawn_local_stack(fake_config)
+
+    url = f"{base}/analyze/full_scan" + ("" if args.no_trace else "?debug=true")
+    headers = {}
+    if args.priority:
+        headers["X-Scan-Priority"] = args.priority
+    if args.compact:
+        headers["Accept"] = "application/vnd.vncontentguard.compact+json"
+
+    calls_before = fake_http_calls(fake) if fake is not None else None
+    try:
+        if args.rate:
+            results, elapsed = run_open_loop(
+                url,
+                payloads,
+                headers,
+                args.rate,
+                args.duration,
+                args.max_in_flight,
+                args.timeout,
+            )
+        else:
+            results, elapsed = run_closed_loop(
+                url, payloads, headers, args.concurrency, args.duration, args.timeout
+            )
+    finally:
+        if fake is not None:
+            calls_after = fake_http_calls(fake)
+        if api is not None:
+            api.terminate()
+            api.wait()
+        if fake is not None:
+            fake.stop()
+
+    if fake is not None:
+        results.gemini_calls = calls_after - calls_before
+    report = results.summary(elapsed)
+    report["mode"] = (
+        {"open_loop_rate": args.rate}
+        if args.rate
+        else {"closed_loop_concurrency": args.concurrency}
+    )
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Profile the toxicity regex layer pattern by pattern.
+
+Runs a synthetic corpus through ToxicityAnalyzer with profiling enabled and
+reports per-pattern cost, hit counts and worst-case inputs, then checks every
+pattern for super-linear running time on adversarial strings. No Gemini
+calls are made.
+
+Usage:
+    python -m benchmarks.profile_patterns --comments 5000 --export patterns.csv
+    python -m benchmarks.profile_patterns --check-only --lengths 1000,4000,16000
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator
+from src.utils.pattern_profiler import check_superlinear
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pattern regex profiler")
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--toxic-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top", type=int, default=10, help="Rows to print")
+    parser.add_argument("--lengths", default="1000,2000,4000,8000")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("--check-only", action="store_true")
+    parser.add_argument("--export", help="Profile report (.json or .csv)")
+    parser.add_argument("--export-check", help="Backtracking report (.json)")
+    args = parser.parse_args()
+
+    from src.models.toxicity import ToxicityAnalyzer
+
+    analyzer = ToxicityAnalyzer()
+
+    if not args.check_only:
+        profiler = analyzer.enable_profiling()
+        comments = CorpusGenerator(
+            toxic_ratio=args.toxic_ratio, seed=args.seed
+        ).comments(args.comments)
+        analyzer.analyze_comments(comments, use_ai=False)
+
+        rows = profiler.report()
+        print(
+            f"{'#':>3} {'total ms':>9} {'mean us':>8} {'max us':>8} {'hits':>6}  label"
+        )
+        for row in rows[: args.top]:
+            print(
+                f"{row['index']:>3} {row['total_ms']:>9.2f} {row['mean_us']:>8.2f} "
+                f"{row['max_us']:>8.1f} {row['hits']:>6}  {row['label']}"
+            )
+        never = [row for row in rows if row["hits"] == 0]
+        print(f"\n{len(never)} of {len(rows)} patterns never fired on this corpus")
+        if args.export:
+            profiler.export(args.export)
+            print(f"Saved profile to {args.export}")
+
+    lengths = [int(n) for n in args.lengths.split(",")]
+    # Check the patterns as the analyzer runs them (hardened unless overridden)
+    patterns = [
+        (compiled.pattern, label) for compiled, label in analyzer.compiled_patterns
+    ]
+    check = check_superlinear(patterns, lengths=lengths, threshold=args.threshold)
+    flagged = [row for row in check if row["superlinear"]]
+    print(f"\nSuper-linear patterns (exponent > {args.threshold}):")
+    for row in flagged:
+        print(
+            f"  #{row['index']:<3} {row['label']:<32} {row['family']:<20} "
+            f"exponent={row['exponent']}  {row['max_ms']}ms @ {lengths[-1]} chars"
+        )
+    if not flagged:
+        print("  none")
+    if args.export_check:
+        with open(args.export_check, "w", encoding="utf-8") as f:
+            json.dump(check, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Toxicity-engine micro-benchmarks.
+
+Measures throughput (comments/sec) and per-comment p50/p99 latency of the
+ToxicityAnalyzer regex layer and SentimentAnalyzer on synthetic corpora of
+increasing size, and saves the results as JSON so runs can be compared
+between versions. No Gemini calls are made.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 100,1000,10000
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(
+    name: str, items: List[str], run_batch: Callable, run_one: Callable
+) -> Dict:
+    """Time one batch pass for throughput and per-item calls for latency"""
+    run_batch(items[: min(50, len(items))])  # warm-up
+
+    start = time.perf_counter()
+    run_batch(items)
+    batch_seconds = time.perf_counter() - start
+
+    latencies = []
+    for item in items:
+        t0 = time.perf_counter()
+        run_one(item)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    return {
+        "component": name,
+        "size": len(items),
+        "comments_per_sec": round(len(items) / batch_seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 4),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(sizes: List[int], generator: CorpusGenerator) -> Dict:
+    from src.models.sentiment import SentimentAnalyzer
+    from src.models.toxicity import ToxicityAnalyzer
+
+    toxicity = ToxicityAnalyzer()
+    # The regex layer itself; the process pool is measured on its own below
+    parallel_workers = toxicity.parallel_workers
+    toxicity.parallel_min_comments = 0
+    sentiment = SentimentAnalyzer()
+
+    # Warmed up front so no size times the pool's process start-up
+    parallel = None
+    if parallel_workers > 1:
+        parallel = ToxicityAnalyzer.regex_only()
+        parallel.parallel_workers = parallel_workers
+        parallel.parallel_min_comments = 2  # Single-comment latency stays serial
+        parallel.warm_parallel_pool()
+
+    results = []
+    for size in sizes:
+        comments = generator.comments(size)
+        results.append(
+            measure(
+                "toxicity_regex",
+                comments,
+                lambda batch: toxicity.analyze_comments(batch, use_ai=False),
+                lambda c: toxicity.analyze_comments([c], use_ai=False),
+            )
+        )
+        measured = 2
+        if parallel is not None:
+            results.append(
+                measure(
+                    "toxicity_parallel",
+                    comments,
+                    lambda batch: parallel.analyze_comments(batch, use_ai=False),
+                    lambda c: parallel.analyze_comments([c], use_ai=False),
+                )
+            )
+            measured += 1
+        results.append(
+            measure(
+                "sentiment",
+                comments,
+                lambda batch: [sentiment.analyze(c) for c in batch],
+                sentiment.analyze,
+            )
+        )
+        for r in results[-measured:]:
+            print(
+                f"{r['component']:<16} n={r['size']:<7} "
+                f"{r['comments_per_sec']:>10.1f} c/s  "
+                f"p50={r['p50_ms']:.4f}ms  p99={r['p99_ms']:.4f}ms"
+            )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": generator.config(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict):
+    """Print throughput and p99 changes relative to a previous run"""
+    base = {(r["component"], r["size"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline['meta'].get('git_revision', '?')}:")
+    for r in current["results"]:
+        old = base.get((r["component"], r["size"]))
+        if not old:
+            continue
+        speed = r["comments_per_sec"] / old["comments_per_sec"] - 1
+        p99 = r["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] else 0.0
+        print(
+            f"{r['component']:<16} n={r['size']:<7} "
+            f"throughput {speed:+.1%}  p99 {p99:+.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Toxicity engine micro-benchmarks")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--toxic-ratio", type=float, default=0.2)
+    parser.add_argument("--mean-words", type=float, default=12)
+    parser.add_argument("--teencode-density", type=float, default=0.3)
+    parser.add_argument("--english-ratio", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: results/<time>.json)")
+    parser.add_argument("--compare", help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(
+        toxic_ratio=args.toxic_ratio,
+        mean_words=args.mean_words,
+        teencode_density=args.teencode_density,
+        english_ratio=args.english_ratio,
+        seed=args.seed,
+    )
+    report = run([int(s) for s in args.sizes.split(",")], generator)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(
+            RESULTS_DIR, f"{stamp}-{report['meta']['git_revision']}.json"
+        )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Offline shadow evaluation: detection quality against Gemini cost.
+
+Replays a labeled JSONL corpus ({"text": ..., "toxic": true/false}) through
+ToxicityAnalyzer with different layer stacks and reports, per stack,
+precision / recall / F1, Gemini calls per 1,000 comments, throughput,
+per-comment latency percentiles and the mean time spent in each layer.
+
+Layer stacks (--configs, comma-separated):
+    regex         Compiled keyword patterns only
+    local         regex + fuzzy lexicon + verdict store (no Gemini)
+    regex+gemini  regex, escalating everything else to Gemini
+    full          Every layer, as the API runs it (trivial-content prefilter
+                  in front of Gemini)
+
+Gemini answers come from the local stand-in (benchmarks.fake_gemini,
+started in-process) unless --replay is given. The stand-in's verdicts are
+synthetic, so with it the Gemini rows measure call counts and latency, not
+quality; for quality numbers, record real responses once with --record
+(GEMINI_BASE_URL unset, real keys) and replay them offline. Recordings are
+keyed by the exact prompt, so comments missing from one count as errors.
+
+Usage:
+    python -m benchmarks.shadow_eval --generate labeled.jsonl --count 2000
+    python -m benchmarks.shadow_eval labeled.jsonl --configs regex,local,full
+    python -m benchmarks.shadow_eval labeled.jsonl --record gemini.jsonl --real
+    python -m benchmarks.shadow_eval labeled.jsonl --replay gemini.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator
+
+LAYER_STACKS = {
+    "regex": ("regex",),
+    "local": ("regex", "fuzzy", "verdict_store"),
+    "regex+gemini": ("regex", "gemini"),
+    "full": ("regex", "fuzzy", "verdict_store", "prefilter", "gemini"),
+}
+
+# Stand-in latency for evaluation runs; override with --fake-config
+EVAL_FAKE_CONFIG = {"latency": {"dist": "lognormal", "median_ms": 40, "sigma": 0.5}}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def load_labeled(path: str, text_field: str, label_field: str) -> List[Dict]:
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                items.append({"text": row[text_field], "toxic": bool(row[label_field])})
+    return items
+
+
+def prompt_key(model: str, contents) -> str:
+    data = contents if isinstance(contents, str) else json.dumps(contents)
+    return hashlib.sha256(f"{model}\n{data}".encode("utf-8")).hexdigest()
+
+
+class ReplayMiss(Exception):
+    """No recorded response for this prompt"""
+
+
+class GeminiTap:
+    """
+    Counts generate_content calls and optionally records or replays them.
+    - Wraps every client the analyzer creates (key rotation, hedging)
+    - record: responses of the real calls are kept by prompt hash
+    - replay: answers come from a recording and nothing is sent
+    """
+
+    def __init__(self, replay: Optional[Dict[str, Dict]] = None):
+        self.replay = replay
+        self.recorded: Dict[str, Dict] = {}
+        self.recording = False
+        self.calls = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def wrap(self, client):
+        return SimpleNamespace(models=_TappedModels(self, client))
+
+    def take_calls(self) -> int:
+        with self._lock:
+            calls, self.calls = self.calls, 0
+            return calls
+
+    def generate(self, client, model, contents, config):
+        with self._lock:
+            self.calls += 1
+        key = prompt_key(model, contents)
+        if self.replay is not None:
+            entry = self.replay.get(key)
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                raise ReplayMiss(f"No recorded response for prompt {key[:12]}")
+            return _recorded_response(entry)
+
+        response = client.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        if self.recording:
+            feedback = getattr(response, "prompt_feedback", None)
+            block_reason = getattr(feedback, "block_reason", None)
+            entry = {
+                "key": key,
+                "text": getattr(response, "text", None),
+                "block_reason": str(block_reason) if block_reason else None,
+            }
+            with self._lock:
+                self.recorded[key] = entry
+        return response
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in self.recorded.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class _TappedModels:
+    def __init__(self, tap: GeminiTap, client):
+        self.tap = tap
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        return self.tap.generate(self.client, model, contents, config)
+
+
+def _recorded_response(entry: Dict):
+    feedback = None
+    if entry.get("block_reason"):
+        feedback = SimpleNamespace(block_reason=entry["block_reason"])
+    return SimpleNamespace(text=entry.get("text"), prompt_feedback=feedback)
+
+
+def load_recording(path: str) -> Dict[str, Dict]:
+    with open(path, encoding="utf-8") as f:
+        entries = (json.loads(line) for line in f if line.strip())
+        return {entry["key"]: entry for entry in entries}
+
+
+def install_tap(tap: GeminiTap):
+    """Route every Gemini client through tap (offline replay needs no key)"""
+    from src.models import gemini_llm, toxicity
+
+    create = gemini_llm.create_client
+
+    def tapped_client(api_key):
+        return tap.wrap(None if tap.replay is not None else create(api_key))
+
+    gemini_llm.create_client = tapped_client
+    toxicity.create_client = tapped_client
+    gemini_llm._clients.clear()
+
+
+def detected_by(category: str) -> str:
+    if "(Keyword:" in category:
+        return "regex"
+    if "(Fuzzy:" in category:
+        return "fuzzy"
+    if "AI Detected" in category or category.startswith("BLOCKED"):
+        return "gemini"
+    return "verdict_store"
+
+
+def evaluate(analyzer, items: List[Dict], use_ai: bool, concurrency: int, tap):
+    """Run every comment as its own analysis; returns the metrics dict"""
+    from src.utils.tracing import start_trace
+
+    def run_one(item):
+        with start_trace() as trace:
+            start = time.perf_counter()
+            results, _ = analyzer.analyze_comments([item["text"]], use_ai=use_ai)
+            elapsed = time.perf_counter() - start
+        verdict = results[0] if results else None
+        return item, verdict, elapsed, dict(trace.timings)
+
+    tap.take_calls()
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(run_one, items))
+    else:
+        outcomes = [run_one(item) for item in items]
+    elapsed = time.perf_counter() - start
+    calls = tap.take_calls()
+
+    counts = Counter()
+    sources = Counter()
+    stage_totals = defaultdict(float)
+    latencies = []
+    for item, verdict, latency, timings in outcomes:
+        predicted = bool(verdict and verdict["Is Toxic"])
+        counts[
+            ("t" if predicted == item["toxic"] else "f") + ("p" if predicted else "n")
+        ] += 1
+        if predicted:
+            sources[detected_by(verdict["Category"])] += 1
+        latencies.append(latency)
+        for name, seconds in timings.items():
+            stage_totals[name] += seconds
+    latencies.sort()
+
+    tp, fp, fn = counts["tp"], counts["fp"], counts["fn"]
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    n = len(items)
+    return {
+        "comments": n,
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "tn": counts["tn"],
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "detected_by": dict(sources),
+        "gemini_calls": calls,
+        "gemini_calls_per_1k": round(calls * 1000 / n, 1) if n else 0.0,
+        "comments_per_sec": round(n / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if n else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3) if n else 0.0,
+            "p99": round(percentile(latencies, 0.99) * 1000, 3) if n else 0.0,
+        },
+        "stage_ms_per_comment": {
+            name: round(seconds * 1000 / n, 4)
+            for name, seconds in sorted(stage_totals.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare toxicity layer stacks on a labeled corpus"
+    )
+    parser.add_argument("labeled_file", nargs="?", help="Labeled JSONL corpus")
+    parser.add_argument(
+        "--configs",
+        default=",".join(LAYER_STACKS),
+        help=f"Layer stacks to run ({', '.join(LAYER_STACKS)})",
+    )
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="toxic")
+    parser.add_argument("--limit", type=int, help="Evaluate the first N comments")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Parallel Gemini escalations"
+    )
+    parser.add_argument("--verdict-store", help="Compacted verdict store file")
+    parser.add_argument("--fake-config", help="JSON config for the Gemini stand-in")
+    parser.add_argument(
+        "--real",
+        action="store_true",
+        help="Call the Gemini endpoint configured in the environment",
+    )
+    parser.add_argument("--record", help="Save Gemini responses to this JSONL")
+    parser.add_argument("--replay", help="Answer Gemini calls from a recording")
+    parser.add_argument("--generate", help="Write a labeled corpus and exit")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--toxic-ratio", type=float, default=0.2)
+    parser.add_argument("--evasion-ratio", type=float, default=0.3)
+    parser.add_argument("--trivial-ratio", type=float, default=0.2)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.generate:
+        CorpusGenerator(
+            toxic_ratio=args.toxic_ratio,
+            evasion_ratio=args.evasion_ratio,
+            trivial_ratio=args.trivial_ratio,
+        ).write_jsonl(args.generate, args.count)
+        print(f"Wrote {args.count} labeled comments to {args.generate}")
+        return
+    if not args.labeled_file:
+        parser.error("labeled_file is required unless --generate is used")
+    if args.record and args.replay:
+        parser.error("--record and --replay are exclusive")
+    configs = [name.strip() for name in args.configs.split(",") if name.strip()]
+    unknown = [name for name in configs if name not in LAYER_STACKS]
+    if unknown:
+        parser.error(f"Unknown layer stacks: {', '.join(unknown)}")
+
+    items = load_labeled(args.labeled_file, args.text_field, args.label_field)
+    if args.limit:
+        items = items[: args.limit]
+
+    # GEMINI_BASE_URL is read when src.models is first imported
+    fake = None
+    needs_gemini = any("gemini" in LAYER_STACKS[name] for name in configs)
+    if needs_gemini and not args.real and not args.replay:
+        from benchmarks.fake_gemini import FakeGeminiServer
+
+        fake_config = EVAL_FAKE_CONFIG
+        if args.fake_config:
+            with open(args.fake_config, encoding="utf-8") as f:
+                fake_config = json.load(f)
+        fake = FakeGeminiServer(fake_config).start()
+        os.environ["GEMINI_BASE_URL"] = fake.base_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Evaluate comment by comment: no batching window, no store writes
+    os.environ["TOXICITY_BATCH_WINDOW_MS"] = "0"
+    os.environ.pop("TOXICITY_VERDICT_LOG", None)
+    os.environ.pop("TOXICITY_VERDICT_STORE", None)
+
+    from src.models.toxicity import ToxicityAnalyzer
+    from src.utils.trivial_filter import TrivialFilter
+    from src.utils.verdict_store import MmapVerdictStore
+
+    tap = GeminiTap(load_recording(args.replay) if args.replay else None)
+    tap.recording = bool(args.record)
+    install_tap(tap)
+
+    analyzer = ToxicityAnalyzer()
+    analyzer.parallel_min_comments = 0
+    tiers = {
+        "fuzzy": analyzer.fuzzy_matcher,
+        "prefilter": analyzer.trivial_filter or TrivialFilter(),
+        "verdict_store": (
+            MmapVerdictStore(args.verdict_store) if args.verdict_store else None
+        ),
+    }
+
+    report = {
+        "corpus": {
+            "file": args.labeled_file,
+            "comments": len(items),
+            "toxic": sum(item["toxic"] for item in items),
+        },
+        "gemini": ("replay" if args.replay else "real" if args.real else "stand-in"),
+        "configs": {},
+    }
+    try:
+        for name in configs:
+            layers = LAYER_STACKS[name]
+            analyzer.fuzzy_matcher = tiers["fuzzy"] if "fuzzy" in layers else None
+            analyzer.verdict_store = (
+                tiers["verdict_store"] if "verdict_store" in layers else None
+            )
+            analyzer.trivial_filter = (
+                tiers["prefilter"] if "prefilter" in layers else None
+            )
+            use_ai = "gemini" in layers
+            if use_ai and analyzer.client is None:
+                print(f"Skipping {name}: no Gemini client", file=sys.stderr)
+                continue
+            # Threads only overlap Gemini round trips; for CPU-bound stacks
+            # they would just contend and trip the per-comment regex budget
+            workers = args.concurrency if use_ai and not args.replay else 1
+            saved = tiers["prefilter"].get_status()["saved_escalations"]
+            metrics = evaluate(analyzer, items, use_ai, workers, tap)
+            if "prefilter" in layers:
+                metrics["prefilter_saved"] = (
+                    tiers["prefilter"].get_status()["saved_escalations"] - saved
+                )
+            report["configs"][name] = {"layers": list(layers), **metrics}
+    finally:
+        if fake is not None:
+            fake.stop()
+
+    if args.replay:
+        report["replay_misses"] = tap.misses
+    if args.record:
+        tap.save(args.record)
+        report["recorded"] = len(tap.recorded)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -135,6 +135,8 @@ document.getElementById('confirmYes').addEventListener('click', async () => {
     btn.textContent = '⏳ Analyzing...';
 
     try {
+        const scanPayload = await buildDeltaPayload(scannedDataCache, currentResultsData);
+
         // AUTO-DETECT: Try localhost first (for local testing), fallback to cloud
         const API_ENDPOINTS = [
             "http://127.0.0.1:8000/analyze/full_scan",     // Local server (try first)
@@ -142,6 +144,11 @@ document.getElementById('confirmYes').addEventListener('click', async () => {
             "https://vncontentguard-pro.onrender.com/analyze/full_scan"  // Cloud (fallback)
         ];
 
+        // Revalidate the cached result: an unchanged page gets 304 Not Modified
+        const conditional = currentResultsData && currentResultsData.etag
+            ? { "If-None-Match": currentResultsData.etag }
+            : {};
+
         let response = null;
         let lastError = null;
         
@@ -153,18 +160,24 @@ document.getElementById('confirmYes').addEventListener('click', async () => {
                 
                 response = await fetch(endpoint, {
                     method: "POST",
-                    headers: { "Content-Type": "application/json" },
+                    headers: {
+                        "Content-Type": "application/json",
+                        "Accept": `${COMPACT_MEDIA_TYPE}, application/json`,
+                        ...conditional
+                    },
                     body: JSON.stringify({
                         url: currentTabUrl,
                         article_text: scannedDataCache.text,
-                        comments: scannedDataCache.comments
+                        comments: scanPayload.comments,
+                        article_hash: scanPayload.articleHash,
+                        known_comment_hashes: scanPayload.knownHashes
                     }),
                     signal: controller.signal
                 });
                 
                 clearTimeout(timeoutId);
                 
-                if (response.ok) {
+                if (response.ok || response.status === 304) {
                     console.log(`✅ Connected to: ${endpoint}`);
                     break; // Success! Stop trying other endpoints
                 }
@@ -176,12 +189,23 @@ document.getElementById('confirmYes').addEventListener('click', async () => {
             }
         }
 
-        if (!response || !response.ok) {
+        if (!response || !(response.ok || response.status === 304)) {
             throw new Error(lastError?.message || "All API endpoints failed");
         }
 
-        const data = await response.json();
-        console.log("✅ Got results");
+        let data;
+        if (response.status === 304) {
+            // Same request as last time and that result was final: keep it
+            data = currentResultsData;
+            console.log("♻️ Page unchanged since the last scan");
+        } else {
+            data = await response.json();
+            if ((response.headers.get("Content-Type") || "").includes(COMPACT_MEDIA_TYPE)) {
+                data = expandCompactResult(data, scanPayload.comments);
+            }
+            data = { ...mergeDeltaResult(data, scanPayload), etag: response.headers.get("ETag") };
+            console.log("✅ Got results");
+        }
 
         // 💾 SAVE TO PERSISTENT STORAGE with timestamp
         currentResultsData = data;
@@ -206,6 +230,115 @@ document.getElementById('confirmYes').addEventListener('click', async () => {
     }
 });
 
+// ============================================================================
+// DELTA SCANS - only send comments the server has not judged yet
+// ============================================================================
+
+// Server-side caps (SCAN_MAX_COMMENT_CHARS / SCAN_MAX_ARTICLE_CHARS defaults)
+const MAX_COMMENT_CHARS = 10000;
+const MAX_ARTICLE_CHARS = 100000;
+
+// Python slices by code point, so count code points rather than UTF-16 units
+function capChars(text, max) {
+    const points = Array.from(text);
+    return points.length > max ? points.slice(0, max).join('') : text;
+}
+
+// Must match the server: first 16 hex chars of SHA-256 over the UTF-8 text,
+// after the text is cut to the same cap the server applies
+async function textHash(text) {
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest))
+        .map(b => b.toString(16).padStart(2, '0'))
+        .join('')
+        .substring(0, 16);
+}
+
+async function buildDeltaPayload(scraped, previous) {
+    const articleHash = await textHash(capChars(scraped.text, MAX_ARTICLE_CHARS));
+    const hashes = await Promise.all(
+        scraped.comments.map(c => textHash(capChars(c, MAX_COMMENT_CHARS)))
+    );
+
+    // Only reuse verdicts from a previous scan of the same article
+    const knownSet = new Set(
+        previous && previous.article_hash === articleHash ? previous.comment_hashes || [] : []
+    );
+
+    const comments = [];
+    const sentHashes = [];
+    const knownHashes = [];
+    scraped.comments.forEach((comment, i) => {
+        if (knownSet.has(hashes[i])) {
+            knownHashes.push(hashes[i]);
+        } else {
+            comments.push(comment);
+            sentHashes.push(hashes[i]);
+        }
+    });
+
+    return {
+        articleHash, hashes, comments, sentHashes, knownHashes,
+        previous: knownHashes.length ? previous : null
+    };
+}
+
+function mergeDeltaResult(data, payload) {
+    const delta = (data.toxicity || {}).delta;
+    const unresolved = new Set(delta ? delta.unresolved : []);
+    // The server kept no verdict for these; send them again next time
+    (data.toxicity.incomplete || []).forEach(i => unresolved.add(payload.sentHashes[i]));
+
+    // Tag fresh verdicts with their comment hash for the next delta scan
+    let results = (data.toxicity.results || []).map(item => ({
+        ...item,
+        hash: payload.sentHashes[item.Index]
+    }));
+
+    // Keep earlier verdicts for comments that are still on the page
+    if (payload.previous) {
+        const stillKnown = new Set(payload.knownHashes.filter(h => !unresolved.has(h)));
+        const previousResults = (payload.previous.toxicity.results || [])
+            .filter(item => stillKnown.has(item.hash));
+        results = previousResults.concat(results);
+    }
+
+    return {
+        ...data,
+        comment_hashes: payload.hashes.filter(h => !unresolved.has(h)),
+        toxicity: { ...data.toxicity, results: results }
+    };
+}
+
+// ============================================================================
+// COMPACT RESPONSE FORMAT
+// ============================================================================
+
+// The server then omits comment text and clean comments; we already have both
+const COMPACT_MEDIA_TYPE = "application/vnd.vncontentguard.compact+json";
+
+function expandCompactResult(data, comments) {
+    const toxicity = data.toxicity || {};
+    const results = (toxicity.flagged || []).map(([index, code, confidence]) => ({
+        "Index": index,
+        "Comment": comments[index] || "",
+        "Is Toxic": true,
+        "Category": toxicity.categories[code],
+        "Confidence": confidence
+    }));
+
+    return {
+        ...data,
+        toxicity: {
+            total: toxicity.total || 0,
+            toxic_count: toxicity.toxic_count || 0,
+            incomplete: toxicity.incomplete,
+            delta: toxicity.delta,
+            results: results
+        }
+    };
+}
+
 document.getElementById('confirmNo').addEventListener('click', () => {
     scannedDataCache = null;
     document.getElementById('confirmation').classList.add('hidden');
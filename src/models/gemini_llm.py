@@ -1,11 +1,31 @@
 import json
+import math
 import os
-import re
+import threading
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
+
+from src.utils.article_compaction import compact_article
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from src.utils.deadlines import (
+    CALL_TIMEOUT_MS,
+    DeadlineExceeded,
+    call_timeout,
+    remaining,
+)
+from src.utils.domain_reputation import DomainReputation, hostname
+from src.utils.hedging import HedgeSkipped, Hedger
+from src.utils.logger import get_logger
+from src.utils.scheduling import INTERACTIVE, current_priority, gemini_slots
+from src.utils.tracing import add_timing, trace_event
+
+logger = get_logger("gemini")
 
 # Load API Keys
 load_dotenv()
@@ -31,6 +51,283 @@ if not any(API_KEY_POOL):
 # Model configuration
 MODEL_NAME = "gemini-2.5-flash-lite"  # Optimized model (20 RPD limit, 10 RPM)
 
+# Alternative endpoint, e.g. the offline stand-in (benchmarks/fake_gemini.py)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+
+
+def create_client(api_key: str) -> genai.Client:
+    """Create a Gemini client, honoring GEMINI_BASE_URL when set"""
+    if GEMINI_BASE_URL:
+        return genai.Client(api_key=api_key, http_options={"base_url": GEMINI_BASE_URL})
+    return genai.Client(api_key=api_key)
+
+
+# ========== STRUCTURED OUTPUT ==========
+# Both call sites ask Gemini for schema-constrained JSON with a small output
+# cap, then parse the reply through parse_response(). Replies that need
+# repair or fail validation are counted per call site (see parse_stats()).
+
+RESPONSE_SCHEMAS = {
+    "fake_news": {
+        "type": "OBJECT",
+        "properties": {
+            "risk_score": {"type": "INTEGER"},
+            "verdict": {
+                "type": "STRING",
+                "enum": ["Reliable", "Opinion Piece", "Likely Fake"],
+            },
+            "summary": {"type": "STRING"},
+        },
+        "required": ["risk_score", "verdict", "summary"],
+    },
+    "toxicity": {
+        "type": "OBJECT",
+        "properties": {
+            "is_toxic": {"type": "BOOLEAN"},
+            "category": {"type": "STRING"},
+            "confidence": {"type": "NUMBER"},
+        },
+        "required": ["is_toxic", "category", "confidence"],
+    },
+    # Several comments in one call (micro-batched escalations); id is the
+    # comment's number in the prompt
+    "toxicity_batch": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "id": {"type": "INTEGER"},
+                "is_toxic": {"type": "BOOLEAN"},
+                "category": {"type": "STRING"},
+                "confidence": {"type": "NUMBER"},
+            },
+            "required": ["id", "is_toxic", "category", "confidence"],
+        },
+    },
+}
+
+MAX_OUTPUT_TOKENS = {
+    "fake_news": int(os.getenv("GEMINI_FAKE_NEWS_MAX_TOKENS", "256")),
+    "toxicity": int(os.getenv("GEMINI_TOXICITY_MAX_TOKENS", "64")),
+}
+# Batched calls scale the per-comment cap by the batch size
+MAX_OUTPUT_TOKENS["toxicity_batch"] = MAX_OUTPUT_TOKENS["toxicity"]
+
+_FIELD_TYPES = {"INTEGER": int, "NUMBER": float, "BOOLEAN": bool, "STRING": str}
+
+_parse_counts = {kind: Counter() for kind in RESPONSE_SCHEMAS}
+_parse_lock = threading.Lock()
+
+
+def response_config(
+    kind: str, timeout: float = None, max_tokens: int = None
+) -> types.GenerateContentConfig:
+    """Generation config requesting JSON that matches RESPONSE_SCHEMAS[kind]"""
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=RESPONSE_SCHEMAS[kind],
+        max_output_tokens=max_tokens or MAX_OUTPUT_TOKENS[kind],
+        temperature=0,
+        http_options=(
+            types.HttpOptions(timeout=int(timeout * 1000)) if timeout else None
+        ),
+    )
+
+
+def _validate(data, kind: str):
+    """
+    Required fields with the schema's types (numbers coerced), else None.
+
+    For ARRAY schemas returns the list of valid items (invalid ones dropped).
+    """
+    schema = RESPONSE_SCHEMAS[kind]
+    if schema["type"] == "ARRAY":
+        if not isinstance(data, list):
+            return None
+        items = (_validate_object(item, schema["items"]) for item in data)
+        return [item for item in items if item is not None]
+    return _validate_object(data, schema)
+
+
+def _validate_object(data, schema: Dict) -> Optional[Dict]:
+    if not isinstance(data, dict):
+        return None
+    result = {}
+    for name in schema["required"]:
+        spec = schema["properties"][name]
+        expected = _FIELD_TYPES[spec["type"]]
+        value = data.get(name)
+        if expected in (int, float):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            value = expected(value)
+        elif not isinstance(value, expected):
+            return None
+        if "enum" in spec and value not in spec["enum"]:
+            return None
+        result[name] = value
+    return result
+
+
+def parse_response(text: str, kind: str):
+    """
+    Parse and validate a structured Gemini reply.
+
+    The fast path is one json.loads. Fenced or chatty replies are repaired by
+    taking the outermost {...} (or [...] for array kinds); anything still
+    invalid returns None.
+    """
+    outcome = "ok"
+    try:
+        data = json.loads(text)
+    except ValueError:
+        outcome = "repaired"
+        open_char, close_char = (
+            "[]" if RESPONSE_SCHEMAS[kind]["type"] == "ARRAY" else "{}"
+        )
+        start, end = text.find(open_char), text.rfind(close_char)
+        try:
+            data = json.loads(text[start : end + 1]) if 0 <= start < end else None
+        except ValueError:
+            data = None
+
+    result = _validate(data, kind)
+    if result is None:
+        outcome = "failed"
+    with _parse_lock:
+        _parse_counts[kind][outcome] += 1
+    return result
+
+
+def parse_stats() -> Dict:
+    """Per call site: replies parsed directly, repaired, or failed"""
+    with _parse_lock:
+        stats = {}
+        for kind, counts in _parse_counts.items():
+            total = sum(counts.values())
+            stats[kind] = {
+                "ok": counts["ok"],
+                "repaired": counts["repaired"],
+                "failed": counts["failed"],
+                "failure_rate": round(counts["failed"] / total, 4) if total else 0.0,
+            }
+        return stats
+
+
+# ========== DEADLINES & HEDGING ==========
+
+hedger = Hedger()
+# One breaker for every Gemini caller: fake news and toxicity share a backend
+gemini_breaker = CircuitBreaker("gemini")
+_clients: Dict[str, genai.Client] = {}
+
+QUOTA_INDICATORS = [
+    "429",
+    "quota",
+    "exceeded",
+    "rate limit",
+    "too many requests",
+    "resource_exhausted",
+    "resourceexhausted",
+]
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Check if error is quota/rate limit related"""
+    error_str = str(error).lower()
+    return any(indicator in error_str for indicator in QUOTA_INDICATORS)
+
+
+def is_timeout_error(error: Exception) -> bool:
+    """Check if error is a call timing out (hedger, httpx or socket timeout)"""
+    if isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower():
+        return True
+    error_str = str(error).lower()
+    return "timed out" in error_str or "timeout" in error_str
+
+
+def client_for_key(api_key: str) -> genai.Client:
+    """Cached client per key (used for hedged attempts)"""
+    client = _clients.get(api_key)
+    if client is None:
+        client = _clients[api_key] = create_client(api_key)
+    return client
+
+
+def generate_json(
+    client: genai.Client,
+    rotator: "APIKeyRotator",
+    kind: str,
+    prompt: str,
+    model: str = MODEL_NAME,
+    priority: str = None,
+    max_tokens: int = None,
+):
+    """
+    One structured Gemini call bounded by the request deadline.
+
+    Waiting for a gemini_slots slot counts against the deadline; the call's
+    own timeout comes from call_timeout() once the slot is held. Either
+    raises DeadlineExceeded when the budget is spent. With hedging on, a
+    slow call is repeated on the rotator's next available key and the first
+    reply wins. Hedge delays and latencies are timed from slot acquisition,
+    and a backup only runs if a slot is free right away: queueing it would
+    add to the contention it is meant to hide. Raises CircuitOpen without
+    calling out while gemini_breaker is open. max_tokens overrides
+    MAX_OUTPUT_TOKENS[kind] (batched calls).
+
+    Timeouts cut short by the request deadline (a timeout below
+    GEMINI_CALL_TIMEOUT_MS) say nothing about Gemini's health and are
+    recorded as neutral, like quota errors.
+    """
+    call_timeout()  # Nothing left of the budget: DeadlineExceeded before queueing
+    if not gemini_breaker.allow():
+        raise CircuitOpen("Gemini circuit breaker is open")
+    # Set when any attempt ran with less than the full call timeout
+    clipped = [False]
+
+    def attempt(attempt_client):
+        call = call_timeout()
+        if call < CALL_TIMEOUT_MS / 1000:
+            clipped[0] = True
+        return attempt_client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=response_config(kind, call, max_tokens),
+        )
+
+    backup = None
+    if hedger.enabled:
+        backup_key = rotator.backup_key()
+        if backup_key:
+
+            def backup():
+                with gemini_slots.slot_now(priority) as held:
+                    if not held:
+                        raise HedgeSkipped("No Gemini slot free for a hedge")
+                    return attempt(client_for_key(backup_key))
+
+    try:
+        with gemini_slots.slot(priority, timeout=remaining()):
+            # Backend latency only: time queued for a local slot is not Gemini's
+            start = time.perf_counter()
+            response = hedger.run(lambda: attempt(client), backup, call_timeout())
+            elapsed = time.perf_counter() - start
+    except Exception as e:
+        # Per-key quota is handled by rotation and a deadline-clipped timeout
+        # is the caller's budget; neither says anything about health
+        if (
+            is_quota_error(e)
+            or isinstance(e, DeadlineExceeded)
+            or (clipped[0] and is_timeout_error(e))
+        ):
+            gemini_breaker.record_neutral()
+        else:
+            gemini_breaker.record_failure()
+        raise
+    gemini_breaker.record_success(elapsed)
+    return response
+
 
 class APIKeyRotator:
     """
@@ -38,10 +335,14 @@ class APIKeyRotator:
     - Automatically switches to next key when quota exhausted
     - Tracks exhausted keys
     - Resets daily (quota resets at UTC midnight)
+    - Reserves the last keys for interactive traffic (GEMINI_INTERACTIVE_RESERVE)
     """
 
-    def __init__(self, api_keys: List[str]):
+    def __init__(self, api_keys: List[str], interactive_reserve: float = None):
         self.api_keys = [key for key in api_keys if key and key.strip()]
+        if interactive_reserve is None:
+            interactive_reserve = float(os.getenv("GEMINI_INTERACTIVE_RESERVE", "0.2"))
+        self.reserved_keys = math.ceil(len(self.api_keys) * interactive_reserve)
         self.current_index = 0
         self.exhausted_keys = set()
         self.last_reset_date = datetime.utcnow().date()
@@ -50,13 +351,13 @@ class APIKeyRotator:
         if not self.api_keys:
             raise ValueError("❌ No valid API keys provided!")
 
-        print(f"✅ API Key Rotator initialized with {len(self.api_keys)} keys")
+        logger.info("API key rotator initialized", extra={"keys": len(self.api_keys)})
 
     def _check_daily_reset(self):
         """Check if we need to reset exhausted keys (new day in UTC)"""
         current_date = datetime.utcnow().date()
         if current_date > self.last_reset_date:
-            print(f"🔄 Daily reset: Clearing exhausted keys")
+            logger.info("Daily reset: clearing exhausted keys")
             self.exhausted_keys.clear()
             self.request_counts = {i: 0 for i in range(len(self.api_keys))}
             self.last_reset_date = current_date
@@ -75,13 +376,17 @@ class APIKeyRotator:
 
     def mark_key_exhausted(self):
         """Mark current API key as exhausted and rotate to next"""
-        print(
-            f"🚫 API Key #{self.current_index + 1} exhausted (used {self.request_counts[self.current_index]} times)"
+        logger.warning(
+            "API key exhausted",
+            extra={
+                "key_index": self.current_index + 1,
+                "used": self.request_counts[self.current_index],
+            },
         )
         self.exhausted_keys.add(self.current_index)
 
         if not self._rotate_to_next_available():
-            print("❌ All API keys exhausted! Waiting for daily reset...")
+            logger.error("All API keys exhausted, waiting for daily reset")
             return False
         return True
 
@@ -93,7 +398,9 @@ class APIKeyRotator:
             self.current_index = (self.current_index + 1) % len(self.api_keys)
 
             if self.current_index not in self.exhausted_keys:
-                print(f"🔄 Switched to API Key #{self.current_index + 1}")
+                logger.info(
+                    "Switched API key", extra={"key_index": self.current_index + 1}
+                )
                 return True
 
             # Avoid infinite loop
@@ -102,6 +409,22 @@ class APIKeyRotator:
 
         return False
 
+    def allows(self, priority: str) -> bool:
+        """Bulk work may not dip into the keys reserved for interactive scans"""
+        if priority == INTERACTIVE:
+            return True
+        self._check_daily_reset()
+        available = len(self.api_keys) - len(self.exhausted_keys)
+        return available > self.reserved_keys
+
+    def backup_key(self) -> Optional[str]:
+        """Another non-exhausted key, for a hedged attempt"""
+        for step in range(1, len(self.api_keys)):
+            index = (self.current_index + step) % len(self.api_keys)
+            if index not in self.exhausted_keys:
+                return self.api_keys[index]
+        return None
+
     def increment_request_count(self):
         """Track successful request"""
         self.request_counts[self.current_index] += 1
@@ -113,6 +436,7 @@ class APIKeyRotator:
             "current_key": self.current_index + 1,
             "exhausted_count": len(self.exhausted_keys),
             "available_count": len(self.api_keys) - len(self.exhausted_keys),
+            "reserved_for_interactive": self.reserved_keys,
             "request_counts": self.request_counts,
             "last_reset": self.last_reset_date.isoformat(),
         }
@@ -136,6 +460,9 @@ class GeminiAgent:
         # Initialize with first key
         self._initialize_client()
 
+        # Cached verdicts for well-known sources (skips the Gemini call)
+        self.reputation = DomainReputation()
+
         # Retry configuration
         self.max_retries = len(API_KEY_POOL)  # Try all keys before giving up
         self.retry_count = 0
@@ -145,32 +472,23 @@ class GeminiAgent:
         try:
             api_key = self.key_rotator.get_current_key()
             if not api_key:
-                print("❌ No available API keys")
+                logger.error("No available API keys")
                 return False
 
-            self.client = genai.Client(api_key=api_key)
-            print(
-                f"✅ Gemini client initialized with API Key #{self.key_rotator.current_index + 1}"
+            self.client = create_client(api_key)
+            logger.info(
+                "Gemini client initialized",
+                extra={"key_index": self.key_rotator.current_index + 1},
             )
             return True
 
         except Exception as e:
-            print(f"❌ Failed to initialize Gemini client: {e}")
+            logger.error("Failed to initialize Gemini client", extra={"error": str(e)})
             return False
 
     def _is_quota_error(self, error: Exception) -> bool:
         """Check if error is quota/rate limit related"""
-        error_str = str(error).lower()
-        quota_indicators = [
-            "429",
-            "quota",
-            "exceeded",
-            "rate limit",
-            "too many requests",
-            "resource_exhausted",
-            "resourceexhausted",
-        ]
-        return any(indicator in error_str for indicator in quota_indicators)
+        return is_quota_error(error)
 
     def _rotate_key_and_retry(self) -> bool:
         """Rotate to next API key and reinitialize client"""
@@ -178,20 +496,39 @@ class GeminiAgent:
             return self._initialize_client()
         return False
 
-    def check_fake_news(self, article_text: str) -> str:
+    def check_fake_news(self, article_text: str, url: Optional[str] = None) -> str:
         """
         Analyze article for misinformation with API key rotation.
+        Articles from domains with a confident reputation prior skip Gemini.
         """
+        if url:
+            prior = self.reputation.lookup(url)
+            if prior is not None:
+                trace_event("reputation_prior", host=hostname(url), tier=prior["tier"])
+                return json.dumps(
+                    {
+                        "risk_score": prior["risk_score"],
+                        "verdict": prior["verdict"],
+                        "summary": prior["summary"],
+                        "source": "domain_reputation",
+                    },
+                    ensure_ascii=False,
+                )
+
         if not self.client:
+            trace_event("fallback", reason="no_client")
             return self._get_fallback_fake_news()
 
-        # Truncate to save tokens
-        max_chars = 5000
-        if len(article_text) > max_chars:
-            print(
-                f"⚠️ Article too long ({len(article_text)} chars), truncating to {max_chars}"
-            )
-            article_text = article_text[:max_chars]
+        if not self.key_rotator.allows(current_priority()):
+            trace_event("fallback", reason="interactive_reserve")
+            return self._get_fallback_fake_news()
+
+        # Strip boilerplate and keep the claim-dense sentences (saves tokens)
+        compaction_start = time.perf_counter()
+        article_text, compaction = compact_article(article_text)
+        add_timing("article_compaction", time.perf_counter() - compaction_start)
+        trace_event("article_compacted", **compaction)
+        logger.debug("Article compacted", extra=compaction)
 
         # Build prompt
         prompt = f"""You are a professional Fact Checker specializing in Vietnamese content.
@@ -215,9 +552,24 @@ Return ONLY a JSON object (no markdown):
 
         # Retry with key rotation
         for attempt in range(self.max_retries):
+            key_index = self.key_rotator.current_index
+            call_start = time.perf_counter()
             try:
-                response = self.client.models.generate_content(
-                    model=self.model_name, contents=prompt
+                response = generate_json(
+                    self.client,
+                    self.key_rotator,
+                    "fake_news",
+                    prompt,
+                    model=self.model_name,
+                )
+                call_elapsed = time.perf_counter() - call_start
+                add_timing("gemini_call", call_elapsed)
+                trace_event(
+                    "gemini_attempt",
+                    attempt=attempt + 1,
+                    key_index=key_index + 1,
+                    outcome="ok",
+                    dur_ms=round(call_elapsed * 1000, 3),
                 )
 
                 # Track successful request
@@ -225,46 +577,91 @@ Return ONLY a JSON object (no markdown):
 
                 # Extract text
                 if hasattr(response, "text") and response.text:
-                    raw_text = response.text
-                    clean_text = re.sub(r"```json\s*", "", raw_text)
-                    clean_text = re.sub(r"```\s*", "", clean_text)
-                    clean_text = clean_text.strip()
-
-                    # Validate JSON
-                    try:
-                        json.loads(clean_text)
-                        return clean_text
-                    except json.JSONDecodeError:
-                        return self._extract_json(clean_text)
+                    cleanup_start = time.perf_counter()
+                    data = parse_response(response.text, "fake_news")
+                    add_timing("json_cleanup", time.perf_counter() - cleanup_start)
+                    if data is None:
+                        # A paid call was wasted; a retry would likely repeat it
+                        trace_event("fallback", reason="parse_error")
+                        return self._get_fallback_fake_news()
+                    return json.dumps(data, ensure_ascii=False)
+
+                # No text (e.g. blocked by safety filters): retrying won't help
+                trace_event("fallback", reason="empty_response")
+                return self._get_fallback_fake_news()
+
+            except CircuitOpen:
+                trace_event("fallback", reason="circuit_open")
+                return self._get_fallback_fake_news()
+
+            except DeadlineExceeded:
+                logger.warning("Fake news check fell back: request budget spent")
+                trace_event("fallback", reason="deadline")
+                return self._get_fallback_fake_news()
 
             except Exception as e:
+                call_elapsed = time.perf_counter() - call_start
+                add_timing("gemini_call", call_elapsed)
                 error_msg = str(e)
-                print(
-                    f"❌ Attempt {attempt + 1}/{self.max_retries} failed: {error_msg[:100]}"
+                logger.debug(
+                    "Gemini attempt failed",
+                    extra={
+                        "attempt": attempt + 1,
+                        "max_retries": self.max_retries,
+                        "error": error_msg[:100],
+                    },
                 )
 
                 # Check if quota error
                 if self._is_quota_error(e):
-                    print(
-                        f"⚠️ Quota exceeded for API Key #{self.key_rotator.current_index + 1}"
+                    logger.debug(
+                        "Quota exceeded",
+                        extra={"key_index": self.key_rotator.current_index + 1},
+                    )
+                    trace_event(
+                        "gemini_attempt",
+                        attempt=attempt + 1,
+                        key_index=key_index + 1,
+                        outcome="quota",
+                        dur_ms=round(call_elapsed * 1000, 3),
                     )
 
                     # Try to rotate to next key
                     if self._rotate_key_and_retry():
-                        print(
-                            f"🔄 Retrying with API Key #{self.key_rotator.current_index + 1}..."
+                        logger.debug(
+                            "Retrying with next API key",
+                            extra={"key_index": self.key_rotator.current_index + 1},
+                        )
+                        trace_event(
+                            "key_rotated",
+                            from_key=key_index + 1,
+                            to_key=self.key_rotator.current_index + 1,
                         )
                         continue
                     else:
                         # All keys exhausted
-                        print("❌ All API keys exhausted!")
+                        logger.warning("Fake news check fell back: all keys exhausted")
+                        trace_event("fallback", reason="all_keys_exhausted")
                         return self._get_fallback_fake_news()
                 else:
                     # Non-quota error, return fallback
-                    print(f"❌ Non-quota error: {error_msg[:100]}")
+                    logger.warning(
+                        "Fake news check fell back: non-quota error",
+                        extra={"error": error_msg[:100]},
+                    )
+                    trace_event(
+                        "gemini_attempt",
+                        attempt=attempt + 1,
+                        key_index=key_index + 1,
+                        outcome="error",
+                        error=error_msg[:100],
+                        dur_ms=round(call_elapsed * 1000, 3),
+                    )
+                    trace_event("fallback", reason="non_quota_error")
                     return self._get_fallback_fake_news()
 
         # Max retries reached
+        trace_event("fallback", reason="max_retries")
         return self._get_fallback_fake_news()
 
     def _get_fallback_fake_news(self) -> str:
@@ -277,20 +674,6 @@ Return ONLY a JSON object (no markdown):
             }
         )
 
-    def _extract_json(self, text: str) -> str:
-        """Extract JSON from messy text"""
-        try:
-            # Try to find JSON pattern
-            json_match = re.search(r'\{[^{}]*"risk_score"[^{}]*\}', text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                json.loads(json_str)  # Validate
-                return json_str
-        except:
-            pass
-
-        return self._get_fallback_fake_news()
-
     def get_status(self) -> Dict:
         """Get current status of API key rotation"""
         return self.key_rotator.get_status()
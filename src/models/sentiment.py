@@ -1,10 +1,14 @@
 # Pure keyword-based sentiment analysis (no API needed)
 # Lightweight, fast, and always available
 
+from src.utils.logger import get_logger
+
+logger = get_logger("sentiment")
+
 
 class SentimentAnalyzer:
     def __init__(self):
-        print("✅ Sentiment Analyzer initialized (keyword-based)")
+        logger.info("Sentiment analyzer initialized (keyword-based)")
 
         # Vietnamese sentiment keywords
         self.positive_words = [
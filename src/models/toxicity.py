@@ -1,14 +1,108 @@
 import json
+import logging
 import os
 import re
+import threading
+import time
+from collections import deque
+from collections.abc import Sized
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
 
 from dotenv import load_dotenv
-from google import genai
 
 load_dotenv()
 
 # Import the key rotation system
-from src.models.gemini_llm import API_KEY_POOL, MODEL_NAME, APIKeyRotator
+from src.models.gemini_llm import (
+    API_KEY_POOL,
+    MAX_OUTPUT_TOKENS,
+    MODEL_NAME,
+    APIKeyRotator,
+    create_client,
+    generate_json,
+    is_quota_error,
+    parse_response,
+)
+from src.utils.circuit_breaker import CircuitOpen
+from src.utils.deadlines import MIN_CALL_MS, deadline_var, expired
+from src.utils.fuzzy_match import FuzzyMatcher
+from src.utils.logger import get_logger
+from src.utils.micro_batcher import MicroBatcher
+from src.utils.pattern_profiler import PatternProfiler
+from src.utils.scheduling import INTERACTIVE, current_priority
+from src.utils.tracing import add_timing, trace_event
+from src.utils.trivial_filter import TrivialFilter
+from src.utils.verdict_store import MmapVerdictStore, VerdictLog
+
+logger = get_logger("toxicity")
+
+# Shared by the single-comment and batched Gemini prompts
+TOXICITY_GUIDELINES = """Categories: ["Violence", "Hate Speech", "Sexual Harassment", "Regional Discrimination", "Scam", "Insult", "Clean"]
+
+Check for:
+- Hidden meanings or slang
+- Regional discrimination (North/South/Central Vietnam)
+- Subtle sexual harassment or grooming
+- Scams or fraud"""
+
+# Gemini outcomes that settle a comment's verdict; anything else (errors,
+# quota, deadline, open circuit, unparsable reply) leaves it incomplete
+SETTLED_OUTCOMES = ("ok", "safety_block")
+
+# Keyword-scan source for a comment whose regex scan ran out of budget; the
+# patterns it never reached may have matched, so it is not treated as clean
+TRUNCATED = "Truncated"
+UNVERIFIED_CATEGORY = "Unverified (Scan Budget Exceeded)"
+
+# Unescaped `.*`, `.*?`, `.+` and `.+?` gaps
+_UNBOUNDED_GAP = re.compile(r"(?<!\\)\.([*+])(\??)")
+
+
+def harden_pattern(pattern: str, max_gap: int) -> str:
+    """Rewrite unbounded gaps to at most max_gap characters (linear-time)"""
+    return _UNBOUNDED_GAP.sub(
+        lambda m: f".{{{0 if m.group(1) == '*' else 1},{max_gap}}}{m.group(2)}",
+        pattern,
+    )
+
+
+# ========== PARALLEL REGEX LAYER ==========
+# One persistent pool per process, shared by every analyzer. Workers are
+# spawned (not forked) because the API process runs background threads.
+_regex_pool = None
+_regex_pool_lock = threading.Lock()
+_worker_matcher = None
+
+
+def _get_regex_pool(workers: int) -> ProcessPoolExecutor:
+    global _regex_pool
+    with _regex_pool_lock:
+        if _regex_pool is None:
+            _regex_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_regex_worker,
+            )
+        return _regex_pool
+
+
+def _reset_regex_pool():
+    global _regex_pool
+    with _regex_pool_lock:
+        if _regex_pool is not None:
+            _regex_pool.shutdown(wait=False, cancel_futures=True)
+        _regex_pool = None
+
+
+def _init_regex_worker():
+    global _worker_matcher
+    _worker_matcher = ToxicityAnalyzer.regex_only()
+
+
+def _regex_scan_chunk(comments):
+    """Worker side: (keyword, label, source) per comment, all None if clean"""
+    return [_worker_matcher._keyword_scan(comment.lower()) for comment in comments]
 
 
 class ToxicityAnalyzer:
@@ -19,10 +113,61 @@ class ToxicityAnalyzer:
     """
 
     def __init__(self):
-        print("⏳ Initializing Toxicity Detection Engine...")
+        logger.info("Initializing toxicity detection engine")
 
         # Initialize regex patterns first (always available)
         self._init_regex_patterns()
+        self._configure_matching()
+
+        # Opt-in per-pattern cost profiling (adds timing to every regex call)
+        self.profiler = None
+        if os.getenv("TOXICITY_PROFILE", "").lower() in ("1", "true", "yes"):
+            self.enable_profiling()
+
+        # Batches of at least this many comments run the regex layer on a
+        # process pool (0 = always serial)
+        self.parallel_min_comments = int(
+            os.getenv("TOXICITY_PARALLEL_MIN_COMMENTS", "2000")
+        )
+        self.parallel_workers = int(
+            os.getenv("TOXICITY_PARALLEL_WORKERS", str(os.cpu_count() or 1))
+        )
+        if self.parallel_workers <= 1:
+            # One worker only adds pickling and IPC to a serial scan
+            self.parallel_min_comments = 0
+
+        # Optional on-disk verdict cache: TOXICITY_VERDICT_STORE is a compacted
+        # table consulted before Gemini, TOXICITY_VERDICT_LOG collects new
+        # Gemini verdicts for the next compaction
+        self.verdict_store = None
+        self.verdict_log = None
+        store_path = os.getenv("TOXICITY_VERDICT_STORE")
+        if store_path and os.path.exists(store_path):
+            self.verdict_store = MmapVerdictStore(store_path)
+        log_path = os.getenv("TOXICITY_VERDICT_LOG")
+        if log_path:
+            self.verdict_log = VerdictLog(log_path)
+
+        # Cross-request micro-batching of Gemini escalations: comments from
+        # all in-flight requests share one call per TOXICITY_BATCH_WINDOW_MS
+        # window (0 = one call per comment)
+        self.batcher = None
+        batch_window = float(os.getenv("TOXICITY_BATCH_WINDOW_MS", "0"))
+        batch_max = int(os.getenv("TOXICITY_BATCH_MAX", "16"))
+        if batch_window > 0 and batch_max > 1:
+            self.batcher = MicroBatcher(
+                self._ask_gemini_batch,
+                batch_window,
+                batch_max,
+                name="toxicity-batch",
+            )
+        # Verdicts a request may hold back while earlier ones are in flight
+        self.batch_lookahead = max(256, 4 * batch_max)
+
+        # Emoji, stickers, tags, links and stock words never reach Gemini
+        self.trivial_filter = None
+        if os.getenv("TOXICITY_PREFILTER", "1").lower() not in ("0", "false", "no"):
+            self.trivial_filter = TrivialFilter()
 
         # Use the same key rotation system as fake news detection
         try:
@@ -30,22 +175,50 @@ class ToxicityAnalyzer:
             self.client = None
             self.model_name = MODEL_NAME
             self._initialize_client()
-            print("✅ Toxicity Engine Ready with API Key Rotation")
+            logger.info("Toxicity engine ready with API key rotation")
         except Exception as e:
-            print(f"⚠️ Warning: Gemini AI unavailable for toxicity detection: {e}")
-            print("⚡ Using regex-only mode (still very effective!)")
+            logger.warning(
+                "Gemini unavailable for toxicity detection, using regex-only mode",
+                extra={"error": str(e)},
+            )
             self.client = None
 
+    @classmethod
+    def regex_only(cls):
+        """
+        Build an analyzer with just the regex and fuzzy layers (no Gemini).
+
+        Skips the API client, key rotation, verdict store, micro-batcher and
+        prefilter, so it is cheap to build per process. Use it with
+        use_ai=False; otherwise every regex miss is marked incomplete.
+        """
+        analyzer = cls.__new__(cls)
+        analyzer._init_regex_patterns()
+        analyzer._configure_matching()
+        analyzer.profiler = None
+        analyzer.parallel_min_comments = 0
+        analyzer.parallel_workers = 1
+        analyzer.verdict_store = None
+        analyzer.verdict_log = None
+        analyzer.batcher = None
+        analyzer.batch_lookahead = 256
+        analyzer.trivial_filter = None
+        analyzer.key_rotator = None
+        analyzer.client = None
+        return analyzer
+
     def _initialize_client(self) -> bool:
         """Initialize Gemini client with current API key"""
         try:
             api_key = self.key_rotator.get_current_key()
             if not api_key:
                 return False
-            self.client = genai.Client(api_key=api_key)
+            self.client = create_client(api_key)
             return True
         except Exception as e:
-            print(f"⚠️ Failed to initialize toxicity client: {e}")
+            logger.error(
+                "Failed to initialize toxicity client", extra={"error": str(e)}
+            )
             return False
 
     def _rotate_key_and_retry(self) -> bool:
@@ -54,6 +227,195 @@ class ToxicityAnalyzer:
             return self._initialize_client()
         return False
 
+    def enable_profiling(self) -> PatternProfiler:
+        """Start recording per-pattern evaluation time, hits and worst inputs"""
+        if self.profiler is None:
+            self.profiler = PatternProfiler(self.blacklist_patterns)
+        return self.profiler
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    def _configure_matching(self):
+        """
+        Compile the blacklist and set the scanning limits.
+
+        TOXICITY_MATCH_MODE=hardened (default) bounds every unbounded gap such
+        as `.*?` to TOXICITY_MAX_GAP_CHARS, which keeps each pattern linear in
+        the input length; "standard" compiles the patterns unchanged.
+        Comments longer than TOXICITY_WINDOW_CHARS are scanned in overlapping
+        windows, and scanning a comment stops once TOXICITY_COMMENT_BUDGET_MS
+        is spent. After TOXICITY_REQUEST_BUDGET_MS (0 = no limit) the rest of
+        a batch is checked with regex only. Comments the patterns miss are
+        checked against the fuzzy lexicon (see _init_regex_patterns).
+        """
+        self.match_mode = os.getenv("TOXICITY_MATCH_MODE", "hardened")
+        max_gap = int(os.getenv("TOXICITY_MAX_GAP_CHARS", "80"))
+        self.compiled_patterns = [
+            (
+                re.compile(
+                    harden_pattern(pattern, max_gap)
+                    if self.match_mode == "hardened"
+                    else pattern
+                ),
+                label,
+            )
+            for pattern, label in self.blacklist_patterns
+        ]
+
+        self.window_chars = int(os.getenv("TOXICITY_WINDOW_CHARS", "4000"))
+        # Overlap must cover the longest possible match (max gap plus keywords)
+        self.window_overlap = max_gap + 120
+        self.comment_budget = (
+            float(os.getenv("TOXICITY_COMMENT_BUDGET_MS", "50")) / 1000
+        )
+        self.request_budget = (
+            float(os.getenv("TOXICITY_REQUEST_BUDGET_MS", "30000")) / 1000
+        )
+
+        # Evasion spellings of the core lexicon (TOXICITY_FUZZY=0 disables)
+        self.fuzzy_matcher = None
+        if os.getenv("TOXICITY_FUZZY", "1").lower() not in ("0", "false", "no"):
+            self.fuzzy_matcher = FuzzyMatcher(
+                (
+                    (term, label)
+                    for terms, label in self.fuzzy_lexicon
+                    for term in terms.split("|")
+                ),
+                self.fuzzy_allowlist,
+            )
+
+    def _windows(self, text):
+        """Split long text into overlapping windows cut at spaces"""
+        size = self.window_chars
+        if len(text) <= size:
+            return (text,)
+
+        windows = []
+        start = 0
+        while True:
+            end = min(len(text), start + size)
+            if end < len(text):
+                cut = text.rfind(" ", start + size // 2, end)
+                if cut != -1:
+                    end = cut
+            windows.append(text[start:end])
+            if end >= len(text):
+                return windows
+
+            resume = max(end - self.window_overlap, start + 1)
+            space = text.find(" ", resume, end)
+            start = space + 1 if space != -1 else resume
+
+    def _keyword_scan(self, lower_c):
+        """
+        Layer 1 verdict: (keyword, label, source), all None when clean.
+
+        source is "Keyword" for a blacklist pattern and "Fuzzy" for an evasion
+        spelling caught by the fuzzy lexicon, which only runs on regex misses.
+        A miss whose regex scan ran out of budget returns (None, None,
+        TRUNCATED).
+        """
+        regex_start = time.perf_counter()
+        match, label = self._regex_scan(lower_c)
+        add_timing("toxicity_regex", time.perf_counter() - regex_start)
+        if match:
+            return match.group(0), label, "Keyword"
+        truncated = label == TRUNCATED
+
+        if self.fuzzy_matcher is not None:
+            fuzzy_start = time.perf_counter()
+            found = self.fuzzy_matcher.search(lower_c)
+            add_timing("toxicity_fuzzy", time.perf_counter() - fuzzy_start)
+            if found is not None:
+                keyword, _, label = found
+                return keyword, label, "Fuzzy"
+        return None, None, TRUNCATED if truncated else None
+
+    def _regex_scan(self, lower_c):
+        """
+        Return (match, label) for the first pattern that fires, else (None,
+        None); (None, TRUNCATED) when the budget ran out before every pattern ran.
+        """
+        if self.profiler is not None:
+            return self._regex_scan_profiled(lower_c)
+
+        windows = self._windows(lower_c)
+        deadline = time.perf_counter() + self.comment_budget
+        for compiled, label in self.compiled_patterns:
+            for window in windows:
+                match = compiled.search(window)
+                if match:
+                    return match, label
+            if time.perf_counter() > deadline:
+                self._on_comment_budget_exceeded(lower_c)
+                return None, TRUNCATED
+        return None, None
+
+    def _regex_scan_profiled(self, lower_c):
+        profiler = self.profiler
+        windows = self._windows(lower_c)
+        deadline = time.perf_counter() + self.comment_budget
+        for index, (compiled, label) in enumerate(self.compiled_patterns):
+            start = time.perf_counter()
+            match = None
+            for window in windows:
+                match = compiled.search(window)
+                if match:
+                    break
+            profiler.record(index, time.perf_counter() - start, bool(match), lower_c)
+            if match:
+                return match, label
+            if time.perf_counter() > deadline:
+                self._on_comment_budget_exceeded(lower_c)
+                return None, TRUNCATED
+        return None, None
+
+    def _parallel_regex_scan(self, comments):
+        """
+        Run the regex layer for a large batch on the shared process pool.
+
+        Returns one (keyword, label, source) per comment, in order, or None if
+        the pool failed (the caller then scans serially). Workers build their
+        matcher from the same environment, so verdicts match serial mode.
+        """
+        workers = max(1, self.parallel_workers)
+        size = max(250, -(-len(comments) // (workers * 4)))
+        chunks = [comments[i : i + size] for i in range(0, len(comments), size)]
+        try:
+            pool = _get_regex_pool(workers)
+            results = []
+            for chunk_result in pool.map(_regex_scan_chunk, chunks):
+                results.extend(chunk_result)
+            return results
+        except Exception as e:
+            logger.warning(
+                "Parallel regex scan failed, falling back to serial",
+                extra={"error": str(e)},
+            )
+            _reset_regex_pool()
+            return None
+
+    def warm_parallel_pool(self):
+        """
+        Spawn the regex pool's workers now, so the first large batch does
+        not pay for process start-up. No-op while the pool is disabled.
+        """
+        if not self.parallel_min_comments:
+            return
+        workers = max(1, self.parallel_workers)
+        try:
+            pool = _get_regex_pool(workers)
+            # Each task submitted while no worker is idle spawns one
+            list(pool.map(_regex_scan_chunk, [[]] * workers))
+        except Exception as e:
+            logger.warning("Regex pool warm-up failed", extra={"error": str(e)})
+            _reset_regex_pool()
+
+    def _on_comment_budget_exceeded(self, lower_c):
+        logger.warning("Regex scan budget exceeded", extra={"chars": len(lower_c)})
+        trace_event("regex_budget_exceeded", chars=len(lower_c))
+
     def _init_regex_patterns(self):
         """Initialize regex patterns for toxicity detection"""
         # --- LAYER 1: MILITARY-GRADE REGEX DATABASE (V3.0 - GEN Z & TEENCODE ENHANCED) ---
@@ -225,118 +587,496 @@ class ToxicityAnalyzer:
             ),
         ]
 
-    def analyze_comments(self, comments_list):
+        # --- FUZZY LEXICON: core terms matched despite evasion spellings ---
+        # Separators ("l.ồ.n"), spaced letters ("đ m"), repeats ("nguuu"),
+        # tone swaps ("lổn") and, for Latin-script words, dropped vowels and
+        # small typos ("btch", "motherfuker"). See src/utils/fuzzy_match.py.
+        self.fuzzy_lexicon = [
+            (
+                "lồn|cặc|buồi|địt|đụ|chịch|xoạc|thủ dâm|vét máng",
+                "Sexual: Explicit/Vulgar",
+            ),
+            ("đm|đkm|vcl|vkl|đéo|đếch|đcm|đmcm", "Profanity: Vulgarity (VN)"),
+            ("con mẹ mày|mả cha mày|tiên sư bố", "Profanity: Family Insults"),
+            (
+                "ngu|óc chó|óc lợn|óc bò|bại não|não tàn|mất dạy|vô học",
+                "Insult: Ableism/Intelligence",
+            ),
+            ("phò|đĩ|điếm", "Insult: Appearance/Character"),
+            (
+                "fuck|fck|shit|bitch|cunt|dick|asshole|whore|slut|bastard|motherfucker|douchebag|wanker",
+                "Profanity: Vulgarity (EN)",
+            ),
+            ("kys|unalive", "Self-Harm/Suicide"),
+        ]
+        # Everyday words one tone mark away from a lexicon term, and teencode
+        # or typos that look like a shortened English term
+        self.fuzzy_allowlist = [
+            "lộn",
+            "cắc",
+            "buổi",
+            "đủ",
+            "đu",
+            "đú",
+            "chích",
+            "đeo",
+            "đèo",
+            "đẽo",
+            "ngủ",
+            "ngũ",
+            "ngụ",
+            "đi",
+            "đì",
+            "phó",
+            "phố",
+            "phở",
+            "phổ",
+            "điểm",
+            "điềm",
+            "dk",  # được / điều kiện
+            "dc",
+            "fk",
+            "cntt",  # công nghệ thông tin
+            "slt",  # số lượng
+            "sht",
+            "whre",  # where
+        ]
+
+    def analyze_comments(self, comments_list, use_ai=True):
         """
         Analyze a list of comments for toxicity using two-layer defense.
 
         Args:
             comments_list (list): List of comment strings
+            use_ai (bool): Run the Gemini layer (False = regex only)
 
         Returns:
-            tuple: (results list, toxic count)
+            tuple: (results list, toxic count). Each result carries the
+            comment's "Index" in comments_list (empty comments are skipped).
+            Results without a final verdict carry "Incomplete": True (see
+            iter_analyze).
         """
+        logger.debug("Analyzing comments", extra={"comments": len(comments_list)})
         results = []
         toxic_count = 0
+        for result, toxic_count in self.iter_analyze(comments_list, use_ai=use_ai):
+            results.append(result)
+        return results, toxic_count
+
+    def iter_analyze(self, comments, use_ai=True):
+        """
+        Analyze comments lazily, yielding each verdict as soon as it is ready.
+
+        Args:
+            comments (iterable): Comment strings; consumed one at a time
+            use_ai (bool): Run the Gemini layer (False = regex only)
+
+        Yields:
+            tuple: (result dict, running toxic count). Results are the same
+            dicts analyze_comments returns, in input order.
+
+        A result is marked "Incomplete": True when it needed a Gemini verdict
+        and did not get one: the escalation failed (error, quota, deadline,
+        open circuit, unparsable reply) or was never sent because the
+        request budget ran out, there is no client or no key for this
+        priority. Its regex verdict stands in and must not be cached as final.
+        A comment whose regex scan ran out of budget is always escalated past
+        the prefilter; until a settled verdict replaces it, its category is
+        UNVERIFIED_CATEGORY and it is incomplete even with use_ai=False.
+
+        Only sized inputs (lists, tuples) of at least parallel_min_comments
+        use the process-pool regex layer, since that scans the whole batch
+        up front.
+        """
+        toxic_count = 0
+        log_verdicts = logger.isEnabledFor(logging.DEBUG)
+        priority = current_priority()
+        wants_ai = use_ai
+        request_deadline = (
+            time.perf_counter() + self.request_budget if self.request_budget else None
+        )
+
+        # Skip empty comments (keeping each comment's position in the input)
+        valid_comments = (
+            (index, c) for index, c in enumerate(comments) if c and len(c.strip()) > 0
+        )
 
-        # Filter empty comments
-        valid_comments = [c for c in comments_list if c and len(c.strip()) > 0]
+        prescanned = None
+        if (
+            self.parallel_min_comments
+            and isinstance(comments, Sized)
+            and len(comments) >= self.parallel_min_comments
+            and self.profiler is None
+        ):
+            valid_comments = list(valid_comments)
+            if len(valid_comments) >= self.parallel_min_comments:
+                regex_start = time.perf_counter()
+                prescanned = self._parallel_regex_scan([c for _, c in valid_comments])
+                add_timing("toxicity_regex", time.perf_counter() - regex_start)
 
-        print(f"⚡ Analyzing {len(valid_comments)} comments...")
+        # Verdicts leave in input order; with the micro-batcher a Gemini
+        # verdict may still be in flight while later comments are scanned
+        pending = deque()
 
-        for comment in valid_comments:
-            is_toxic = False
-            score = 0.0
-            category = "Clean"
+        for position, (index, comment) in enumerate(valid_comments):
+            if use_ai and (
+                expired()
+                or (
+                    request_deadline is not None
+                    and time.perf_counter() > request_deadline
+                )
+            ):
+                # Out of time for this batch: finish the rest with regex only
+                use_ai = False
+                logger.warning(
+                    "Toxicity request budget exceeded, continuing regex-only",
+                    extra={"comment_index": index},
+                )
+                trace_event("request_budget_exceeded", comment_index=index)
+
+            result = {
+                "Index": index,
+                "Comment": comment,
+                "Is Toxic": False,
+                "Category": "Clean",
+                "Confidence": 0.0,
+            }
 
             # ========== PHASE 1: REGEX SCAN (INSTANT) ==========
-            lower_c = comment.lower()
-            for pattern, label in self.blacklist_patterns:
-                match = re.search(pattern, lower_c)
-                if match:
-                    is_toxic = True
-                    score = 1.0
-                    category = f"{label} (Keyword: '{match.group(0)}')"
-                    break
+            if prescanned is not None:
+                keyword, label, source = prescanned[position]
+            else:
+                keyword, label, source = self._keyword_scan(comment.lower())
+            truncated = source == TRUNCATED
+            if keyword is not None:
+                result["Is Toxic"] = True
+                result["Confidence"] = 1.0
+                result["Category"] = f"{label} ({source}: '{keyword}')"
+            elif truncated:
+                # Not every pattern ran, so "Clean" would be a guess
+                result["Category"] = UNVERIFIED_CATEGORY
+
+            # Verdicts Gemini already gave for this exact text
+            stored = None
+            if not result["Is Toxic"] and self.verdict_store is not None:
+                stored = self.verdict_store.get(comment)
+                if stored is not None:
+                    result["Is Toxic"] = stored["is_toxic"]
+                    result["Confidence"] = float(stored["confidence"])
+                    result["Category"] = stored["category"]
 
             # ========== PHASE 2: GEMINI AI SCAN (CONTEXTUAL) ==========
             # Only run AI if Regex didn't catch it (saves API quota)
-            if not is_toxic and self.client:
-                try:
-                    prompt = f"""You are a Content Safety Analyst. Analyze this Vietnamese comment for toxicity.
+            answer = None
+            fallback = truncated and stored is None
+            if not result["Is Toxic"] and stored is None and wants_ai:
+                escalate = bool(
+                    use_ai and self.client and self.key_rotator.allows(priority)
+                )
+                trivial = None
+                if self.trivial_filter is not None and not truncated:
+                    prefilter_start = time.perf_counter()
+                    trivial = self.trivial_filter.classify(comment)
+                    add_timing(
+                        "toxicity_prefilter", time.perf_counter() - prefilter_start
+                    )
+                if trivial is not None:
+                    # Nothing for Gemini to judge: settle it here
+                    result["Category"], reason = trivial
+                    if escalate:
+                        self.trivial_filter.record(reason)
+                        trace_event("prefiltered", comment_index=index, reason=reason)
+                elif not escalate:
+                    # Out of budget, no client or no key: regex stands in
+                    fallback = True
+                elif self.batcher is not None:
+                    answer = self.batcher.submit(
+                        (comment, priority, deadline_var.get())
+                    )
+                else:
+                    answer = self._ask_gemini(comment, index, priority)
+            pending.append((result, answer, fallback))
 
-Comment: "{comment}"
+            while pending and (
+                not isinstance(pending[0][1], Future)
+                or pending[0][1].done()
+                or len(pending) > self.batch_lookahead
+            ):
+                result, answer, fallback = pending.popleft()
+                toxic_count += self._finish(result, answer, fallback, log_verdicts)
+                yield result, toxic_count
 
-Categories: ["Violence", "Hate Speech", "Sexual Harassment", "Regional Discrimination", "Scam", "Insult", "Clean"]
+        while pending:
+            result, answer, fallback = pending.popleft()
+            toxic_count += self._finish(result, answer, fallback, log_verdicts)
+            yield result, toxic_count
 
-Check for:
-- Hidden meanings or slang
-- Regional discrimination (North/South/Central Vietnam)
-- Subtle sexual harassment or grooming
-- Scams or fraud
+    def _finish(self, result, answer, fallback, log_verdicts) -> int:
+        """
+        Apply a Gemini answer (or batched future) to a result; returns 0/1 toxic.
+
+        fallback means the comment needed Gemini but was never sent; it and
+        unsettled outcomes mark the result incomplete.
+        """
+        if isinstance(answer, Future):
+            wait_start = time.perf_counter()
+            try:
+                answer = answer.result()
+            except Exception:
+                answer = ("error", None)
+            add_timing("toxicity_batch_wait", time.perf_counter() - wait_start)
+            trace_event(
+                "gemini_attempt",
+                comment_index=result["Index"],
+                outcome=answer[0],
+                batched=True,
+            )
+
+        incomplete = fallback
+        if answer is not None:
+            outcome, verdict = answer
+            if verdict is not None:
+                result["Is Toxic"], result["Confidence"], result["Category"] = verdict
+            elif outcome == "ok" and result["Category"] == UNVERIFIED_CATEGORY:
+                # Gemini cleared a comment the regex layer could not finish
+                result["Category"] = "Clean"
+            incomplete = outcome not in SETTLED_OUTCOMES
+            if self.verdict_log is not None and not incomplete:
+                self.verdict_log.append(
+                    result["Comment"],
+                    result["Is Toxic"],
+                    result["Category"],
+                    result["Confidence"],
+                )
 
-Return ONLY valid JSON (no markdown):
+        if incomplete:
+            result["Incomplete"] = True
+
+        if log_verdicts:
+            logger.debug(
+                "Comment verdict",
+                extra={
+                    "comment_index": result["Index"],
+                    "is_toxic": result["Is Toxic"],
+                    "category": result["Category"],
+                },
+            )
+        return 1 if result["Is Toxic"] else 0
+
+    def _ask_gemini(self, comment, index, priority):
+        """
+        Single-comment Gemini verdict.
+
+        Returns (outcome, verdict) where verdict is None to keep the regex
+        result, or (is_toxic, confidence, category) to replace it.
+        """
+        key_index = self.key_rotator.current_index
+        call_start = time.perf_counter()
+        call_elapsed = None
+        verdict = None
+        try:
+            prompt = f"""You are a Content Safety Analyst. Analyze this Vietnamese comment for toxicity.
+
+Comment: "{comment}"
+
+{TOXICITY_GUIDELINES}
+
+Return JSON:
 {{
     "is_toxic": true or false,
     "category": "one of the above",
-    "confidence": 0.0-1.0,
-    "reasoning": "brief explanation"
+    "confidence": 0.0-1.0
 }}"""
 
-                    response = self.client.models.generate_content(
-                        model=self.model_name, contents=prompt
-                    )
+            response = generate_json(
+                self.client,
+                self.key_rotator,
+                "toxicity",
+                prompt,
+                model=self.model_name,
+                priority=priority,
+            )
+            call_elapsed = time.perf_counter() - call_start
+            add_timing("toxicity_gemini", call_elapsed)
+
+            # Track successful request
+            self.key_rotator.increment_request_count()
+
+            # A prompt blocked by safety filters comes back without text
+            feedback = getattr(response, "prompt_feedback", None)
+            if feedback is not None and feedback.block_reason:
+                raise ValueError(f"Prompt blocked: {feedback.block_reason}")
+
+            cleanup_start = time.perf_counter()
+            data = parse_response(getattr(response, "text", None) or "", "toxicity")
+            add_timing("json_cleanup", time.perf_counter() - cleanup_start)
+
+            outcome = "ok"
+            if data is None:
+                outcome = "parse_error"  # Keep regex result if JSON fails
+            elif data["is_toxic"]:
+                verdict = (
+                    True,
+                    float(data["confidence"]),
+                    f"{data['category']} (AI Detected)",
+                )
+            trace_event(
+                "gemini_attempt",
+                comment_index=index,
+                key_index=key_index + 1,
+                outcome=outcome,
+                dur_ms=round(call_elapsed * 1000, 3),
+            )
+
+        except CircuitOpen:
+            # Gemini is down: keep the regex verdict, no call was made
+            outcome = "circuit_open"
+            trace_event("fallback", reason="circuit_open", comment_index=index)
 
-                    # Track successful request
-                    self.key_rotator.increment_request_count()
+        except Exception as e:
+            if call_elapsed is None:
+                call_elapsed = time.perf_counter() - call_start
+                add_timing("toxicity_gemini", call_elapsed)
+            error_str = str(e).lower()
+            outcome = "error"
 
-                    # Extract text
-                    raw_text = (
-                        response.text if hasattr(response, "text") else str(response)
+            # Handle quota errors with key rotation
+            if (
+                "429" in error_str
+                or "quota" in error_str
+                or "resourceexhausted" in error_str
+            ):
+                outcome = "quota"
+                if self._rotate_key_and_retry():
+                    # Retry with new key (but only once per comment to avoid loops)
+                    trace_event(
+                        "key_rotated",
+                        from_key=key_index + 1,
+                        to_key=self.key_rotator.current_index + 1,
                     )
 
-                    # Clean JSON
-                    clean_text = re.sub(r"```json\s*", "", raw_text)
-                    clean_text = re.sub(r"```\s*", "", clean_text).strip()
-
-                    try:
-                        data = json.loads(clean_text)
-                        if data.get("is_toxic", False):
-                            is_toxic = True
-                            score = data.get("confidence", 0.8)
-                            category = f"{data.get('category', 'General Toxicity')} (AI Detected)"
-                    except json.JSONDecodeError:
-                        pass  # Keep regex result if JSON fails
-
-                except Exception as e:
-                    error_str = str(e).lower()
-
-                    # Handle quota errors with key rotation
-                    if (
-                        "429" in error_str
-                        or "quota" in error_str
-                        or "resourceexhausted" in error_str
-                    ):
-                        if self._rotate_key_and_retry():
-                            # Retry with new key (but only once per comment to avoid loops)
-                            pass
-
-                    # If safety filters block it, it's definitely toxic
-                    if "block" in error_str or "safety" in error_str:
-                        is_toxic = True
-                        score = 1.0
-                        category = "BLOCKED: Safety Violation (Severe)"
-                    # Otherwise keep regex result
-
-            results.append(
-                {
-                    "Comment": comment,
-                    "Is Toxic": bool(is_toxic),
-                    "Category": category,
-                    "Confidence": float(score),
-                }
+            # If safety filters block it, it's definitely toxic
+            if "block" in error_str or "safety" in error_str:
+                verdict = (True, 1.0, "BLOCKED: Safety Violation (Severe)")
+                outcome = "safety_block"
+            # Otherwise keep regex result
+            trace_event(
+                "gemini_attempt",
+                comment_index=index,
+                key_index=key_index + 1,
+                outcome=outcome,
+                dur_ms=round(call_elapsed * 1000, 3),
             )
 
-            if is_toxic:
-                toxic_count += 1
+        return outcome, verdict
 
-        return results, toxic_count
+    def _ask_gemini_batch(self, items):
+        """
+        Micro-batcher callback: one Gemini call for comments from any requests.
+
+        items are (comment, priority, deadline); returns one (outcome, verdict)
+        per item, as _ask_gemini does. A batch blocked by safety filters is
+        re-asked comment by comment so the block lands on the right one.
+        Items whose request is already out of time are not sent, so they do
+        not shorten the call for the others.
+        """
+        now = time.perf_counter()
+        live = [
+            i
+            for i, (_, _, deadline) in enumerate(items)
+            if deadline is None or (deadline - now) * 1000 >= MIN_CALL_MS
+        ]
+        if len(live) < len(items):
+            answers = [("deadline", None)] * len(items)
+            if live:
+                batch = self._ask_gemini_batch([items[i] for i in live])
+                for i, answer in zip(live, batch):
+                    answers[i] = answer
+            return answers
+
+        if len(items) == 1:
+            comment, priority, deadline = items[0]
+            return [
+                self._with_deadline(deadline, self._ask_gemini, comment, None, priority)
+            ]
+
+        priority = (
+            INTERACTIVE if any(p == INTERACTIVE for _, p, _ in items) else items[0][1]
+        )
+        deadlines = [d for _, _, d in items if d is not None]
+        listing = "\n".join(
+            f"{i}. {json.dumps(comment, ensure_ascii=False)}"
+            for i, (comment, _, _) in enumerate(items)
+        )
+        prompt = f"""You are a Content Safety Analyst. Analyze each numbered Vietnamese comment for toxicity, independently of the others.
+
+Comments:
+{listing}
+
+{TOXICITY_GUIDELINES}
+
+Return a JSON array with one object per comment:
+[{{"id": comment number, "is_toxic": true or false, "category": "one of the above", "confidence": 0.0-1.0}}]"""
+
+        try:
+            response = self._with_deadline(
+                min(deadlines) if deadlines else None,
+                generate_json,
+                self.client,
+                self.key_rotator,
+                "toxicity_batch",
+                prompt,
+                model=self.model_name,
+                priority=priority,
+                max_tokens=MAX_OUTPUT_TOKENS["toxicity_batch"] * len(items),
+            )
+            self.key_rotator.increment_request_count()
+            feedback = getattr(response, "prompt_feedback", None)
+            if feedback is not None and feedback.block_reason:
+                raise ValueError(f"Prompt blocked: {feedback.block_reason}")
+        except CircuitOpen:
+            return [("circuit_open", None)] * len(items)
+        except Exception as e:
+            error_str = str(e).lower()
+            if "block" in error_str or "safety" in error_str:
+                return [
+                    self._with_deadline(d, self._ask_gemini, c, None, p)
+                    for c, p, d in items
+                ]
+            if is_quota_error(e):
+                self._rotate_key_and_retry()
+                return [("quota", None)] * len(items)
+            return [("error", None)] * len(items)
+
+        data = parse_response(getattr(response, "text", None) or "", "toxicity_batch")
+        if data is None:
+            return [("parse_error", None)] * len(items)
+        by_id = {row["id"]: row for row in data}
+        answers = []
+        for i in range(len(items)):
+            row = by_id.get(i)
+            if row is None:
+                answers.append(("parse_error", None))
+            elif row["is_toxic"]:
+                answers.append(
+                    (
+                        "ok",
+                        (
+                            True,
+                            float(row["confidence"]),
+                            f"{row['category']} (AI Detected)",
+                        ),
+                    )
+                )
+            else:
+                answers.append(("ok", None))
+        return answers
+
+    @staticmethod
+    def _with_deadline(deadline, fn, *args, **kwargs):
+        """Run fn on a batcher thread under a submitting request's deadline"""
+        token = deadline_var.set(deadline)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            deadline_var.reset(token)
@@ -0,0 +1,165 @@
+"""
+Admission control and load shedding for the scan endpoint.
+
+At most max_in_flight scans run at full fidelity. Further requests wait up to
+queue_timeout seconds for a slot; if none frees up they are either served in
+degraded mode (no Gemini stages) or rejected, depending on overload_mode.
+Once max_queue requests are already waiting, new ones are rejected at once.
+
+Waiting happens on the event loop, before the scan is handed to the
+threadpool, so a spike never fills the threadpool with blocked workers.
+
+Environment:
+    ADMISSION_MAX_IN_FLIGHT  Full-fidelity scans at once (default 8)
+    ADMISSION_MAX_QUEUE      Requests allowed to wait for a slot (default 32)
+    ADMISSION_QUEUE_TIMEOUT  Seconds a request may wait (default 2.0)
+    ADMISSION_OVERLOAD       "degrade" or "reject" after the wait (default degrade)
+    ADMISSION_RETRY_AFTER    Retry-After seconds sent with a 503 (default 5)
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+from src.utils.scheduling import (
+    INTERACTIVE,
+    PRIORITY_CLASSES,
+    LatencyStats,
+    WeightedFairQueue,
+    default_weights,
+)
+
+FULL = "full"
+DEGRADED = "degraded"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is at capacity")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Outcome of admission for one request"""
+
+    def __init__(self, mode: str, queued_seconds: float, priority: str = INTERACTIVE):
+        self.mode = mode
+        self.queued_seconds = queued_seconds
+        self.priority = priority
+
+    @property
+    def degraded(self) -> bool:
+        return self.mode == DEGRADED
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limit with a queue-time budget.
+    Freed slots go to waiters by weighted fair queuing across priority
+    classes (see src.utils.scheduling).
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        overload_mode: Optional[str] = None,
+        retry_after: Optional[int] = None,
+        weights: Optional[Dict] = None,
+    ):
+        self.max_in_flight = max_in_flight or int(
+            os.getenv("ADMISSION_MAX_IN_FLIGHT", "8")
+        )
+        self.max_queue = (
+            max_queue
+            if max_queue is not None
+            else int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+        )
+        self.queue_timeout = (
+            queue_timeout
+            if queue_timeout is not None
+            else float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+        )
+        self.overload_mode = overload_mode or os.getenv("ADMISSION_OVERLOAD", "degrade")
+        if self.overload_mode not in ("degrade", "reject"):
+            raise ValueError(f"Unknown ADMISSION_OVERLOAD mode: {self.overload_mode}")
+        self.retry_after = retry_after or int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+        self.in_flight = 0
+        self.counters = {"admitted": 0, "degraded": 0, "rejected": 0}
+        self.stats = {cls: LatencyStats() for cls in PRIORITY_CLASSES}
+        self._queue = WeightedFairQueue(weights or default_weights())
+
+    @property
+    def waiting(self) -> int:
+        return self._queue.depth()
+
+    async def acquire(self, priority: str = INTERACTIVE) -> AdmissionTicket:
+        """Wait for a slot; returns a ticket or raises Overloaded"""
+        start = time.perf_counter()
+
+        if self.in_flight < self.max_in_flight and self.waiting == 0:
+            self.in_flight += 1
+            return self._admit(FULL, priority, start)
+
+        if self.waiting >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise Overloaded(self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.push(priority, waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._queue.remove(priority, waiter):
+                # The slot was handed over just as the budget ran out
+                return self._admit(FULL, priority, start)
+            if self.overload_mode == "degrade":
+                self.counters["degraded"] += 1
+                return AdmissionTicket(DEGRADED, time.perf_counter() - start, priority)
+            self.counters["rejected"] += 1
+            raise Overloaded(self.retry_after)
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was already handed over
+            if not self._queue.remove(priority, waiter):
+                self._release_slot()
+            raise
+
+        # release() already counted this request as in flight
+        return self._admit(FULL, priority, start)
+
+    def _admit(self, mode: str, priority: str, start: float) -> AdmissionTicket:
+        queued = time.perf_counter() - start
+        self.counters["admitted"] += 1
+        self.stats[priority].record(queued)
+        return AdmissionTicket(mode, queued, priority)
+
+    def release(self, ticket: AdmissionTicket):
+        if ticket.mode == FULL:
+            self._release_slot()
+
+    def _release_slot(self):
+        nxt = self._queue.pop()
+        if nxt is not None:
+            nxt[1].set_result(True)  # hand the slot straight to the next waiter
+        else:
+            self.in_flight -= 1
+
+    def get_status(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "queue_depth_by_class": {
+                cls: self._queue.depth(cls) for cls in PRIORITY_CLASSES
+            },
+            "queue_latency": {cls: s.summary() for cls, s in self.stats.items()},
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "overload_mode": self.overload_mode,
+            **self.counters,
+        }
@@ -0,0 +1,184 @@
+"""
+Salience-based article compaction for the fake news prompt.
+
+Scraped pages carry navigation text, share/like widgets and repeated
+headers, and a blind character cut drops the claims deeper in the article.
+compact_article() cleans the text locally and keeps the most claim-dense
+sentences that fit a token budget:
+
+1. Drop boilerplate lines (social widgets, menus, bylines, copyright) and
+   lines already seen (repeated headers, captions); a boilerplate pattern
+   must match a whole line of at most MAX_BOILERPLATE_CHARS, so sentences
+   that merely start with "Đăng ký" or mention copyright are kept
+2. Split into sentences and score each one for checkable claims: numbers,
+   dates, quotes, attribution ("theo", "cho biết"), named entities and
+   sensational cue words; the lede is always kept
+3. Take sentences by score until the budget is spent, then restore their
+   original order
+
+Token counts are estimated (about 4 characters per token); every call
+returns input/output sizes so the savings can be measured.
+
+Environment:
+    ARTICLE_TOKEN_BUDGET  Token budget for the compacted article (default 1200)
+"""
+
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+TOKEN_BUDGET = int(os.getenv("ARTICLE_TOKEN_BUDGET", "1200"))
+CHARS_PER_TOKEN = 4
+
+# Longer lines are article text even when they start like a widget
+MAX_BOILERPLATE_CHARS = 80
+
+# Each pattern must match the whole (short) line
+_ACCOUNT = (
+    r"(đăng nhập|đăng ký|log in|sign up|subscribe|quảng cáo|advertisement|sponsored)"
+)
+BOILERPLATE_PATTERNS = [
+    r"(like|thích|share|chia sẻ|comment|bình luận|reply|trả lời|follow|theo dõi)"
+    r"(\s*[·•|/-]\s*(like|thích|share|chia sẻ|comment|bình luận|reply|trả lời))*",
+    # "Xem thêm", "Tin liên quan: <headline>", "Read more »"
+    r"(xem thêm|đọc thêm|tin liên quan|bài liên quan|see more|read more)"
+    r"\s*([:»>…]+.*)?",
+    _ACCOUNT + r"(\s*[·•|/-]\s*" + _ACCOUNT + r")*\W*",
+    # "© 2024 Báo X", "Copyright 2024 ...", "Bản quyền thuộc về ..."
+    r"©.*",
+    r"(copyright|bản quyền)\s*(©|\(c\)|\d{4}|thuộc về|by\b).*",
+    r".*all rights reserved\.?",
+    r"(trang chủ|home)(\s*[»>|/]\s*[^»>|/]+)*",
+    r"\d+\s*(lượt thích|likes?|bình luận|comments?|lượt chia sẻ|shares?)",
+    r"[\W\d_]+",  # Only separators, counters or emoji
+]
+_BOILERPLATE = re.compile("|".join(f"(?:{p})" for p in BOILERPLATE_PATTERNS), re.I)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+(?=[\"“'(\[]?\w)")
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*\s*(?:%|tỷ|triệu|nghìn|ngàn|usd|đồng|vnđ|km|kg)?")
+_DATE = re.compile(
+    r"\b(?:ngày|tháng|năm)\s+\d+|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b|\b(?:19|20)\d{2}\b"
+)
+_QUOTE = re.compile(r"[\"“”]")
+_ATTRIBUTION = re.compile(
+    r"\b(?:theo|cho biết|khẳng định|tuyên bố|thông báo|xác nhận|phát biểu|công bố"
+    r"|according to|said|stated|announced|confirmed)\b",
+    re.I,
+)
+_CUES = re.compile(
+    r"\b(?:sự thật|bí mật|chấn động|khẩn cấp|chia sẻ ngay|100%|chắc chắn|bị cấm"
+    r"|che giấu|sốc|breaking|shocking|exposed)\b",
+    re.I,
+)
+_ENTITY = re.compile(r"(?<=\s)[A-ZÀ-Ỹ][\wÀ-ỹ]+(?:\s+[A-ZÀ-Ỹ][\wÀ-ỹ]+)+")
+
+_totals = {"articles": 0, "input_chars": 0, "output_chars": 0, "compacted": 0}
+_totals_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clean_lines(text: str) -> Tuple[List[str], Dict]:
+    """Drop boilerplate and repeated lines; returns (lines, drop counts)"""
+    kept, seen = [], set()
+    dropped = {"boilerplate": 0, "duplicate": 0}
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            continue
+        if len(line) <= MAX_BOILERPLATE_CHARS and _BOILERPLATE.fullmatch(line):
+            dropped["boilerplate"] += 1
+            continue
+        key = line.lower()
+        if key in seen:
+            dropped["duplicate"] += 1
+            continue
+        seen.add(key)
+        kept.append(line)
+    return kept, dropped
+
+
+def sentence_score(sentence: str) -> float:
+    """Claim density: checkable facts per word (fragments score zero)"""
+    words = len(sentence.split())
+    if words < 4:
+        return 0.0
+    signals = (
+        2.0 * len(_NUMBER.findall(sentence))
+        + 2.0 * len(_DATE.findall(sentence))
+        + 1.5 * min(len(_QUOTE.findall(sentence)), 2)
+        + 2.0 * len(_ATTRIBUTION.findall(sentence))
+        + 3.0 * len(_CUES.findall(sentence))
+        + 1.0 * len(_ENTITY.findall(sentence))
+    )
+    return (signals + 1.0) / math.sqrt(words)
+
+
+def compact_article(text: str, token_budget: int = None) -> Tuple[str, Dict]:
+    """
+    Compact an article to at most token_budget (estimated) tokens.
+
+    Returns (compacted text, stats). Text that fits after cleanup is only
+    cleaned; otherwise the lede plus the highest-scoring sentences are kept.
+    """
+    budget_chars = (token_budget or TOKEN_BUDGET) * CHARS_PER_TOKEN
+    lines, dropped = clean_lines(text)
+    cleaned = "\n".join(lines)
+
+    sentences_total = sentences_kept = 0
+    if len(cleaned) <= budget_chars:
+        output = cleaned
+    else:
+        sentences = [
+            sentence for line in lines for sentence in _SENTENCE_SPLIT.split(line)
+        ]
+        sentences_total = len(sentences)
+        # The lede (first sentence) frames everything else; always keep it
+        ranked = sorted(
+            range(1, len(sentences)),
+            key=lambda i: sentence_score(sentences[i]),
+            reverse=True,
+        )
+        chosen, used = [0], len(sentences[0]) + 1
+        for i in ranked:
+            cost = len(sentences[i]) + 1
+            if used + cost <= budget_chars:
+                chosen.append(i)
+                used += cost
+        sentences_kept = len(chosen)
+        output = " ".join(sentences[i] for i in sorted(chosen))[:budget_chars]
+
+    stats = {
+        "input_chars": len(text),
+        "output_chars": len(output),
+        "input_tokens": estimate_tokens(text),
+        "output_tokens": estimate_tokens(output),
+        "boilerplate_lines": dropped["boilerplate"],
+        "duplicate_lines": dropped["duplicate"],
+        "sentences_total": sentences_total,
+        "sentences_kept": sentences_kept,
+    }
+    with _totals_lock:
+        _totals["articles"] += 1
+        _totals["input_chars"] += stats["input_chars"]
+        _totals["output_chars"] += stats["output_chars"]
+        _totals["compacted"] += bool(sentences_total)
+    return output, stats
+
+
+def compaction_status() -> Dict:
+    """Cumulative sizes since startup"""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["saved_ratio"] = (
+        round(1 - totals["output_chars"] / totals["input_chars"], 4)
+        if totals["input_chars"]
+        else 0.0
+    )
+    totals["token_budget"] = TOKEN_BUDGET
+    return totals
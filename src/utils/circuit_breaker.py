@@ -0,0 +1,146 @@
+"""
+Circuit breaker for the Gemini backend.
+
+When Gemini is degraded every scan otherwise pays for a full round of
+failing calls (and key rotations) before falling back. The breaker watches
+outcomes over a rolling window and, once the failure rate passes a
+threshold, opens: callers get CircuitOpen immediately and serve their
+fallback verdicts. After a cool-down it goes half-open and lets a few
+trial calls through; a success closes it again, a failure re-opens it.
+
+Calls slower than the slow-call threshold count as failures. Outcomes
+that say nothing about backend health (per-key quota errors, the caller's
+own deadline) are recorded as neutral.
+
+Environment:
+    BREAKER_ERROR_RATE       Failure rate that opens the circuit (default 0.5)
+    BREAKER_MIN_CALLS        Calls in the window before it can open (default 10)
+    BREAKER_WINDOW           Rolling window in seconds (default 30)
+    BREAKER_SLOW_CALL_MS     Slower successful calls count as failures (default 8000)
+    BREAKER_OPEN_SECONDS     Cool-down before half-open trials (default 15)
+    BREAKER_HALF_OPEN_CALLS  Concurrent trial calls when half-open (default 1)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from src.utils.logger import get_logger
+
+logger = get_logger("breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The backend is considered down; use the fallback"""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+    - allow() must precede each call; it raises nothing, returns False when open
+    - Every allowed call must end in record_success/record_failure/record_neutral
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.error_rate = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+        self.min_calls = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+        self.window = float(os.getenv("BREAKER_WINDOW", "30"))
+        self.slow_call = float(os.getenv("BREAKER_SLOW_CALL_MS", "8000")) / 1000
+        self.open_seconds = float(os.getenv("BREAKER_OPEN_SECONDS", "15"))
+        self.half_open_calls = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+
+        self.state = CLOSED
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.rejected += 1
+                    return False
+                self._trials += 1
+            return True
+
+    def record_success(self, elapsed: float):
+        if elapsed > self.slow_call:
+            self.record_failure()
+            return
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+                return
+            self._add(False)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            self._add(True)
+            failures = sum(failed for _, failed in self._outcomes)
+            if (
+                self.state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.error_rate
+            ):
+                self._transition(OPEN)
+
+    def record_neutral(self):
+        """The call ended without telling us anything about backend health"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def _add(self, failed: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _transition(self, state: str):
+        # Caller holds the lock
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        if state in (CLOSED, OPEN):
+            self._outcomes.clear()
+        self._trials = 0
+        logger.warning(
+            "Circuit breaker state change",
+            extra={"breaker": self.name, "from": self.state, "to": state},
+        )
+        self.state = state
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            failures = sum(failed for _, failed in self._outcomes)
+            status = {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failures": failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+            if self.state == OPEN:
+                status["retry_in_s"] = round(
+                    max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)),
+                    1,
+                )
+            return status
@@ -0,0 +1,71 @@
+"""
+Request-level time budgets and the per-call timeouts derived from them.
+
+A scan gets one end-to-end budget (SCAN_BUDGET_MS, or the client's
+X-Scan-Budget-Ms header). Every Gemini call then asks call_timeout() for
+its own timeout: the smaller of GEMINI_CALL_TIMEOUT_MS and the time left,
+so one stuck call can no longer hold a request for minutes. When less
+than GEMINI_MIN_CALL_MS is left, no new call is started.
+
+Environment:
+    SCAN_BUDGET_MS          Default budget per scan (default 20000)
+    SCAN_BUDGET_MAX_MS      Largest budget a client may ask for (default 60000)
+    GEMINI_CALL_TIMEOUT_MS  Upper bound for a single Gemini call (default 10000)
+    GEMINI_MIN_CALL_MS      Minimum time left to start a call (default 250)
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+DEFAULT_BUDGET_MS = float(os.getenv("SCAN_BUDGET_MS", "20000"))
+MAX_BUDGET_MS = float(os.getenv("SCAN_BUDGET_MAX_MS", "60000"))
+CALL_TIMEOUT_MS = float(os.getenv("GEMINI_CALL_TIMEOUT_MS", "10000"))
+MIN_CALL_MS = float(os.getenv("GEMINI_MIN_CALL_MS", "250"))
+
+# perf_counter() value the current request must finish by
+deadline_var: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Too little of the request budget is left to start another call"""
+
+
+def parse_budget(value: Optional[str]) -> float:
+    """Budget in ms from a header value, clamped; the default when invalid"""
+    try:
+        budget = float(value) if value else DEFAULT_BUDGET_MS
+    except ValueError:
+        return DEFAULT_BUDGET_MS
+    return min(max(budget, MIN_CALL_MS), MAX_BUDGET_MS)
+
+
+def start_deadline(budget_ms: float, spent: float = 0.0) -> float:
+    """Bind a deadline to the current context; spent is time already used (s)"""
+    deadline = time.perf_counter() + budget_ms / 1000 - spent
+    deadline_var.set(deadline)
+    return deadline
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request, or None without a deadline"""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.perf_counter()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left * 1000 < MIN_CALL_MS
+
+
+def call_timeout() -> float:
+    """Timeout (s) for the next Gemini call; raises DeadlineExceeded when out of time"""
+    left = remaining()
+    if left is None:
+        return CALL_TIMEOUT_MS / 1000
+    if left * 1000 < MIN_CALL_MS:
+        raise DeadlineExceeded("Request budget exhausted")
+    return min(CALL_TIMEOUT_MS / 1000, left)
@@ -0,0 +1,91 @@
+"""
+Session store for incremental (delta) scans.
+
+A delta-capable client identifies a page by the hash of its article text and
+each comment by the hash of its text. The store remembers, per article hash,
+the article verdicts and every comment verdict produced so far, so a re-scan
+only has to analyze comments the server has not seen for that article.
+
+Hashes are the first 16 hex characters of the SHA-256 of the UTF-8 text. The
+API hashes comments after cutting them to its per-comment character cap, so
+clients must apply the same cap (in code points) before hashing.
+
+Environment:
+    DELTA_STORE_SIZE  Max article sessions kept (default 2048)
+    DELTA_STORE_TTL   Seconds a session stays valid (default 3600)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+HASH_LENGTH = 16
+
+# Article verdicts that only mean "try again later" are never reused
+UNSETTLED_VERDICTS = {
+    "Unable to Verify",
+    "Quota Limit",
+    "Service Busy",
+    "Parse Error",
+    "Skipped",
+}
+
+
+def text_hash(text: str) -> str:
+    """Hash used for both articles and comments"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+class DeltaScanStore:
+    """
+    Thread-safe LRU of scan sessions keyed by article hash.
+    - Each session holds fake_check, sentiment and {comment_hash: verdict}
+    - Least recently used sessions are evicted beyond max_sessions
+    - Sessions older than ttl seconds are treated as missing
+    """
+
+    def __init__(self, max_sessions: int = None, ttl: float = None):
+        self.max_sessions = max_sessions or int(os.getenv("DELTA_STORE_SIZE", "2048"))
+        self.ttl = ttl or float(os.getenv("DELTA_STORE_TTL", "3600"))
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, article_hash: str) -> Optional[Dict]:
+        with self._lock:
+            session = self._sessions.get(article_hash)
+            if session is None:
+                return None
+            if time.monotonic() - session["updated"] > self.ttl:
+                del self._sessions[article_hash]
+                return None
+            self._sessions.move_to_end(article_hash)
+            return session
+
+    def update(
+        self,
+        article_hash: str,
+        fake_check: Dict,
+        sentiment: Dict,
+        verdicts: Dict[str, Dict],
+    ):
+        """Merge new verdicts into the article's session"""
+        with self._lock:
+            session = self._sessions.get(article_hash)
+            if session is None:
+                session = {"verdicts": {}}
+                self._sessions[article_hash] = session
+            session["fake_check"] = fake_check
+            session["sentiment"] = sentiment
+            session["verdicts"].update(verdicts)
+            session["updated"] = time.monotonic()
+            self._sessions.move_to_end(article_hash)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "max_sessions": self.max_sessions}
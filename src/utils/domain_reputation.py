@@ -0,0 +1,202 @@
+"""
+Domain reputation priors for the fake news check.
+
+Articles from well-known official outlets (and known fake-news farms) are
+predictable enough that a Gemini call adds nothing. This table maps
+hostnames to a cached verdict; GeminiAgent consults it first and only
+sends unknown domains to the model.
+
+Entries are kept in a suffix trie over hostname labels, so an entry for
+"vnexpress.net" also covers "e.vnexpress.net" and an entry for "gov.vn"
+covers every government site. The most specific entry wins, and a
+"unknown" entry opts a subdomain back out (e.g. user-hosted blogs).
+
+The table is a JSON file mapping domain -> tier name or an object
+overriding the tier defaults:
+
+    {
+        "gov.vn": "trusted",
+        "vnexpress.net": {"tier": "trusted", "summary": "..."},
+        "blog.example.vn": "unknown"
+    }
+
+The file is re-read when its mtime changes (checked at most every
+check_interval seconds), so it can be refreshed without a restart.
+
+Environment:
+    DOMAIN_REPUTATION_FILE            Table path (default data/domain_reputation.json)
+    DOMAIN_REPUTATION_MIN_CONFIDENCE  Priors below this go to Gemini (default 0.9)
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from src.utils.logger import get_logger
+
+logger = get_logger("reputation")
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data",
+    "domain_reputation.json",
+)
+
+TIER_DEFAULTS = {
+    "trusted": {
+        "risk_score": 1,
+        "verdict": "Reliable",
+        "summary": "Published by an established, official news source.",
+        "confidence": 1.0,
+    },
+    "unreliable": {
+        "risk_score": 9,
+        "verdict": "Likely Fake",
+        "summary": "Source is known for publishing misinformation.",
+        "confidence": 1.0,
+    },
+    "unknown": None,
+}
+
+_ENTRY = "$"  # Trie key holding a node's entry; never a hostname label
+
+
+def hostname(url: str) -> Optional[str]:
+    """Lowercase hostname of a URL (or a bare host); None when it is malformed"""
+    if "//" not in url:
+        url = "//" + url
+    try:
+        return (urlsplit(url).hostname or "").rstrip(".")
+    except ValueError:
+        # e.g. an unclosed IPv6 bracket ("http://[::1")
+        return None
+
+
+class DomainReputation:
+    """
+    Suffix trie of domain -> verdict prior.
+    - lookup(url) returns the most specific entry, or None for unknown hosts
+    - The backing file is reloaded when it changes on disk
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        check_interval: float = 30.0,
+    ):
+        self.path = path or os.getenv("DOMAIN_REPUTATION_FILE", DEFAULT_PATH)
+        self.min_confidence = (
+            min_confidence
+            if min_confidence is not None
+            else float(os.getenv("DOMAIN_REPUTATION_MIN_CONFIDENCE", "0.9"))
+        )
+        self.check_interval = check_interval
+        self._trie: Dict = {}
+        self._entries = 0
+        self._mtime = None
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reload()
+
+    @staticmethod
+    def build(table: Dict) -> Dict:
+        """Build a trie from a {domain: tier or entry} mapping"""
+        trie: Dict = {}
+        for domain, spec in table.items():
+            if isinstance(spec, str):
+                spec = {"tier": spec}
+            tier = spec.get("tier", "trusted")
+            if tier not in TIER_DEFAULTS:
+                raise ValueError(f"Unknown reputation tier '{tier}' for {domain}")
+            defaults = TIER_DEFAULTS[tier]
+            entry = None
+            if defaults is not None:
+                entry = {**defaults, **spec, "tier": tier}
+
+            host = hostname(domain)
+            if not host:
+                raise ValueError(f"Invalid reputation domain '{domain}'")
+            node = trie
+            for label in reversed(host.split(".")):
+                node = node.setdefault(label, {})
+            node[_ENTRY] = entry
+        return trie
+
+    def reload(self) -> bool:
+        """Re-read the table file; returns False (keeping the old table) on error"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        # A broken file is reported once, not on every reload check
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                table = json.load(f)
+            trie = self.build(table)
+        except (OSError, ValueError) as e:
+            logger.error(
+                "Failed to load domain reputation table",
+                extra={"path": self.path, "error": str(e)},
+            )
+            return False
+
+        self._trie = trie
+        self._entries = len(table)
+        logger.info(
+            "Domain reputation table loaded",
+            extra={"path": self.path, "entries": len(table)},
+        )
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime != self._mtime:
+                self.reload()
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Prior for a URL's host, or None when Gemini should decide"""
+        self._maybe_reload()
+        host = hostname(url)
+        node = self._trie
+        entry = None
+        for label in reversed(host.split(".") if host else ()):
+            node = node.get(label)
+            if node is None:
+                break
+            entry = node.get(_ENTRY, entry)
+
+        if entry is None or entry["confidence"] < self.min_confidence:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    @property
+    def version(self) -> Optional[str]:
+        """Identity of the loaded table (file mtime), None when none is loaded"""
+        return str(self._mtime) if self._mtime is not None else None
+
+    def get_status(self) -> Dict:
+        return {
+            "path": self.path,
+            "entries": self._entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,115 @@
+"""
+Content fingerprints for conditional full scans (ETag / If-None-Match).
+
+A scan result depends only on the request content (URL, article, comments,
+delta hashes), the response format and the engine doing the analysis. The
+fingerprint is a SHA-256 over those fields and is returned as a strong ETag.
+The store remembers which fingerprints were answered with a settled result,
+so a re-scan of an unchanged page that sends the ETag back in If-None-Match
+gets a 304 without any analysis or Gemini call.
+
+Only the fingerprints are kept, never the results: the client already holds
+the representation it validated.
+
+Environment:
+    SCAN_ETAG_STORE_SIZE  Max fingerprints kept (default 100000, 0 = off)
+    SCAN_ETAG_TTL         Seconds a fingerprint stays valid (default 3600)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Union
+
+FINGERPRINT_LENGTH = 32
+
+
+def scan_fingerprint(*fields: Union[str, Iterable[str], None]) -> str:
+    """
+    Hash of the given fields (strings, lists of strings or None).
+
+    Every value is length-prefixed, so moving text between fields or
+    comments can never produce the same fingerprint.
+    """
+    digest = hashlib.sha256()
+    for field in fields:
+        if field is None:
+            digest.update(b"-\n")
+            continue
+        values = [field] if isinstance(field, str) else list(field)
+        digest.update(b"%d\n" % len(values))
+        for value in values:
+            data = value.encode("utf-8")
+            digest.update(b"%d:" % len(data))
+            digest.update(data)
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class FingerprintStore:
+    """
+    Thread-safe LRU of fingerprints with settled scan results.
+    - Least recently used fingerprints are evicted beyond max_entries
+    - Fingerprints older than ttl seconds are treated as missing
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("SCAN_ETAG_STORE_SIZE", "100000"))
+        )
+        self.ttl = ttl or float(os.getenv("SCAN_ETAG_TTL", "3600"))
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def add(self, fingerprint: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[fingerprint] = time.monotonic()
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, fingerprint: str) -> bool:
+        with self._lock:
+            added = self._entries.get(fingerprint)
+            if added is not None and time.monotonic() - added > self.ttl:
+                del self._entries[fingerprint]
+                added = None
+            if added is None:
+                self.misses += 1
+                return False
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return True
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "not_modified": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,267 @@
+"""
+Approximate lexicon matching for evasion spellings.
+
+The regex layer only knows the spellings written into its patterns, so
+"l.ồ.n", "đ m", "nguuuu", "lổn" or "fuk" walk past it. FuzzyMatcher
+normalizes each comment once and looks its tokens up in a small lexicon
+with bounded edit distance:
+
+1. Tokens are split on whitespace; inside a token separators are dropped
+   ("l.ồ.n" -> "lồn") and leetspeak digits mapped ("sh1t" -> "shit")
+2. Runs of single-letter tokens are joined ("đ m" -> "đm")
+3. Repeated letters collapse ("nguuuu" -> "ngu"), on both sides
+4. Vietnamese tone marks are ignored when comparing single syllables, so
+   tone swaps match; real words that collide ("buổi" vs "buồi") go in the
+   allowlist. A term whose toneless form is itself allowlisted ("đĩ" vs
+   "đi") only matches with its own tone, since every typo of the common
+   word would otherwise hit. Tones are only folded for tokens that are
+   Vietnamese-spelled themselves: plain ASCII "pho" or "chich" is far more
+   often phở or chích ngừa written without diacritics than an evasion
+5. Latin-script terms (no Vietnamese letters) also match with one vowel
+   dropped when that leaves at least MIN_VOWEL_DROP_LEN letters ("btch";
+   shorter drops such as "dk" or "slt" are everyday teencode), sound-alike
+   spellings ("phuk") and, from 7 letters, Levenshtein distance 1 (2 from
+   10 letters: "motherfuker")
+
+Multi-word terms match exactly after normalization (tones kept), either
+as one token ("óc.chó") or across consecutive tokens ("óc chóóó").
+Vietnamese syllables never get general edits: one edit away from a
+toxic syllable is usually an everyday word ("chịch" -> "thích").
+
+Levenshtein lookups use a symmetric-deletion index: every long term's
+deletion variants are precomputed, and a token's own deletion variants
+are looked up in them, then verified with a banded Levenshtein. With
+distance at most 2 that is a fixed number of dict lookups per token, so
+a comment is matched in time linear in its length.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Combining tone marks; the shape marks (ă â ê ô ơ ư) and đ are kept
+_TONE_MARKS = {"\u0300", "\u0301", "\u0303", "\u0309", "\u0323"}
+_VIETNAMESE_LETTERS = set("ăâđêôơư")
+_LEET = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+_LATIN_FOLDS = (("ph", "f"), ("ck", "k"))
+MAX_SPAN_TOKENS = 3
+MIN_VOWEL_DROP_LEN = 4
+MATCH_CACHE_SIZE = 65536
+_RAW_TOKEN = re.compile(r"\S+")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def strip_tones(text: str) -> str:
+    decomposed = unicodedata.normalize("NFD", text)
+    return unicodedata.normalize(
+        "NFC", "".join(c for c in decomposed if c not in _TONE_MARKS)
+    )
+
+
+def collapse_repeats(text: str) -> str:
+    return _REPEATS.sub(r"\1", text)
+
+
+def is_vietnamese(term: str) -> bool:
+    """Has tone marks or Vietnamese-only letters"""
+    stripped = strip_tones(term)
+    return stripped != term or any(c in _VIETNAMESE_LETTERS for c in stripped)
+
+
+@lru_cache(maxsize=65536)
+def normalize_token(raw: str) -> str:
+    """Letters of a raw token (leetspeak mapped), NFC, repeats collapsed"""
+    if not raw.isalpha():
+        if not any(c.isalpha() for c in raw):
+            return ""
+        raw = "".join(_LEET.get(c, c) for c in raw if c.isalpha() or c in _LEET)
+    return collapse_repeats(unicodedata.normalize("NFC", raw))
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Normalized tokens of lowercased text as (token, start, end).
+
+    start/end are offsets into text, so a match can be reported as written.
+    Tones are kept.
+    """
+    tokens = []
+    run = []  # Consecutive single-letter tokens ("đ m" -> "đm")
+    for raw in _RAW_TOKEN.finditer(text):
+        token = normalize_token(raw.group())
+        if not token:
+            continue
+        if len(token) == 1:
+            run.append((token, raw.start(), raw.end()))
+            continue
+        if run:
+            tokens.append(_join_run(run))
+            run = []
+        tokens.append((token, raw.start(), raw.end()))
+    if run:
+        tokens.append(_join_run(run))
+    return tokens
+
+
+def _join_run(run):
+    return collapse_repeats("".join(t for t, _, _ in run)), run[0][1], run[-1][2]
+
+
+def deletions(word: str, depth: int) -> Set[str]:
+    """All strings obtained by deleting up to depth characters"""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        if low > 1:
+            current[low - 1] = limit + 1
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != b[j - 1]),
+            )
+        if high < len(b):
+            current[high + 1 :] = [limit + 1] * (len(b) - high)
+        if min(current[low - 1 : high + 1]) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[len(b)], limit + 1)
+
+
+def edit_budget(term: str) -> int:
+    """Levenshtein edits allowed for a Latin-script single-word term"""
+    if len(term) >= 10:
+        return 2
+    if len(term) >= 7:
+        return 1
+    return 0
+
+
+def fold_latin(word: str) -> str:
+    """Spellings that sound alike ("phuck", "fuk" -> "fuk")"""
+    for spelling, sound in _LATIN_FOLDS:
+        word = word.replace(spelling, sound)
+    return word
+
+
+def vowel_drops(word: str) -> Set[str]:
+    """word with one vowel removed, never the first letter ("fuck" -> "fck")"""
+    return {
+        word[:i] + word[i + 1 :] for i in range(1, len(word)) if word[i] in "aeiouy"
+    }
+
+
+class FuzzyMatcher:
+    """
+    Bounded-distance matcher over a toxic lexicon.
+    - entries: (term, label) pairs, terms lowercase; multi-word terms allowed
+    - allowlist: real words that must never match (checked as written,
+      after normalization)
+    - search(text) returns (span as written, term, label) or None
+    """
+
+    def __init__(
+        self, entries: Iterable[Tuple[str, str]], allowlist: Iterable[str] = ()
+    ):
+        self.allowlist = {
+            collapse_repeats(unicodedata.normalize("NFC", w.replace(" ", "")))
+            for w in allowlist
+        }
+        self._syllables: Dict[str, Tuple[str, str]] = {}  # Tone-insensitive
+        self._exact: Dict[str, Tuple[str, str]] = {}  # Syllables, tones kept
+        self._phrases: Dict[str, Tuple[str, str]] = {}  # Space-free, tones kept
+        self._phrase_prefixes: Set[str] = set()
+        self._latin: Dict[str, Tuple[str, str]] = {}  # Folded spelling
+        self._deletes: Dict[str, List[str]] = {}  # Deletion variant -> long terms
+        self.max_budget = 0
+        self.max_latin_len = 0
+        # Token -> lexicon entry (or None); comment vocabularies repeat a lot
+        self._cache: Dict[str, Optional[Tuple[str, str]]] = {}
+
+        for term, label in entries:
+            words = term.split()
+            key = collapse_repeats(unicodedata.normalize("NFC", "".join(words)))
+            if len(words) > 1:
+                self._phrases[key] = (term, label)
+                self._phrase_prefixes.update(key[:n] for n in range(1, len(key)))
+            elif is_vietnamese(key):
+                toneless = strip_tones(key)
+                if toneless != key and toneless in self.allowlist:
+                    self._exact[key] = (term, label)
+                else:
+                    self._syllables[toneless] = (term, label)
+            else:
+                folded = fold_latin(key)
+                self._latin[folded] = (term, label)
+                for variant in vowel_drops(folded):
+                    if len(variant) >= MIN_VOWEL_DROP_LEN:
+                        self._latin.setdefault(variant, (term, label))
+                key = folded
+                budget = edit_budget(key)
+                if budget:
+                    self.max_budget = max(self.max_budget, budget)
+                    self.max_latin_len = max(self.max_latin_len, len(key))
+                    for variant in deletions(key, budget):
+                        self._deletes.setdefault(variant, []).append(key)
+
+    def _match_token(self, token: str) -> Optional[Tuple[str, str]]:
+        entry = self._phrases.get(token) or self._exact.get(token)
+        if entry is not None:
+            return entry
+        if is_vietnamese(token):
+            return self._syllables.get(strip_tones(token))
+
+        token = fold_latin(token)
+        entry = self._latin.get(token)
+        if entry is not None or not self._deletes:
+            return entry
+        # General edits for long terms: shared deletion variants, then verify
+        if not 7 - self.max_budget <= len(token) <= self.max_latin_len + 2:
+            return None
+        for variant in deletions(token, self.max_budget):
+            for key in self._deletes.get(variant, ()):
+                budget = edit_budget(key)
+                if bounded_distance(token, key, budget) <= budget:
+                    return self._latin[key]
+        return None
+
+    def search(self, text: str) -> Optional[Tuple[str, str, str]]:
+        tokens = tokenize(text)
+        for i, (token, start, end) in enumerate(tokens):
+            if token not in self.allowlist:
+                try:
+                    entry = self._cache[token]
+                except KeyError:
+                    entry = self._match_token(token)
+                    if len(self._cache) < MATCH_CACHE_SIZE:
+                        self._cache[token] = entry
+                if entry is not None:
+                    return text[start:end], entry[0], entry[1]
+            # Multi-word terms spread over the following tokens
+            joined = token
+            for token_next, _, end_next in tokens[i + 1 : i + MAX_SPAN_TOKENS]:
+                if joined not in self._phrase_prefixes:
+                    break
+                # Both sides are collapsed already; only the seam can repeat
+                if joined[-1] == token_next[0]:
+                    token_next = token_next[1:]
+                joined += token_next
+                entry = self._phrases.get(joined)
+                if entry is not None and joined not in self.allowlist:
+                    return text[start:end_next], entry[0], entry[1]
+        return None
@@ -0,0 +1,194 @@
+"""
+Hedged calls: re-issue a slow call on a second backend and keep the winner.
+
+Hedger tracks recent call latencies. With hedging on, a call that is still
+running after the GEMINI_HEDGE_PERCENTILE latency gets a backup attempt
+(the caller supplies one on a different API key). The first attempt to
+succeed wins. The loser is cancelled if it has not started; otherwise its
+result is dropped, and its own timeout bounds it. A backup that cannot
+start right away raises HedgeSkipped and the call goes on unhedged. Hedge,
+skip and win rates and the time saved on won hedges are reported by
+get_status().
+
+Environment:
+    GEMINI_HEDGE             Enable hedging (default off)
+    GEMINI_HEDGE_PERCENTILE  Latency percentile that triggers a hedge (default 0.95)
+    GEMINI_HEDGE_MIN_SAMPLES Latencies needed before hedging starts (default 20)
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+from src.utils.tracing import trace_event
+
+T = TypeVar("T")
+
+
+class HedgeSkipped(Exception):
+    """Raised by a backup that cannot start right away"""
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class Hedger:
+    """
+    Latency-triggered hedging for blocking calls.
+    - run(primary, backup, timeout) returns the first successful result
+    - Without hedging (or before enough samples) primary runs inline
+    """
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        percentile: float = None,
+        min_samples: int = None,
+        window: int = 256,
+        max_workers: int = 16,
+    ):
+        if enabled is None:
+            enabled = os.getenv("GEMINI_HEDGE", "").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.percentile = percentile or float(
+            os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95")
+        )
+        self.min_samples = min_samples or int(
+            os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "20")
+        )
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="gemini-hedge"
+        )
+        self.calls = 0
+        self.hedged = 0
+        self.skipped = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if not enough data yet"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return _percentile(sorted(self._latencies), self.percentile)
+
+    def _submit(self, fn: Callable[[], T]) -> Future:
+        # Each attempt gets its own copy so trace/priority context follows it
+        return self._pool.submit(contextvars.copy_context().run, fn)
+
+    def run(
+        self,
+        primary: Callable[[], T],
+        backup: Optional[Callable[[], T]],
+        timeout: float,
+    ) -> T:
+        start = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+
+        delay = self.hedge_delay() if self.enabled and backup is not None else None
+        if delay is None or delay >= timeout:
+            result = primary()
+            self.record(time.perf_counter() - start)
+            return result
+
+        first = self._submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            result = first.result()
+            self.record(time.perf_counter() - start)
+            return result
+
+        trace_event("gemini_hedge", after_ms=round(delay * 1000, 3))
+        backup_start = time.perf_counter()
+        second = self._submit(backup)
+        with self._lock:
+            self.hedged += 1
+
+        pending = {first, second}
+        errors = {}
+        deadline = start + timeout
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=max(0.0, deadline - time.perf_counter()),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for future in done:
+                if isinstance(future.exception(), HedgeSkipped):
+                    with self._lock:
+                        self.hedged -= 1
+                        self.skipped += 1
+                    trace_event("gemini_hedge_skipped")
+                    continue
+                if future.exception() is not None:
+                    errors[future] = future.exception()
+                    continue
+                for other in pending:
+                    other.cancel()
+                elapsed = time.perf_counter() - start
+                if future is second:
+                    self._on_backup_win(first, start, elapsed)
+                    self.record(time.perf_counter() - backup_start)
+                else:
+                    self.record(elapsed)
+                trace_event(
+                    "gemini_hedge_result",
+                    winner="backup" if future is second else "primary",
+                )
+                return future.result()
+
+        for future in pending:
+            future.cancel()
+        # Prefer the primary's error so quota handling sees the current key
+        raise errors.get(first) or errors.get(second) or TimeoutError(
+            "Gemini call exceeded its deadline"
+        )
+
+    def _on_backup_win(self, primary: Future, start: float, won_after: float):
+        with self._lock:
+            self.hedge_wins += 1
+
+        def measure(future: Future):
+            # How much sooner the answer came than the primary would have
+            if not future.cancelled() and future.exception() is None:
+                with self._lock:
+                    self.saved_seconds += time.perf_counter() - start - won_after
+
+        primary.add_done_callback(measure)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            status = {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "hedges_skipped": self.skipped,
+                "hedge_wins": self.hedge_wins,
+                "saved_ms_per_win": (
+                    round(self.saved_seconds * 1000 / self.hedge_wins, 1)
+                    if self.hedge_wins
+                    else 0.0
+                ),
+            }
+        if latencies:
+            status["p50_ms"] = round(_percentile(latencies, 0.5) * 1000, 1)
+            status["p95_ms"] = round(_percentile(latencies, 0.95) * 1000, 1)
+            status["p99_ms"] = round(_percentile(latencies, 0.99) * 1000, 1)
+        return status
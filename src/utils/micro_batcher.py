@@ -0,0 +1,116 @@
+"""
+Cross-request micro-batching for model calls.
+
+Each Gemini call carries a fixed prompt (instructions, category guidelines)
+that is much larger than the comment it asks about. MicroBatcher gathers
+items submitted by any thread (any in-flight request) for a short window,
+or until max_batch are waiting, and hands them to process_batch in one go.
+Every submitter gets a Future for its own item's result, so verdicts are
+routed back to the request that asked for them.
+
+A batch is flushed window_ms after its first item arrived, so an item
+waits at most one window plus the batch call itself. Flushed batches run
+on a small thread pool and a slow batch does not hold up the next window.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """
+    Time/size-bounded batch collector.
+    - submit(item) returns a Future for that item's result
+    - process_batch(items) must return one result per item, in order; an
+      exception fails every item of the batch
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        window_ms: float,
+        max_batch: int,
+        max_workers: int = 4,
+        name: str = "batcher",
+    ):
+        self.process_batch = process_batch
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._queue = []  # (item, future)
+        self._first_at = 0.0
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self._collector = threading.Thread(
+            target=self._collect, name=f"{name}-collector", daemon=True
+        )
+        self._collector.start()
+        self.batches = 0
+        self.items = 0
+        self.full_batches = 0
+        self.largest = 0
+
+    def submit(self, item) -> Future:
+        future = Future()
+        with self._cond:
+            if not self._queue:
+                self._first_at = time.monotonic()
+            self._queue.append((item, future))
+            self._cond.notify()
+        return future
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                while len(self._queue) < self.max_batch:
+                    left = self._first_at + self.window - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch = self._queue[: self.max_batch]
+                del self._queue[: self.max_batch]
+                if self._queue:
+                    # Leftovers start their own window now
+                    self._first_at = time.monotonic()
+
+            self.batches += 1
+            self.items += len(batch)
+            self.full_batches += len(batch) == self.max_batch
+            self.largest = max(self.largest, len(batch))
+            self._pool.submit(self._run, batch)
+
+    def _run(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            results = self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"Batch returned {len(results)} results for {len(batch)} items"
+                )
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def get_status(self) -> Dict:
+        with self._cond:
+            waiting = len(self._queue)
+        return {
+            "window_ms": round(self.window * 1000, 1),
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (
+                round(self.items / self.batches, 2) if self.batches else 0.0
+            ),
+            "full_batches": self.full_batches,
+            "largest_batch": self.largest,
+            "waiting": waiting,
+        }
@@ -0,0 +1,174 @@
+"""
+Per-pattern cost profiling and backtracking checks for the regex layer.
+
+PatternProfiler records, for every blacklist pattern, how often it is
+evaluated, how often it fires, its total and worst-case evaluation time and
+the input that produced the worst case. It is opt-in (TOXICITY_PROFILE=1 or
+ToxicityAnalyzer.enable_profiling()) because timing every pattern adds
+overhead to the hot loop.
+
+check_superlinear() is the offline half: it times each pattern against
+adversarial strings of growing length and flags patterns whose running time
+grows faster than linearly.
+"""
+
+import csv
+import json
+import math
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+WORST_INPUT_CHARS = 200
+
+
+class PatternProfiler:
+    """Thread-safe per-pattern evaluation statistics"""
+
+    def __init__(self, patterns: List[Tuple[str, str]]):
+        self.patterns = patterns
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = [
+                {"evals": 0, "hits": 0, "total_s": 0.0, "max_s": 0.0, "worst_input": ""}
+                for _ in self.patterns
+            ]
+
+    def record(self, index: int, elapsed: float, hit: bool, text: str):
+        with self._lock:
+            entry = self.stats[index]
+            entry["evals"] += 1
+            entry["total_s"] += elapsed
+            if hit:
+                entry["hits"] += 1
+            if elapsed > entry["max_s"]:
+                entry["max_s"] = elapsed
+                entry["worst_input"] = text[:WORST_INPUT_CHARS]
+
+    def report(self) -> List[Dict]:
+        """Per-pattern rows, most expensive first"""
+        with self._lock:
+            rows = []
+            for index, ((pattern, label), entry) in enumerate(
+                zip(self.patterns, self.stats)
+            ):
+                evals = entry["evals"]
+                rows.append(
+                    {
+                        "index": index,
+                        "label": label,
+                        "pattern": pattern,
+                        "evals": evals,
+                        "hits": entry["hits"],
+                        "hit_rate": round(entry["hits"] / evals, 6) if evals else 0.0,
+                        "total_ms": round(entry["total_s"] * 1000, 3),
+                        "mean_us": (
+                            round(entry["total_s"] / evals * 1e6, 3) if evals else 0.0
+                        ),
+                        "max_us": round(entry["max_s"] * 1e6, 3),
+                        "worst_input": entry["worst_input"],
+                    }
+                )
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def export(self, path: str):
+        """Write the report as JSON, or CSV when path ends in .csv"""
+        rows = self.report()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+# ============================================================================
+# Offline super-linearity check
+# ============================================================================
+
+
+def _leading_alternatives(pattern: str) -> List[str]:
+    """First alternatives of the pattern's leading group, e.g. \\b(cháu|bé)..."""
+    match = re.match(r"^(?:\\b)?\((.*?)\)", pattern)
+    if not match:
+        return []
+    return [alt for alt in match.group(1).split("|") if alt and "\\" not in alt][:3]
+
+
+def adversarial_inputs(pattern: str, length: int) -> Dict[str, str]:
+    """
+    Inputs that tend to make backtracking matchers work hardest: the
+    pattern's own leading words repeated without a completing suffix, dotted
+    evasion-like runs and long words without boundaries.
+    """
+    inputs = {
+        "dotted": ("l." * length)[:length],
+        "no_boundary": "a" * length,
+        "words": ("ab " * length)[:length],
+    }
+    for alt in _leading_alternatives(pattern):
+        unit = alt + " "
+        inputs[f"repeat:{alt}"] = (unit * (length // len(unit) + 1))[:length]
+    return inputs
+
+
+def _time_search(compiled, text: str, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compiled.search(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def growth_exponent(lengths: List[int], seconds: List[float]) -> float:
+    """Least-squares slope of log(time) against log(length)"""
+    xs = [math.log(n) for n in lengths]
+    ys = [math.log(max(t, 1e-9)) for t in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    den = sum((x - mean_x) ** 2 for x in xs)
+    return num / den if den else 0.0
+
+
+def check_superlinear(
+    patterns: List[Tuple[str, str]],
+    lengths: Optional[List[int]] = None,
+    threshold: float = 1.5,
+    repeat: int = 3,
+) -> List[Dict]:
+    """
+    Time every pattern on adversarial inputs of growing length.
+
+    Returns one row per (pattern, input family) with the fitted growth
+    exponent; rows with exponent above threshold are marked "superlinear"
+    (1.0 = linear, 2.0 = quadratic).
+    """
+    lengths = lengths or [1000, 2000, 4000, 8000]
+    rows = []
+    for index, (pattern, label) in enumerate(patterns):
+        compiled = re.compile(pattern)
+        for family in adversarial_inputs(pattern, 1):
+            seconds = [
+                _time_search(compiled, adversarial_inputs(pattern, n)[family], repeat)
+                for n in lengths
+            ]
+            exponent = growth_exponent(lengths, seconds)
+            rows.append(
+                {
+                    "index": index,
+                    "label": label,
+                    "family": family,
+                    "exponent": round(exponent, 2),
+                    "max_ms": round(seconds[-1] * 1000, 3),
+                    "superlinear": exponent > threshold
+                    and seconds[-1] > 1e-4,  # ignore noise on trivial timings
+                }
+            )
+    return rows
@@ -0,0 +1,219 @@
+"""
+Priority classes and weighted fair queuing.
+
+Interactive extension scans and bulk jobs share the same workers and the same
+Gemini keys. Work is tagged with a priority class (bound to the request via a
+context variable) and, whenever a slot frees up, the next waiter is chosen by
+weighted fair queuing so bulk traffic keeps moving without starving the
+interactive queue.
+
+Environment:
+    SCHED_WEIGHT_INTERACTIVE  Share weight of interactive work (default 4)
+    SCHED_WEIGHT_BULK         Share weight of bulk work (default 1)
+    GEMINI_MAX_CONCURRENCY    Concurrent Gemini calls per process (default 8)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from src.utils.deadlines import DeadlineExceeded
+from src.utils.tracing import add_timing
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+priority_var: ContextVar[str] = ContextVar("scan_priority", default=INTERACTIVE)
+
+
+def parse_priority(value: Optional[str]) -> str:
+    """Map a client-supplied priority to a known class (default interactive)"""
+    value = (value or "").strip().lower()
+    return value if value in PRIORITY_CLASSES else INTERACTIVE
+
+
+def current_priority() -> str:
+    return priority_var.get()
+
+
+def default_weights() -> Dict[str, float]:
+    return {
+        INTERACTIVE: float(os.getenv("SCHED_WEIGHT_INTERACTIVE", "4")),
+        BULK: float(os.getenv("SCHED_WEIGHT_BULK", "1")),
+    }
+
+
+class LatencyStats:
+    """Rolling queue-latency samples for one priority class"""
+
+    def __init__(self, window: int = 1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        def pct(q):
+            return round(
+                ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3
+            )
+
+        return {
+            "count": self.count,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+
+class WeightedFairQueue:
+    """
+    Per-class FIFO queues served in proportion to their weights.
+    Each class advances a virtual clock by 1/weight per item served; the
+    non-empty class with the smallest clock goes next. Not thread-safe.
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self._queues = {cls: deque() for cls in weights}
+        self._virtual = {cls: 0.0 for cls in weights}
+        self._now = 0.0
+
+    def push(self, cls: str, item):
+        queue = self._queues[cls]
+        if not queue:
+            # A class returning from idle must not bank credit while away
+            self._virtual[cls] = max(self._virtual[cls], self._now)
+        queue.append(item)
+
+    def remove(self, cls: str, item) -> bool:
+        try:
+            self._queues[cls].remove(item)
+            return True
+        except ValueError:
+            return False
+
+    def pop(self):
+        """Return (class, item) for the next waiter, or None when empty"""
+        active = [cls for cls, queue in self._queues.items() if queue]
+        if not active:
+            return None
+        cls = min(active, key=lambda c: self._virtual[c])
+        self._now = self._virtual[cls]
+        self._virtual[cls] += 1.0 / self.weights[cls]
+        return cls, self._queues[cls].popleft()
+
+    def depth(self, cls: Optional[str] = None) -> int:
+        if cls is not None:
+            return len(self._queues[cls])
+        return sum(len(queue) for queue in self._queues.values())
+
+
+class SlotScheduler:
+    """
+    Thread-side concurrency limit with weighted fair hand-off.
+    Used to bound concurrent Gemini calls across all requests.
+    """
+
+    def __init__(self, max_concurrent: int, weights: Optional[Dict] = None):
+        self.max_concurrent = max_concurrent
+        self.available = max_concurrent
+        self._queue = WeightedFairQueue(weights or default_weights())
+        self._lock = threading.Lock()
+        self.stats = {cls: LatencyStats() for cls in PRIORITY_CLASSES}
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Hold one slot for the duration of the block.
+
+        timeout bounds the wait in seconds (None waits indefinitely); when it
+        runs out first the waiter leaves the queue and DeadlineExceeded is
+        raised.
+        """
+        priority = priority or current_priority()
+        start = time.perf_counter()
+
+        waiter = None
+        with self._lock:
+            if self.available > 0 and self._queue.depth() == 0:
+                self.available -= 1
+            else:
+                waiter = threading.Event()
+                self._queue.push(priority, waiter)
+        if waiter is not None and not waiter.wait(
+            None if timeout is None else max(0.0, timeout)
+        ):
+            with self._lock:
+                gave_up = self._queue.remove(priority, waiter)
+            # Otherwise a slot was handed over just as the wait ran out: use it
+            if gave_up:
+                waited = time.perf_counter() - start
+                self.stats[priority].record(waited)
+                add_timing("gemini_queue", waited)
+                raise DeadlineExceeded("No Gemini slot free before the deadline")
+
+        waited = time.perf_counter() - start
+        self.stats[priority].record(waited)
+        add_timing("gemini_queue", waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def slot_now(self, priority: Optional[str] = None):
+        """
+        Hold a slot only if one is free right now, never queueing.
+
+        Yields True while holding it, False (holding nothing) otherwise.
+        """
+        priority = priority or current_priority()
+        with self._lock:
+            held = self.available > 0 and self._queue.depth() == 0
+            if held:
+                self.available -= 1
+        if not held:
+            yield False
+            return
+        self.stats[priority].record(0.0)
+        try:
+            yield True
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            nxt = self._queue.pop()
+            if nxt is not None:
+                nxt[1].set()  # hand the slot straight to the next waiter
+            else:
+                self.available += 1
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_use": self.max_concurrent - self.available,
+                "queue_depth": {
+                    cls: self._queue.depth(cls) for cls in PRIORITY_CLASSES
+                },
+                "queue_latency": {
+                    cls: stats.summary() for cls, stats in self.stats.items()
+                },
+            }
+
+
+# Shared by GeminiAgent and ToxicityAnalyzer
+gemini_slots = SlotScheduler(int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")))
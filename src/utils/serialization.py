@@ -0,0 +1,66 @@
+"""
+Fast JSON encoding and media type negotiation for API responses.
+
+Uses orjson when it is installed and falls back to the standard library
+encoder (with compact separators) otherwise.
+"""
+
+import json
+from typing import Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_accept(header: Optional[str]) -> Dict[str, float]:
+    """Media ranges of an Accept header mapped to their q-values"""
+    ranges = {}
+    for part in (header or "").split(","):
+        media_range, *params = [p.strip() for p in part.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        media_range = media_range.lower()
+        ranges[media_range] = max(q, ranges.get(media_range, 0.0))
+    return ranges
+
+
+def _quality(ranges: Dict[str, float], media_type: str) -> Optional[float]:
+    """q of the most specific range matching media_type, None if none does"""
+    major = media_type.split("/")[0]
+    for candidate in (media_type, f"{major}/*", "*/*"):
+        if candidate in ranges:
+            return ranges[candidate]
+    return None
+
+
+def prefers_media_type(
+    accept: Optional[str], media_type: str, default: str = "application/json"
+) -> bool:
+    """
+    Whether the client asked for media_type over the default representation.
+
+    media_type must be listed explicitly (wildcards only ever select the
+    default) with q > 0, and rank at least as high as the default.
+    """
+    ranges = parse_accept(accept)
+    q = ranges.get(media_type.lower(), 0.0)
+    if q <= 0:
+        return False
+    return q >= (_quality(ranges, default) or 0.0)
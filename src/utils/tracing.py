@@ -0,0 +1,124 @@
+"""
+Per-request timing and trace collection.
+
+A RequestTrace is bound to the current request through a context variable so
+the analyzers can record stage durations and debug events without threading
+extra arguments through every call. When no trace is active every helper in
+this module is a cheap no-op.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar(
+    "request_trace", default=None
+)
+
+
+class RequestTrace:
+    """
+    Collects per-stage durations for one request.
+    - Stage durations accumulate by name (rendered as a Server-Timing header)
+    - With debug enabled, stages nest and carry their own events
+    """
+
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.root: Dict = {"name": "request", "events": [], "stages": []}
+        self._stack: List[Dict] = [self.root]
+
+    def add_timing(self, name: str, seconds: float):
+        """Accumulate a duration (in seconds) under the given stage name"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of work and, in debug mode, nest its events"""
+        node = None
+        if self.debug:
+            node = {"name": name, "events": [], "stages": []}
+            self._stack[-1]["stages"].append(node)
+            self._stack.append(node)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add_timing(name, elapsed)
+            if node is not None:
+                node["dur_ms"] = round(elapsed * 1000, 3)
+                self._stack.pop()
+
+    def event(self, kind: str, **fields):
+        """Attach a debug event to the innermost open stage"""
+        if not self.debug:
+            return
+        entry = {"event": kind, "t_ms": self.elapsed_ms()}
+        entry.update(fields)
+        self._stack[-1]["events"].append(entry)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+    def server_timing_header(self) -> str:
+        """Render durations in Server-Timing syntax (milliseconds)"""
+        parts = [
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.timings.items()
+        ]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict:
+        """Nested trace breakdown for debug responses"""
+        return {
+            "total_ms": self.elapsed_ms(),
+            "timings_ms": {
+                name: round(seconds * 1000, 3) for name, seconds in self.timings.items()
+            },
+            "events": self.root["events"],
+            "stages": self.root["stages"],
+        }
+
+
+@contextmanager
+def start_trace(debug: bool = False):
+    """Bind a fresh RequestTrace to the current context for the block"""
+    trace = RequestTrace(debug=debug)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block against the active trace (no-op without one)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+def add_timing(name: str, seconds: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_timing(name, seconds)
+
+
+def trace_event(kind: str, **fields):
+    """Record a debug event on the active trace (no-op unless debug)"""
+    trace = _current_trace.get()
+    if trace is not None and trace.debug:
+        trace.event(kind, **fields)
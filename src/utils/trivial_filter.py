@@ -0,0 +1,116 @@
+"""
+Prefilter for comments with nothing for Gemini to judge.
+
+A large share of scraped comments are emoji, sticker placeholders, bare
+"@Name" tags, links or one stock word ("ok", "hay", "hóng"). Once the
+keyword layers found nothing in them, an LLM call can only answer "Clean".
+TrivialFilter recognises them with a few rules and character statistics,
+so ToxicityAnalyzer can settle them without escalating:
+
+1. Links, "@Name" tokens and sticker / media placeholders are removed; the
+   words after a tag stay, since a multi-word name cannot be told apart
+   from an insult addressed to the tagged person ("@Lan Đồ Ngu")
+2. What is left is split into words; letters are counted
+3. Fewer than MIN_LETTERS letters (emoji, punctuation, numbers): "No Signal"
+4. Only laughter ("hahaha", "kkk", "=))") and stock words: "Clean"
+
+Anything with a word outside those sets still goes to Gemini. The filter
+runs after the regex and fuzzy layers, so a tag or emoji next to an insult
+is already flagged before it gets here.
+
+Environment:
+    TOXICITY_PREFILTER  Set to 0 to send every keyword miss to Gemini
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from src.utils.fuzzy_match import collapse_repeats
+
+MIN_LETTERS = 2
+MAX_STOCK_WORDS = 4
+
+NO_SIGNAL = "No Signal"
+CLEAN = "Clean"
+
+_URL = re.compile(
+    r"(?:https?://|www\.)\S+|\b[\w-]+(?:\.[\w-]+)*\.(?:com|vn|net|org)\S*"
+)
+_PLACEHOLDER = re.compile(
+    r"[\[(](?:sticker|nhãn dán|gif|image|photo|hình ảnh|ảnh|video|emoji)[\])]",
+    re.IGNORECASE,
+)
+_MENTION = re.compile(r"@[^\s@]+")
+_WORD = re.compile(r"[^\W\d_]+")
+# After repeats collapse: "hahaha", "hjhj", "kkk" -> "k", "hehe", "lol"
+_LAUGHTER = re.compile(r"(?:h[aeiouyjê])+h?|k|k[aeê](?:k[aeê])+|lol")
+
+# Words that carry no verdict on their own (after repeats collapse)
+STOCK_WORDS = set(
+    (
+        "ok oke okay oki okie okela hay like up hóng đúng chuẩn xinh đẹp nice "
+        "good wow yes ừ ừm uh ờ vâng dạ cảm cám ơn thanks thank tks thx quá qá "
+        "wá thật ủng hộ top mình mk bạn bn cũng vậy v nha nhé ạ à nhỉ luôn lắm "
+        "rồi r thế nhiều"
+    ).split()
+)
+
+
+class TrivialFilter:
+    """
+    Rule-and-statistics classifier for no-signal comments.
+    - classify(text) returns (category, reason) or None when the comment
+      needs a real verdict; category is "No Signal" or "Clean"
+    - record(reason) counts a Gemini escalation the filter saved
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.saved = Counter()
+
+    def classify(self, text: str) -> Optional[Tuple[str, str]]:
+        stripped, urls, placeholders, mentions = text, 0, 0, 0
+        # Most comments have none of these; skip the patterns for them
+        if "." in stripped:
+            stripped, urls = _URL.subn(" ", stripped)
+        if "[" in stripped or "(" in stripped:
+            stripped, placeholders = _PLACEHOLDER.subn(" ", stripped)
+        if "@" in stripped:
+            stripped, mentions = _MENTION.subn(" ", stripped)
+
+        words = _WORD.findall(stripped.lower())
+        letters = sum(len(w) for w in words)
+        with self._lock:
+            self.checked += 1
+
+        if letters < MIN_LETTERS:
+            if urls:
+                return NO_SIGNAL, "url"
+            if placeholders:
+                return NO_SIGNAL, "sticker"
+            if mentions:
+                return NO_SIGNAL, "mention"
+            return NO_SIGNAL, "no_text"
+
+        if len(words) > MAX_STOCK_WORDS:
+            return None
+        for word in words:
+            word = collapse_repeats(word)
+            if word not in STOCK_WORDS and not _LAUGHTER.fullmatch(word):
+                return None
+        return CLEAN, "stock_words"
+
+    def record(self, reason: str):
+        with self._lock:
+            self.saved[reason] += 1
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "saved_escalations": sum(self.saved.values()),
+                "by_reason": dict(self.saved),
+            }
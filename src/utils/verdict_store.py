@@ -0,0 +1,265 @@
+"""
+Memory-mapped, hash-indexed store of comment verdicts.
+
+The store file is one open-addressing hash table of fixed-size 64-byte
+records keyed by the 64-bit comment hash (the same 16 hex characters the
+delta store uses). Readers map it read-only and probe it in place, so
+any number of worker processes share one copy through the page cache and
+a lookup copies only the record it returns.
+
+The table is never written by readers. New verdicts go to append-only
+logs (VerdictLog; each record is one O_APPEND write, safe across
+processes), and compact() folds logs into a fresh table that replaces
+the old file atomically. Open stores notice the new file and remap it.
+
+Record layout (little-endian): key u64, confidence f32, updated u32
+(epoch seconds), is_toxic u8, category (UTF-8, NUL-padded, 47 bytes).
+
+Usage:
+    python -m src.utils.verdict_store compact verdicts.vdb new.log --base verdicts.vdb
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from src.utils.delta_store import text_hash
+
+MAGIC = b"VCGV"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHQQ")  # magic, version, record size, capacity, count
+CATEGORY_BYTES = 47
+RECORD = struct.Struct(f"<QfIB{CATEGORY_BYTES}s")
+RECORD_SIZE = RECORD.size
+HEADER_SIZE = RECORD_SIZE  # Padded so every record stays 64-byte aligned
+_KEY = struct.Struct("<Q")
+
+
+def comment_key(text: str) -> int:
+    """64-bit key of a comment; 0 marks an empty slot so it is never used"""
+    return int(text_hash(text), 16) or 1
+
+
+def pack_record(
+    key: int,
+    is_toxic: bool,
+    category: str,
+    confidence: float,
+    updated: Optional[int] = None,
+) -> bytes:
+    return RECORD.pack(
+        key,
+        float(confidence),
+        int(updated if updated is not None else time.time()),
+        1 if is_toxic else 0,
+        category.encode("utf-8")[:CATEGORY_BYTES],
+    )
+
+
+def unpack_record(buffer, offset: int = 0) -> Dict:
+    key, confidence, updated, is_toxic, category = RECORD.unpack_from(buffer, offset)
+    return {
+        "is_toxic": bool(is_toxic),
+        "category": category.rstrip(b"\0").decode("utf-8", "ignore"),
+        "confidence": round(confidence, 4),
+        "updated": updated,
+    }
+
+
+class MmapVerdictStore:
+    """
+    Read-only view of a compacted verdict table.
+    - get(text) / lookup(key) probe the mapped file without loading it
+    - The file is re-checked every check_interval seconds and remapped
+      when compact() has replaced it
+    """
+
+    def __init__(self, path: str, check_interval: float = 30.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, capacity, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"{self.path} is not a verdict store (v{VERSION})")
+        # Swap in one assignment; readers holding the old map keep using it
+        self._table = (mm, capacity - 1, count)
+        self._identity = (stat.st_ino, stat.st_mtime_ns)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if (stat.st_ino, stat.st_mtime_ns) != self._identity:
+                self._open()
+
+    def lookup(self, key: int) -> Optional[Dict]:
+        mm, mask, _ = self._table
+        slot = key & mask
+        while True:
+            offset = HEADER_SIZE + slot * RECORD_SIZE
+            found = _KEY.unpack_from(mm, offset)[0]
+            if found == key:
+                self.hits += 1
+                return unpack_record(mm, offset)
+            if found == 0:
+                self.misses += 1
+                return None
+            slot = (slot + 1) & mask
+
+    def get(self, text: str) -> Optional[Dict]:
+        self._maybe_reload()
+        return self.lookup(comment_key(text))
+
+    def __len__(self) -> int:
+        return self._table[2]
+
+    @property
+    def version(self) -> str:
+        """Identity of the mapped file; changes when compact() replaces it"""
+        return "%d:%d" % self._identity
+
+    def get_status(self) -> Dict:
+        _, mask, count = self._table
+        return {
+            "path": self.path,
+            "records": count,
+            "capacity": mask + 1,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class VerdictLog:
+    """Append-only log of new verdicts, shared safely by many processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def append(self, text: str, is_toxic: bool, category: str, confidence: float):
+        os.write(
+            self._fd, pack_record(comment_key(text), is_toxic, category, confidence)
+        )
+
+    def close(self):
+        os.close(self._fd)
+
+
+# ========== COMPACTION ==========
+
+
+def _table_records(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _, _, _, capacity, _ = HEADER.unpack_from(mm, 0)
+    for slot in range(capacity):
+        offset = HEADER_SIZE + slot * RECORD_SIZE
+        if _KEY.unpack_from(mm, offset)[0]:
+            yield mm[offset : offset + RECORD_SIZE]
+
+
+def _log_records(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            record = f.read(RECORD_SIZE)
+            if len(record) < RECORD_SIZE:
+                return  # A torn trailing write is dropped
+            yield record
+
+
+def compact(
+    out_path: str,
+    log_paths: List[str],
+    base_path: Optional[str] = None,
+    load_factor: float = 0.5,
+) -> Dict:
+    """
+    Build a new table from an optional base table plus append logs.
+
+    Later records win: the base first, then each log in order. The table is
+    written next to out_path and renamed over it, so open stores switch to
+    it on their next reload check. Memory use stays flat because records
+    are inserted straight into the mapped output file.
+    """
+    upper_bound = 0
+    if base_path:
+        with open(base_path, "rb") as f:
+            upper_bound += HEADER.unpack(f.read(HEADER.size))[4]
+    for path in log_paths:
+        upper_bound += os.path.getsize(path) // RECORD_SIZE
+
+    capacity = 16
+    while capacity * load_factor < upper_bound:
+        capacity *= 2
+    mask = capacity - 1
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb+") as f:
+        f.truncate(HEADER_SIZE + capacity * RECORD_SIZE)
+        mm = mmap.mmap(f.fileno(), 0)
+
+    sources = [_table_records(base_path)] if base_path else []
+    sources += [_log_records(path) for path in log_paths]
+
+    count = 0
+    for source in sources:
+        for record in source:
+            key = _KEY.unpack_from(record)[0]
+            slot = key & mask
+            while True:
+                offset = HEADER_SIZE + slot * RECORD_SIZE
+                found = _KEY.unpack_from(mm, offset)[0]
+                if found == 0:
+                    count += 1
+                    break
+                if found == key:
+                    break
+                slot = (slot + 1) & mask
+            mm[offset : offset + RECORD_SIZE] = record
+
+    HEADER.pack_into(mm, 0, MAGIC, VERSION, RECORD_SIZE, capacity, count)
+    mm.flush()
+    mm.close()
+    os.replace(tmp_path, out_path)
+    return {"records": count, "capacity": capacity, "input_records": upper_bound}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verdict store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_cmd = sub.add_parser("compact", help="Fold append logs into a table")
+    compact_cmd.add_argument("output")
+    compact_cmd.add_argument("logs", nargs="*")
+    compact_cmd.add_argument("--base", help="Existing table to start from")
+    compact_cmd.add_argument("--load-factor", type=float, default=0.5)
+    args = parser.parse_args()
+
+    stats = compact(args.output, args.logs, args.base, args.load_factor)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
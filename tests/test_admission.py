@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from src.utils.admission import DEGRADED, FULL, AdmissionController, Overloaded
+from src.utils.scheduling import BULK, INTERACTIVE
+
+WEIGHTS = {INTERACTIVE: 4, BULK: 1}
+
+
+def controller(**kwargs):
+    options = dict(
+        max_in_flight=1,
+        max_queue=4,
+        queue_timeout=0.05,
+        overload_mode="degrade",
+        retry_after=7,
+        weights=WEIGHTS,
+    )
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_admits_up_to_the_in_flight_limit():
+    async def scenario():
+        admission = controller(max_in_flight=2)
+        first = await admission.acquire()
+        second = await admission.acquire()
+        assert first.mode == second.mode == FULL
+        assert admission.in_flight == 2
+        admission.release(first)
+        admission.release(second)
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_degrades():
+    async def scenario():
+        admission = controller()
+        held = await admission.acquire()
+        ticket = await admission.acquire()
+        assert ticket.mode == DEGRADED and ticket.degraded
+        admission.release(ticket)  # degraded tickets hold no slot
+        assert admission.in_flight == 1
+        assert admission.waiting == 0
+        admission.release(held)
+        assert admission.get_status()["degraded"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_rejects_in_reject_mode():
+    async def scenario():
+        admission = controller(overload_mode="reject")
+        await admission.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire()
+        assert shed.value.retry_after == 7
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_at_once():
+    async def scenario():
+        admission = controller(max_queue=0, queue_timeout=10)
+        await admission.acquire()
+        with pytest.raises(Overloaded):
+            await asyncio.wait_for(admission.acquire(), 1)
+        assert admission.get_status()["rejected"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_released_slot_goes_to_a_waiter():
+    async def scenario():
+        admission = controller(queue_timeout=5)
+        held = await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire(BULK))
+        await asyncio.sleep(0.01)
+        admission.release(held)
+        ticket = await waiter
+        assert ticket.mode == FULL and ticket.priority == BULK
+        assert admission.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        admission = controller(queue_timeout=5)
+        held = await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.waiting == 0
+        admission.release(held)
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_interactive_waiters_are_served_first():
+    async def scenario():
+        admission = controller(max_queue=8, queue_timeout=5)
+        held = await admission.acquire()
+        order = []
+
+        async def wait(priority):
+            ticket = await admission.acquire(priority)
+            order.append(priority)
+            admission.release(ticket)
+
+        tasks = [asyncio.ensure_future(wait(BULK)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        tasks += [asyncio.ensure_future(wait(INTERACTIVE)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        admission.release(held)
+        await asyncio.gather(*tasks)
+        # Bulk keeps moving, but at a quarter of the interactive rate
+        assert order[:5].count(BULK) == 1
+        assert order.count(BULK) == 2
+
+    asyncio.run(scenario())
+
+
+def test_unknown_overload_mode_is_refused():
+    with pytest.raises(ValueError):
+        controller(overload_mode="drop")
@@ -0,0 +1,80 @@
+import pytest
+
+from src.utils.article_compaction import (
+    CHARS_PER_TOKEN,
+    clean_lines,
+    compact_article,
+    sentence_score,
+)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "Like · Share · Comment",
+        "Thích",
+        "Xem thêm",
+        "Tin liên quan: Giá vàng hôm nay tăng mạnh",
+        "Đăng nhập | Đăng ký",
+        "Quảng cáo",
+        "© 2024 Báo Điện tử",
+        "Copyright 2024 VnNews. All rights reserved.",
+        "Bản quyền thuộc về Báo Tuổi Trẻ",
+        "Trang chủ » Thời sự » Xã hội",
+        "125 lượt thích",
+        "----- ••• -----",
+    ],
+)
+def test_boilerplate_lines_are_dropped(line):
+    kept, dropped = clean_lines(line)
+    assert kept == []
+    assert dropped["boilerplate"] == 1
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "Đăng ký kết hôn tăng 20% trong năm 2023, theo Bộ Tư pháp.",
+        "Quảng cáo sai sự thật về thực phẩm chức năng bị phạt 50 triệu đồng.",
+        "Xem thêm các quy định mới, người dân cần chuẩn bị giấy tờ.",
+        "Vụ vi phạm bản quyền phần mềm gây thiệt hại hàng tỷ đồng cho doanh nghiệp.",
+        "Copyright là khái niệm người dân còn chưa hiểu rõ.",
+        "Thích nghi với biến đổi khí hậu là ưu tiên hàng đầu của tỉnh.",
+        "Ông A cho biết: " + "chi tiết vụ việc " * 10 + "all rights reserved.",
+    ],
+)
+def test_real_sentences_survive(line):
+    kept, dropped = clean_lines(line)
+    assert kept == [line]
+    assert dropped["boilerplate"] == 0
+
+
+def test_repeated_lines_are_dropped_once_seen():
+    kept, dropped = clean_lines("Tiêu đề bài\nNội dung\ntiêu đề   bài")
+    assert kept == ["Tiêu đề bài", "Nội dung"]
+    assert dropped["duplicate"] == 1
+
+
+def test_claims_outscore_filler():
+    claim = "Theo Bộ Y tế, ngày 12/3 có 1.200 ca mắc mới tại Hà Nội."
+    filler = "Mọi người hãy cùng nhau chung tay vì một cộng đồng tốt đẹp hơn."
+    assert sentence_score(claim) > sentence_score(filler)
+    assert sentence_score("Ngắn quá.") == 0.0
+
+
+def test_short_article_is_only_cleaned():
+    text = "Like · Share\nGiá xăng tăng 500 đồng từ ngày mai."
+    output, stats = compact_article(text, token_budget=100)
+    assert output == "Giá xăng tăng 500 đồng từ ngày mai."
+    assert stats["sentences_total"] == 0
+
+
+def test_long_article_keeps_lede_and_fits_budget():
+    lede = "Chính phủ công bố gói hỗ trợ mới cho người lao động."
+    filler = " ".join(["Người dân bày tỏ sự quan tâm tới chính sách này."] * 40)
+    claim = "Theo Bộ Tài chính, gói hỗ trợ trị giá 26.000 tỷ đồng từ ngày 1/7."
+    output, stats = compact_article("\n".join([lede, filler, claim]), token_budget=40)
+    assert output.startswith(lede)
+    assert claim in output
+    assert len(output) <= 40 * CHARS_PER_TOKEN
+    assert stats["sentences_kept"] < stats["sentences_total"]
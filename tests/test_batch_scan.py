@@ -0,0 +1,67 @@
+import argparse
+import json
+
+import batch_scan
+from src.models.sentiment import SentimentAnalyzer
+
+
+def test_read_rows_skips_json_values_that_are_not_rows(tmp_path):
+    dump = tmp_path / "dump.jsonl"
+    lines = ['"plain text"', '{"text": "an object", "id": 7}', "42", "null", "[1]"]
+    dump.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    skipped = []
+    rows = list(
+        batch_scan.read_rows(
+            str(dump), "jsonl", "text", on_skip=lambda n, r: skipped.append(n)
+        )
+    )
+    assert rows == [("plain text", {}), ("an object", {"id": 7})]
+    assert skipped == [3, 4, 5]
+
+
+class Analyzer:
+    """iter_analyze stand-in: first comment settled, second incomplete"""
+
+    def iter_analyze(self, texts, use_ai=True):
+        yield {"Index": 0, "Is Toxic": True, "Category": "x", "Confidence": 1.0}, 1
+        yield {
+            "Index": 1,
+            "Is Toxic": False,
+            "Category": "Clean",
+            "Confidence": 0.0,
+            "Incomplete": True,
+        }, 1
+
+
+def test_scan_chunk_carries_the_incomplete_flag(monkeypatch):
+    monkeypatch.setattr(batch_scan, "_toxicity", Analyzer())
+    monkeypatch.setattr(batch_scan, "_sentiment", SentimentAnalyzer())
+    verdicts = batch_scan._scan_chunk(["đồ ngu", "bình thường"])
+    assert [v["incomplete"] for v in verdicts] == [False, True]
+
+
+def test_run_reports_skipped_and_incomplete_rows(tmp_path):
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text('"đồ ngu"\n7\n{"text": "bài hay", "id": 1}\n', encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    args = argparse.Namespace(
+        input=str(dump),
+        output=str(output),
+        input_format=None,
+        output_format=None,
+        text_field="text",
+        keep_fields="",
+        workers=1,
+        chunk_size=500,
+        use_ai=False,
+        resume=False,
+        start_offset=0,
+        quiet=True,
+    )
+    summary = batch_scan.run(args)
+    assert summary["scanned"] == 2
+    assert summary["skipped"] == 1
+    assert summary["incomplete"] == 0
+    rows = [json.loads(line) for line in output.read_text("utf-8").splitlines()]
+    assert [row["incomplete"] for row in rows] == [False, False]
+    assert rows[1]["id"] == 1
@@ -0,0 +1,165 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.models import gemini_llm
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.utils.deadlines import MIN_CALL_MS, deadline_var
+from src.utils.scheduling import SlotScheduler
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setenv("BREAKER_MIN_CALLS", "4")
+    monkeypatch.setenv("BREAKER_ERROR_RATE", "0.5")
+    monkeypatch.setenv("BREAKER_OPEN_SECONDS", "0.05")
+    monkeypatch.setenv("BREAKER_SLOW_CALL_MS", "1000")
+    return CircuitBreaker("test")
+
+
+def test_opens_once_failure_rate_is_reached(breaker):
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_success(0.01)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.get_status()["rejected"] == 1
+
+
+def test_slow_success_counts_as_failure(breaker):
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
+
+
+def test_neutral_outcomes_never_open(breaker):
+    for _ in range(20):
+        assert breaker.allow()
+        breaker.record_neutral()
+    assert breaker.state == CLOSED
+    assert breaker.get_status()["window_calls"] == 0
+
+
+def trip(breaker):
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+
+
+def test_half_open_trial_success_closes(breaker):
+    trip(breaker)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial_failure_reopens(breaker):
+    trip(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_neutral_trial_frees_the_trial_slot(breaker):
+    trip(breaker)
+    assert breaker.allow()
+    breaker.record_neutral()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+# ========== generate_json outcome classification ==========
+
+
+class TimingOut:
+    """Client stand-in whose calls time out like httpx does"""
+
+    def __init__(self, error):
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+        self.error = error
+
+    def generate_content(self, **kwargs):
+        raise self.error
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+@pytest.fixture
+def gemini_breaker(breaker, monkeypatch):
+    monkeypatch.setattr(gemini_llm, "gemini_breaker", breaker)
+    monkeypatch.setattr(gemini_llm.hedger, "enabled", False)
+    rotator = SimpleNamespace(backup_key=lambda: None)
+
+    def call(error, budget_s=None):
+        token = deadline_var.set(
+            None if budget_s is None else time.perf_counter() + budget_s
+        )
+        try:
+            with pytest.raises(type(error)):
+                gemini_llm.generate_json(
+                    TimingOut(error), rotator, "toxicity", "prompt"
+                )
+        finally:
+            deadline_var.reset(token)
+
+    return call
+
+
+def test_timeout_under_a_short_client_budget_is_neutral(breaker, gemini_breaker):
+    for _ in range(6):
+        gemini_breaker(ReadTimeout("read timeout"), budget_s=MIN_CALL_MS * 2 / 1000)
+    assert breaker.state == CLOSED
+    assert breaker.get_status()["window_calls"] == 0
+
+
+def test_timeout_with_the_full_call_timeout_is_a_failure(breaker, gemini_breaker):
+    for _ in range(4):
+        gemini_breaker(ReadTimeout("read timeout"))
+    assert breaker.state == OPEN
+
+
+def test_quota_errors_are_neutral(breaker, gemini_breaker):
+    for _ in range(6):
+        gemini_breaker(RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert breaker.state == CLOSED
+
+
+def test_slot_queueing_is_not_backend_latency(monkeypatch):
+    monkeypatch.setenv("BREAKER_MIN_CALLS", "2")
+    monkeypatch.setenv("BREAKER_SLOW_CALL_MS", "50")
+    breaker = CircuitBreaker("test")
+    slots = SlotScheduler(1)
+    monkeypatch.setattr(gemini_llm, "gemini_breaker", breaker)
+    monkeypatch.setattr(gemini_llm, "gemini_slots", slots)
+    monkeypatch.setattr(gemini_llm.hedger, "enabled", False)
+    fast = SimpleNamespace(
+        models=SimpleNamespace(generate_content=lambda **kwargs: "reply")
+    )
+    rotator = SimpleNamespace(backup_key=lambda: None)
+
+    for _ in range(3):
+        with slots.slot():
+            caller = threading.Thread(
+                target=gemini_llm.generate_json,
+                args=(fast, rotator, "toxicity", "prompt"),
+            )
+            caller.start()
+            time.sleep(0.1)  # Queued behind the held slot
+        caller.join()
+    assert breaker.state == CLOSED
+    assert breaker.get_status()["window_failures"] == 0
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from src.utils import deadlines
+from src.utils.deadlines import (
+    CALL_TIMEOUT_MS,
+    MAX_BUDGET_MS,
+    MIN_CALL_MS,
+    DeadlineExceeded,
+    call_timeout,
+    deadline_var,
+    expired,
+    parse_budget,
+    remaining,
+    start_deadline,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_deadline():
+    token = deadline_var.set(None)
+    yield
+    deadline_var.reset(token)
+
+
+def test_parse_budget_clamps_and_defaults():
+    assert parse_budget(None) == deadlines.DEFAULT_BUDGET_MS
+    assert parse_budget("junk") == deadlines.DEFAULT_BUDGET_MS
+    assert parse_budget("1") == MIN_CALL_MS
+    assert parse_budget(str(MAX_BUDGET_MS * 10)) == MAX_BUDGET_MS
+    assert parse_budget("1500") == 1500
+
+
+def test_without_deadline_calls_get_the_full_timeout():
+    assert remaining() is None
+    assert not expired()
+    assert call_timeout() == CALL_TIMEOUT_MS / 1000
+
+
+def test_call_timeout_is_capped_by_time_left():
+    start_deadline(MIN_CALL_MS * 4)
+    timeout = call_timeout()
+    assert timeout <= MIN_CALL_MS * 4 / 1000
+    assert timeout == pytest.approx(remaining(), abs=0.01)
+
+
+def test_spent_time_counts_against_the_budget():
+    start_deadline(1000, spent=0.5)
+    assert remaining() == pytest.approx(0.5, abs=0.01)
+
+
+def test_out_of_time_raises_deadline_exceeded():
+    deadline_var.set(time.perf_counter() + MIN_CALL_MS / 2000)
+    assert expired()
+    with pytest.raises(DeadlineExceeded):
+        call_timeout()
+    # Callers treating timeouts generically still catch it
+    assert issubclass(DeadlineExceeded, TimeoutError)
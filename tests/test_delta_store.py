@@ -0,0 +1,47 @@
+import hashlib
+import time
+
+from src.utils.delta_store import DeltaScanStore, text_hash
+
+FAKE = {"verdict": "Real", "risk_score": 10}
+SENTIMENT = {"label": "Neutral", "score": 0.0}
+TOXIC = {"Is Toxic": True, "Category": "Insult", "Confidence": 0.9}
+CLEAN = {"Is Toxic": False, "Category": "Clean", "Confidence": 0.0}
+
+
+def test_text_hash_matches_sha256_prefix():
+    text = "bình luận có dấu 😀"
+    expected = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    assert text_hash(text) == expected
+
+
+def test_update_merges_verdicts_and_replaces_article():
+    store = DeltaScanStore(max_sessions=4, ttl=60)
+    store.update("a", FAKE, SENTIMENT, {"h1": TOXIC})
+    store.update("a", {"verdict": "Fake"}, SENTIMENT, {"h2": CLEAN})
+    session = store.get("a")
+    assert session["verdicts"] == {"h1": TOXIC, "h2": CLEAN}
+    assert session["fake_check"] == {"verdict": "Fake"}
+
+
+def test_missing_session_is_none():
+    assert DeltaScanStore(max_sessions=4, ttl=60).get("nope") is None
+
+
+def test_least_recently_used_session_is_evicted():
+    store = DeltaScanStore(max_sessions=2, ttl=60)
+    store.update("a", FAKE, SENTIMENT, {})
+    store.update("b", FAKE, SENTIMENT, {})
+    store.get("a")
+    store.update("c", FAKE, SENTIMENT, {})
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get_status()["sessions"] == 2
+
+
+def test_expired_session_is_dropped():
+    store = DeltaScanStore(max_sessions=4, ttl=0.01)
+    store.update("a", FAKE, SENTIMENT, {"h1": CLEAN})
+    time.sleep(0.03)
+    assert store.get("a") is None
+    assert store.get_status()["sessions"] == 0
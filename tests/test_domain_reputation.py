@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from src.utils.domain_reputation import DomainReputation, hostname
+
+TABLE = {
+    "gov.vn": "trusted",
+    "vnexpress.net": {"tier": "trusted", "summary": "Major outlet"},
+    "blog.vnexpress.net": "unknown",
+    "tinhot24h.vn": "unreliable",
+    "weak.vn": {"tier": "trusted", "confidence": 0.5},
+}
+
+
+@pytest.fixture
+def reputation(tmp_path):
+    path = tmp_path / "reputation.json"
+    path.write_text(json.dumps(TABLE), encoding="utf-8")
+    return DomainReputation(path=str(path), min_confidence=0.9)
+
+
+@pytest.mark.parametrize(
+    "url, host",
+    [
+        ("https://E.VnExpress.net./a?b=1", "e.vnexpress.net"),
+        ("vnexpress.net", "vnexpress.net"),
+        ("http://user@chinhphu.gov.vn:8080/x", "chinhphu.gov.vn"),
+        ("", ""),
+        ("http://[::1", None),
+    ],
+)
+def test_hostname(url, host):
+    assert hostname(url) == host
+
+
+def test_most_specific_entry_wins(reputation):
+    assert reputation.lookup("https://chinhphu.gov.vn/a")["verdict"] == "Reliable"
+    assert reputation.lookup("https://e.vnexpress.net/")["summary"] == "Major outlet"
+    assert reputation.lookup("https://tinhot24h.vn/x")["verdict"] == "Likely Fake"
+    assert reputation.lookup("https://blog.vnexpress.net/me") is None
+
+
+def test_unknown_and_low_confidence_hosts_go_to_gemini(reputation):
+    assert reputation.lookup("https://example.com") is None
+    assert reputation.lookup("https://notgov.vn") is None
+    assert reputation.lookup("https://weak.vn") is None
+    assert reputation.get_status()["misses"] == 3
+
+
+def test_malformed_url_falls_through(reputation):
+    assert reputation.lookup("http://[::1") is None
+    assert reputation.lookup("") is None
+
+
+def test_broken_table_keeps_the_old_one(reputation, tmp_path):
+    (tmp_path / "reputation.json").write_text('{"x.vn": "bogus"}', encoding="utf-8")
+    assert not reputation.reload()
+    assert reputation.lookup("https://gov.vn") is not None
+
+
+def test_missing_file_loads_nothing(tmp_path):
+    reputation = DomainReputation(path=str(tmp_path / "missing.json"))
+    assert reputation.version is None
+    assert reputation.lookup("https://gov.vn") is None
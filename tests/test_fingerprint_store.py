@@ -0,0 +1,68 @@
+import time
+
+from src.utils.fingerprint_store import (
+    FingerprintStore,
+    matching_etag,
+    scan_fingerprint,
+)
+
+
+def test_fingerprint_is_stable_and_sized():
+    first = scan_fingerprint("engine", "full", "https://a.vn", ["x", "y"], None)
+    again = scan_fingerprint("engine", "full", "https://a.vn", ["x", "y"], None)
+    assert first == again
+    assert len(first) == 32
+
+
+def test_fingerprint_separates_moved_text():
+    assert scan_fingerprint("ab", "c") != scan_fingerprint("a", "bc")
+    assert scan_fingerprint(["a", "b"]) != scan_fingerprint(["ab"])
+    assert scan_fingerprint(None) != scan_fingerprint("")
+    assert scan_fingerprint([]) != scan_fingerprint(None)
+
+
+def test_matching_etag_weak_comparison_and_lists():
+    etag = '"abc"'
+    assert matching_etag('"abc"', etag)
+    assert matching_etag('W/"abc"', etag)
+    assert matching_etag('"x", "abc"', etag)
+    assert not matching_etag('"abcd"', etag)
+    assert not matching_etag(None, etag)
+    assert not matching_etag("", etag)
+
+
+def test_store_counts_hits_and_misses():
+    store = FingerprintStore(max_entries=10, ttl=60)
+    assert not store.contains("a")
+    store.add("a")
+    assert store.contains("a")
+    status = store.get_status()
+    assert status["not_modified"] == 1
+    assert status["misses"] == 1
+    assert status["entries"] == 1
+
+
+def test_store_evicts_least_recently_used():
+    store = FingerprintStore(max_entries=2, ttl=60)
+    store.add("a")
+    store.add("b")
+    assert store.contains("a")  # b is now the oldest
+    store.add("c")
+    assert store.contains("a")
+    assert store.contains("c")
+    assert not store.contains("b")
+
+
+def test_store_expires_entries():
+    store = FingerprintStore(max_entries=10, ttl=0.01)
+    store.add("a")
+    time.sleep(0.03)
+    assert not store.contains("a")
+    assert store.get_status()["entries"] == 0
+
+
+def test_disabled_store_keeps_nothing():
+    store = FingerprintStore(max_entries=0, ttl=60)
+    assert not store.enabled
+    store.add("a")
+    assert not store.contains("a")
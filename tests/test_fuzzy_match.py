@@ -0,0 +1,141 @@
+import pytest
+
+from src.models.toxicity import ToxicityAnalyzer
+from src.utils.fuzzy_match import (
+    FuzzyMatcher,
+    bounded_distance,
+    deletions,
+    normalize_token,
+    strip_tones,
+    tokenize,
+    vowel_drops,
+)
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return ToxicityAnalyzer.regex_only().fuzzy_matcher
+
+
+def test_normalize_token():
+    assert normalize_token("l.ồ.n") == "lồn"
+    assert normalize_token("sh1t") == "shit"
+    assert normalize_token("nguuuu") == "ngu"
+    assert normalize_token("...") == ""
+
+
+def test_tokenize_joins_single_letters_and_keeps_offsets():
+    text = "đ m  thằng"
+    assert tokenize(text) == [("đm", 0, 3), ("thằng", 5, 10)]
+
+
+def test_strip_tones_keeps_shape_marks():
+    assert strip_tones("đĩ") == "đi"
+    assert strip_tones("lồn") == "lôn"
+
+
+def test_bounded_distance():
+    assert bounded_distance("motherfuker", "motherfucker", 2) == 1
+    assert bounded_distance("abc", "xyz", 1) == 2
+    assert bounded_distance("a", "abcd", 1) == 2
+
+
+def test_deletions_and_vowel_drops():
+    assert deletions("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert vowel_drops("fuck") == {"fck"}
+    assert "ck" not in vowel_drops("ack")  # never the first letter
+
+
+@pytest.mark.parametrize(
+    "text, term",
+    [
+        ("l.ồ.n", "lồn"),
+        ("lổn", "lồn"),
+        ("đ m", "đm"),
+        ("đĩĩĩ", "đĩ"),
+        ("óc chóóó", "óc chó"),
+        ("fck", "fck"),
+        ("phuk you", "fuck"),
+        ("sh1t", "shit"),
+        ("btch", "bitch"),
+        ("wh0re", "whore"),
+        ("motherfuker", "motherfucker"),
+        ("kys", "kys"),
+    ],
+)
+def test_evasion_spellings_match(matcher, text, term):
+    found = matcher.search(text)
+    assert found is not None
+    assert found[1] == term
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "dk rồi bạn ơi",  # được
+        "học cntt ở đâu",  # công nghệ thông tin
+        "slt bao nhiêu",  # số lượng
+        "fk",
+        "sht",
+        "whre are you",
+        "đi chơi không",
+        "đỉ",
+        "đí",
+        "buổi sáng",
+        "lộn xộn",
+        "ngủ ngon",
+        "thích quá",
+        "điểm cao",
+    ],
+)
+def test_everyday_words_do_not_match(matcher, text):
+    assert matcher.search(text) is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "di pho co choi cuoi tuan",
+        "I love pho",
+        "an pho bo ngon",
+        "con da di chich ngua chua",
+        "ăn phở bò",
+        "phố cổ",
+        "điềm tĩnh",
+        "điềm báo",
+    ],
+)
+def test_tone_collisions_are_clean_keyword_scans(text):
+    analyzer = ToxicityAnalyzer.regex_only()
+    assert analyzer._keyword_scan(text.lower()) == (None, None, None)
+
+
+def test_ascii_tokens_are_not_tone_folded():
+    matcher = FuzzyMatcher([("phò", "x"), ("đụ", "x")])
+    assert matcher.search("pho") is None
+    assert matcher.search("phọ") is not None
+    assert matcher.search("đu") is not None  # đ makes it Vietnamese-spelled
+
+
+def test_short_vowel_drops_are_not_registered():
+    matcher = FuzzyMatcher([("dick", "x"), ("slut", "x"), ("bitch", "x")])
+    assert matcher.search("dck") is None
+    assert matcher.search("slt") is None
+    assert matcher.search("btch") is not None
+
+
+def test_tone_exact_only_when_toneless_form_is_allowlisted():
+    strict = FuzzyMatcher([("đĩ", "x")], allowlist=["đi"])
+    assert strict.search("đĩ") is not None
+    assert strict.search("đỉ") is None
+    loose = FuzzyMatcher([("lồn", "x")], allowlist=["lộn"])
+    assert loose.search("lổn") is not None
+    assert loose.search("lộn") is None
+
+
+def test_match_reports_span_as_written(matcher):
+    assert matcher.search("mày là đồ óc   chó") == (
+        "óc   chó",
+        "óc chó",
+        "Insult: Ableism/Intelligence",
+    )
@@ -0,0 +1,87 @@
+import pytest
+
+from src.models.gemini_llm import (
+    MAX_OUTPUT_TOKENS,
+    is_quota_error,
+    parse_response,
+    parse_stats,
+    response_config,
+)
+
+
+def counts(kind):
+    return dict(parse_stats()[kind])
+
+
+def test_clean_json_takes_the_fast_path():
+    before = counts("toxicity")
+    result = parse_response(
+        '{"is_toxic": true, "category": "Insult", "confidence": 1}', "toxicity"
+    )
+    assert result == {"is_toxic": True, "category": "Insult", "confidence": 1.0}
+    assert isinstance(result["confidence"], float)
+    assert counts("toxicity")["ok"] == before["ok"] + 1
+
+
+def test_fenced_reply_is_repaired():
+    before = counts("fake_news")
+    reply = (
+        "Here you go:\n```json\n"
+        '{"risk_score": 7, "verdict": "Likely Fake", "summary": "x"}\n```'
+    )
+    result = parse_response(reply, "fake_news")
+    assert result["verdict"] == "Likely Fake"
+    assert counts("fake_news")["repaired"] == before["repaired"] + 1
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        "not json at all",
+        '{"is_toxic": "yes", "category": "Insult", "confidence": 0.5}',
+        '{"is_toxic": true, "category": "Insult"}',
+        '{"is_toxic": true, "category": "Insult", "confidence": true}',
+        '["is_toxic"]',
+    ],
+)
+def test_invalid_replies_fail(reply):
+    before = counts("toxicity")
+    assert parse_response(reply, "toxicity") is None
+    assert counts("toxicity")["failed"] == before["failed"] + 1
+
+
+def test_enum_is_enforced():
+    reply = '{"risk_score": 1, "verdict": "Totally True", "summary": "x"}'
+    assert parse_response(reply, "fake_news") is None
+
+
+def test_batch_keeps_valid_items_only():
+    reply = (
+        '```[{"id": 1, "is_toxic": false, "category": "Clean", "confidence": 0.1},'
+        ' {"id": 2, "is_toxic": true},'
+        ' {"id": 3, "is_toxic": true, "category": "Scam", "confidence": 0.8}]```'
+    )
+    result = parse_response(reply, "toxicity_batch")
+    assert [item["id"] for item in result] == [1, 3]
+    assert parse_response('{"id": 1}', "toxicity_batch") is None
+
+
+def test_failure_rate_is_reported():
+    stats = parse_stats()["toxicity"]
+    total = stats["ok"] + stats["repaired"] + stats["failed"]
+    assert stats["failure_rate"] == round(stats["failed"] / total, 4)
+
+
+def test_response_config_caps_tokens_and_timeout():
+    config = response_config("toxicity", timeout=2.5)
+    assert config.response_mime_type == "application/json"
+    assert config.max_output_tokens == MAX_OUTPUT_TOKENS["toxicity"]
+    assert config.http_options.timeout == 2500
+    assert response_config("toxicity_batch", max_tokens=640).max_output_tokens == 640
+    assert response_config("fake_news").http_options is None
+
+
+def test_quota_errors_are_recognised():
+    assert is_quota_error(RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert is_quota_error(RuntimeError("Quota exceeded for metric"))
+    assert not is_quota_error(RuntimeError("503 Service Unavailable"))
@@ -0,0 +1,167 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.models import gemini_llm
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.hedging import HedgeSkipped, Hedger
+from src.utils.scheduling import SlotScheduler
+
+
+def primed(delay_s=0.02, samples=5):
+    hedger = Hedger(enabled=True, percentile=0.5, min_samples=samples)
+    for _ in range(samples):
+        hedger.record(delay_s)
+    return hedger
+
+
+def test_disabled_runs_primary_inline():
+    hedger = Hedger(enabled=False)
+    caller = threading.current_thread()
+    seen = []
+    assert (
+        hedger.run(lambda: seen.append(threading.current_thread()) or 1, None, 1) == 1
+    )
+    assert seen == [caller]
+    assert hedger.get_status()["hedged"] == 0
+
+
+def test_no_hedge_before_enough_samples():
+    hedger = Hedger(enabled=True, percentile=0.5, min_samples=3)
+    assert hedger.hedge_delay() is None
+    assert hedger.run(lambda: "primary", lambda: "backup", 1) == "primary"
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = primed(delay_s=0.5)
+    assert hedger.run(lambda: "primary", lambda: "backup", 2) == "primary"
+    assert hedger.get_status()["hedged"] == 0
+
+
+def test_slow_primary_loses_to_backup():
+    hedger = primed()
+    release = threading.Event()
+
+    def slow():
+        release.wait(1)
+        return "primary"
+
+    try:
+        assert hedger.run(slow, lambda: "backup", 2) == "backup"
+    finally:
+        release.set()
+    status = hedger.get_status()
+    assert status["hedged"] == 1
+    assert status["hedge_wins"] == 1
+
+
+def test_failed_backup_still_waits_for_primary():
+    hedger = primed()
+
+    def slow():
+        time.sleep(0.1)
+        return "primary"
+
+    def broken():
+        raise RuntimeError("backup down")
+
+    assert hedger.run(slow, broken, 2) == "primary"
+
+
+def test_both_failing_raises_the_primary_error():
+    hedger = primed()
+
+    def slow_fail():
+        time.sleep(0.05)
+        raise ValueError("primary")
+
+    def fail():
+        raise RuntimeError("backup")
+
+    with pytest.raises(ValueError):
+        hedger.run(slow_fail, fail, 2)
+
+
+def test_timeout_when_neither_answers():
+    hedger = primed()
+    release = threading.Event()
+    try:
+        with pytest.raises(TimeoutError):
+            hedger.run(lambda: release.wait(1), lambda: release.wait(1), 0.1)
+    finally:
+        release.set()
+
+
+def test_skipped_backup_leaves_the_call_unhedged():
+    hedger = primed()
+
+    def slow():
+        time.sleep(0.1)
+        return "primary"
+
+    def no_slot():
+        raise HedgeSkipped("busy")
+
+    assert hedger.run(slow, no_slot, 2) == "primary"
+    status = hedger.get_status()
+    assert status["hedged"] == 0
+    assert status["hedges_skipped"] == 1
+
+
+# ========== generate_json ==========
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """generate_json over one slot, a primed hedger and a backup key"""
+    hedger = primed(delay_s=0.05)
+    slots = SlotScheduler(1)
+    monkeypatch.setattr(gemini_llm, "hedger", hedger)
+    monkeypatch.setattr(gemini_llm, "gemini_slots", slots)
+    monkeypatch.setattr(gemini_llm, "gemini_breaker", CircuitBreaker("test"))
+    backups = []
+
+    def backup_client(key):
+        backups.append(key)
+        return Client(0)
+
+    monkeypatch.setattr(gemini_llm, "client_for_key", backup_client)
+    rotator = SimpleNamespace(backup_key=lambda: "backup-key")
+
+    def call(client):
+        return gemini_llm.generate_json(client, rotator, "toxicity", "prompt")
+
+    return SimpleNamespace(hedger=hedger, slots=slots, backups=backups, call=call)
+
+
+class Client:
+    def __init__(self, delay_s):
+        self.delay_s = delay_s
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def generate_content(self, **kwargs):
+        time.sleep(self.delay_s)
+        return self.delay_s
+
+
+def test_slot_wait_does_not_start_the_hedge_clock(gemini):
+    replies = []
+    with gemini.slots.slot():
+        caller = threading.Thread(target=lambda: replies.append(gemini.call(Client(0))))
+        caller.start()
+        time.sleep(0.15)  # Queued well past the hedge delay
+    caller.join(2)
+    assert replies == [0]
+    assert gemini.backups == []
+    assert gemini.hedger.get_status()["hedged"] == 0
+    assert max(gemini.hedger._latencies) < 0.1
+
+
+def test_backup_does_not_queue_for_a_slot(gemini):
+    assert gemini.call(Client(0.15)) == 0.15
+    status = gemini.hedger.get_status()
+    assert status["hedged"] == 0
+    assert status["hedges_skipped"] == 1
+    assert gemini.backups == []
@@ -0,0 +1,95 @@
+import io
+import json
+import logging
+import sys
+
+from src.utils import logger as logger_module
+from src.utils.logger import (
+    ROOT_LOGGER_NAME,
+    ContextFilter,
+    JSONFormatter,
+    get_logger,
+    request_id_var,
+)
+
+
+def make_record(msg="hello %s", args=("world",), level=logging.INFO, **extra):
+    record = logging.LogRecord(
+        f"{ROOT_LOGGER_NAME}.test", level, __file__, 1, msg, args, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_formatter_emits_one_json_object_with_extras():
+    record = make_record(url="https://a.vn", comments=3)
+    record.request_id = "req-1"
+    line = JSONFormatter().format(record)
+    entry = json.loads(line)
+    assert "\n" not in line
+    assert entry["msg"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "req-1"
+    assert entry["url"] == "https://a.vn"
+    assert entry["comments"] == 3
+    assert "args" not in entry and "lineno" not in entry
+
+
+def test_formatter_keeps_unicode_and_stringifies_objects():
+    entry = json.loads(JSONFormatter().format(make_record(text="đồ", obj=object())))
+    assert entry["text"] == "đồ"
+    assert entry["obj"].startswith("<object")
+
+
+def test_formatter_includes_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record()
+        record.exc_info = sys.exc_info()
+    entry = json.loads(JSONFormatter().format(record))
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_filter_attaches_request_id():
+    token = request_id_var.set("abc")
+    try:
+        record = make_record()
+        assert ContextFilter().filter(record)
+        assert record.request_id == "abc"
+    finally:
+        request_id_var.reset(token)
+
+
+def test_filter_samples_debug_only():
+    dropping = ContextFilter(sample_rate=0.0)
+    assert not dropping.filter(make_record(level=logging.DEBUG))
+    assert dropping.filter(make_record(level=logging.INFO))
+
+
+def test_get_logger_is_a_package_child():
+    logger = get_logger("toxicity")
+    assert logger.name == f"{ROOT_LOGGER_NAME}.toxicity"
+    assert not logging.getLogger(ROOT_LOGGER_NAME).propagate
+
+
+def test_exceptions_survive_the_queue():
+    get_logger("test")  # Logging is configured on first use
+    listener = logger_module._listener
+    handler = listener.handlers[0]
+    stream = io.StringIO()
+    previous = handler.setStream(stream)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("test").exception("failed %s", "hard", extra={"step": 2})
+        # Stopping drains the queue; restart for the rest of the session
+        listener.stop()
+        listener.start()
+    finally:
+        handler.setStream(previous)
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry["msg"] == "failed hard"
+    assert entry["step"] == 2
+    assert "ValueError: boom" in entry["exc"]
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    def __init__(self, fail=False, short=False):
+        self.batches = []
+        self.fail = fail
+        self.short = short
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+        if self.fail:
+            raise RuntimeError("backend down")
+        results = [item * 10 for item in items]
+        return results[:-1] if self.short else results
+
+
+def test_items_in_one_window_share_a_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, window_ms=50, max_batch=16)
+    futures = [batcher.submit(i) for i in range(5)]
+    assert [f.result(2) for f in futures] == [0, 10, 20, 30, 40]
+    assert recorder.batches == [[0, 1, 2, 3, 4]]
+    assert batcher.get_status()["avg_batch_size"] == 5
+
+
+def test_full_batch_flushes_before_the_window():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, window_ms=5000, max_batch=3)
+    start = time.monotonic()
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [f.result(2) for f in futures] == [0, 10, 20]
+    assert time.monotonic() - start < 1
+    assert batcher.get_status()["full_batches"] == 1
+
+
+def test_leftovers_go_in_the_next_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, window_ms=30, max_batch=2)
+    futures = [batcher.submit(i) for i in range(5)]
+    assert [f.result(2) for f in futures] == [0, 10, 20, 30, 40]
+    assert sorted(len(b) for b in recorder.batches) == [1, 2, 2]
+    assert batcher.get_status()["largest_batch"] == 2
+
+
+def test_lone_item_waits_at_most_about_one_window():
+    batcher = MicroBatcher(Recorder(), window_ms=20, max_batch=16)
+    start = time.monotonic()
+    assert batcher.submit(1).result(2) == 10
+    assert time.monotonic() - start < 0.5
+
+
+def test_batch_error_fails_every_item():
+    batcher = MicroBatcher(Recorder(fail=True), window_ms=20, max_batch=16)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(2)
+
+
+def test_wrong_result_count_fails_the_batch():
+    batcher = MicroBatcher(Recorder(short=True), window_ms=20, max_batch=16)
+    futures = [batcher.submit(i) for i in range(2)]
+    with pytest.raises(ValueError):
+        futures[0].result(2)
+
+
+def test_submitters_on_many_threads_get_their_own_results():
+    batcher = MicroBatcher(Recorder(), window_ms=20, max_batch=8)
+    results = {}
+
+    def submit(i):
+        results[i] = batcher.submit(i).result(2)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: i * 10 for i in range(20)}
+    assert batcher.get_status()["items"] == 20
@@ -0,0 +1,68 @@
+import csv
+import json
+
+import pytest
+
+from src.utils.pattern_profiler import (
+    WORST_INPUT_CHARS,
+    PatternProfiler,
+    adversarial_inputs,
+    check_superlinear,
+    growth_exponent,
+)
+
+PATTERNS = [(r"\bngu\b", "Insult"), (r"\b(cháu|bé)\b.*?ngoan", "Grooming")]
+
+
+def test_profiler_report_orders_by_cost():
+    profiler = PatternProfiler(PATTERNS)
+    profiler.record(0, 0.001, True, "ngu")
+    profiler.record(0, 0.001, False, "hay")
+    profiler.record(1, 0.010, False, "x" * 1000)
+    rows = profiler.report()
+    assert [row["index"] for row in rows] == [1, 0]
+    cheap = rows[1]
+    assert cheap["evals"] == 2 and cheap["hits"] == 1 and cheap["hit_rate"] == 0.5
+    assert cheap["mean_us"] == pytest.approx(1000.0)
+    assert len(rows[0]["worst_input"]) == WORST_INPUT_CHARS
+
+
+def test_profiler_reset():
+    profiler = PatternProfiler(PATTERNS)
+    profiler.record(0, 0.5, True, "ngu")
+    profiler.reset()
+    assert all(row["evals"] == 0 for row in profiler.report())
+
+
+@pytest.mark.parametrize("name", ["report.json", "report.csv"])
+def test_profiler_export(tmp_path, name):
+    profiler = PatternProfiler(PATTERNS)
+    profiler.record(1, 0.002, False, "bé")
+    path = tmp_path / name
+    profiler.export(str(path))
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f)) if name.endswith(".csv") else json.load(f)
+    assert rows[0]["label"] == "Grooming"
+    assert len(rows) == 2
+
+
+def test_adversarial_inputs_use_leading_words():
+    inputs = adversarial_inputs(PATTERNS[1][0], 20)
+    assert inputs["repeat:cháu"].startswith("cháu cháu")
+    assert all(len(text) == 20 for text in inputs.values())
+
+
+def test_growth_exponent():
+    lengths = [1, 2, 4, 8]
+    assert growth_exponent(lengths, [n * 1e-3 for n in lengths]) == pytest.approx(1)
+    assert growth_exponent(lengths, [n * n * 1e-3 for n in lengths]) == pytest.approx(2)
+
+
+def test_check_superlinear_flags_quadratic_patterns():
+    rows = check_superlinear(
+        [(r"\bngu\b", "linear"), (r"a.*x", "quadratic")],
+        lengths=[500, 1000, 2000],
+        repeat=1,
+    )
+    flagged = {row["label"] for row in rows if row["superlinear"]}
+    assert flagged == {"quadratic"}
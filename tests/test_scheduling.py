@@ -0,0 +1,158 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.deadlines import DeadlineExceeded
+from src.utils.scheduling import (
+    BULK,
+    INTERACTIVE,
+    LatencyStats,
+    SlotScheduler,
+    WeightedFairQueue,
+    parse_priority,
+)
+
+WEIGHTS = {INTERACTIVE: 4, BULK: 1}
+
+
+def test_parse_priority_defaults_to_interactive():
+    assert parse_priority(" BULK ") == BULK
+    assert parse_priority("urgent") == INTERACTIVE
+    assert parse_priority(None) == INTERACTIVE
+
+
+def test_wfq_serves_classes_by_weight():
+    queue = WeightedFairQueue(WEIGHTS)
+    for i in range(20):
+        queue.push(INTERACTIVE, i)
+        queue.push(BULK, i)
+    served = [queue.pop()[0] for _ in range(10)]
+    assert served.count(INTERACTIVE) == 8
+    assert served.count(BULK) == 2
+
+
+def test_wfq_is_fifo_within_a_class():
+    queue = WeightedFairQueue(WEIGHTS)
+    for item in "abc":
+        queue.push(BULK, item)
+    assert [queue.pop()[1] for _ in range(3)] == list("abc")
+    assert queue.pop() is None
+
+
+def test_wfq_idle_class_banks_no_credit():
+    queue = WeightedFairQueue(WEIGHTS)
+    for i in range(40):
+        queue.push(INTERACTIVE, i)
+    for _ in range(40):
+        queue.pop()
+    # Bulk was idle all along; it gets its share, not a burst
+    for i in range(10):
+        queue.push(INTERACTIVE, i)
+        queue.push(BULK, i)
+    served = [queue.pop()[0] for _ in range(5)]
+    assert served.count(BULK) <= 2
+
+
+def test_wfq_remove_and_depth():
+    queue = WeightedFairQueue(WEIGHTS)
+    queue.push(BULK, "a")
+    queue.push(INTERACTIVE, "b")
+    assert queue.depth() == 2 and queue.depth(BULK) == 1
+    assert queue.remove(BULK, "a")
+    assert not queue.remove(BULK, "a")
+    assert queue.pop() == (INTERACTIVE, "b")
+
+
+def test_latency_stats_summary():
+    stats = LatencyStats(window=4)
+    assert stats.summary()["p50_ms"] == 0.0
+    for seconds in (0.001, 0.002, 0.003, 0.004, 0.005):
+        stats.record(seconds)
+    summary = stats.summary()
+    assert summary["count"] == 5
+    assert summary["max_ms"] == 5.0  # oldest sample rolled out
+    assert summary["p50_ms"] == 4.0
+
+
+def test_slot_limits_concurrency():
+    slots = SlotScheduler(2, WEIGHTS)
+    peak = []
+    lock = threading.Lock()
+    active = [0]
+
+    def work():
+        with slots.slot(BULK):
+            with lock:
+                active[0] += 1
+                peak.append(active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    status = slots.get_status()
+    assert status["in_use"] == 0
+    assert status["queue_latency"][BULK]["count"] == 8
+
+
+def test_slot_wait_gives_up_at_timeout():
+    slots = SlotScheduler(1, WEIGHTS)
+    with slots.slot(INTERACTIVE):
+        start = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            with slots.slot(BULK, timeout=0.05):
+                pass
+        assert time.perf_counter() - start < 1
+        # The waiter left the queue, so releasing frees the slot
+        assert slots.get_status()["queue_depth"] == {INTERACTIVE: 0, BULK: 0}
+    assert slots.get_status()["in_use"] == 0
+
+
+def test_spent_timeout_fails_without_blocking():
+    slots = SlotScheduler(1, WEIGHTS)
+    with slots.slot(INTERACTIVE):
+        with pytest.raises(DeadlineExceeded):
+            with slots.slot(INTERACTIVE, timeout=-1):
+                pass
+
+
+def test_free_slot_ignores_timeout():
+    slots = SlotScheduler(1, WEIGHTS)
+    with slots.slot(INTERACTIVE, timeout=0):
+        assert slots.get_status()["in_use"] == 1
+
+
+def test_waiter_gets_a_released_slot_before_timeout():
+    slots = SlotScheduler(1, WEIGHTS)
+    got = threading.Event()
+    holding = slots.slot(INTERACTIVE)
+    holding.__enter__()
+
+    def waiter():
+        with slots.slot(BULK, timeout=2):
+            got.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    holding.__exit__(None, None, None)
+    thread.join(2)
+    assert got.is_set()
+    assert slots.get_status()["in_use"] == 0
+
+
+def test_slot_now_never_queues():
+    slots = SlotScheduler(1, WEIGHTS)
+    with slots.slot_now(BULK) as held:
+        assert held
+        assert slots.get_status()["in_use"] == 1
+        with slots.slot_now(INTERACTIVE) as second:
+            assert not second
+        assert slots.get_status()["queue_depth"] == {INTERACTIVE: 0, BULK: 0}
+    assert slots.get_status()["in_use"] == 0
@@ -0,0 +1,43 @@
+import json
+
+from src.utils.serialization import dumps, parse_accept, prefers_media_type
+
+COMPACT = "application/vnd.vncontentguard.compact+json"
+
+
+def test_dumps_is_utf8_json():
+    body = dumps({"text": "bài viết hay", "n": 1})
+    assert json.loads(body.decode("utf-8")) == {"text": "bài viết hay", "n": 1}
+
+
+def test_parse_accept_reads_q_values():
+    ranges = parse_accept("application/json;q=0.5, text/*; q=0, */*")
+    assert ranges == {"application/json": 0.5, "text/*": 0.0, "*/*": 1.0}
+
+
+def test_parse_accept_treats_bad_q_as_refusal():
+    assert parse_accept("application/json;q=abc") == {"application/json": 0.0}
+    assert parse_accept("") == {}
+    assert parse_accept(None) == {}
+
+
+def test_compact_selected_when_listed():
+    assert prefers_media_type(COMPACT, COMPACT)
+    assert prefers_media_type(f"{COMPACT}, application/json;q=0.9", COMPACT)
+    assert prefers_media_type(f"application/json, {COMPACT}", COMPACT)
+
+
+def test_compact_refused_with_q_zero():
+    assert not prefers_media_type(f"{COMPACT};q=0", COMPACT)
+    assert not prefers_media_type(f"{COMPACT}; q=0.0, application/json", COMPACT)
+
+
+def test_compact_loses_to_higher_ranked_json():
+    assert not prefers_media_type(f"{COMPACT};q=0.5, application/json", COMPACT)
+    assert not prefers_media_type(f"{COMPACT};q=0.5, */*", COMPACT)
+
+
+def test_wildcards_never_select_compact():
+    assert not prefers_media_type("*/*", COMPACT)
+    assert not prefers_media_type("application/*", COMPACT)
+    assert not prefers_media_type(None, COMPACT)
@@ -0,0 +1,152 @@
+import pytest
+
+from src.models.toxicity import UNVERIFIED_CATEGORY, ToxicityAnalyzer, harden_pattern
+from src.utils.trivial_filter import TrivialFilter
+
+CLEAN = ["bài viết rất hay", "mọi người nghĩ sao về chuyện này"]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    analyzer = ToxicityAnalyzer()
+    analyzer.batcher = None
+    analyzer.trivial_filter = None
+    analyzer.verdict_store = None
+    analyzer.verdict_log = None
+    return analyzer
+
+
+@pytest.fixture
+def answers(engine, monkeypatch):
+    """Replace the Gemini call with a canned (outcome, verdict)"""
+    state = {"answer": ("ok", None), "calls": 0}
+
+    def ask(comment, index, priority):
+        state["calls"] += 1
+        return state["answer"]
+
+    monkeypatch.setattr(engine, "_ask_gemini", ask)
+    monkeypatch.setattr(engine, "client", object())
+    return state
+
+
+def test_settled_escalations_are_complete(engine, answers):
+    results, toxic = engine.analyze_comments(CLEAN)
+    assert answers["calls"] == 2
+    assert toxic == 0
+    assert not any(r.get("Incomplete") for r in results)
+
+
+@pytest.mark.parametrize(
+    "outcome", ["error", "quota", "deadline", "circuit_open", "parse_error"]
+)
+def test_failed_escalations_are_incomplete(engine, answers, outcome):
+    answers["answer"] = (outcome, None)
+    results, _ = engine.analyze_comments(CLEAN)
+    assert [r.get("Incomplete") for r in results] == [True, True]
+    assert [r["Category"] for r in results] == ["Clean", "Clean"]
+
+
+def test_safety_block_settles_as_toxic(engine, answers):
+    answers["answer"] = ("safety_block", (True, 1.0, "BLOCKED: Safety Violation"))
+    results, toxic = engine.analyze_comments(CLEAN[:1])
+    assert toxic == 1
+    assert not results[0].get("Incomplete")
+
+
+def test_keyword_hits_never_escalate(engine, answers):
+    results, toxic = engine.analyze_comments(["đồ ngu"])
+    assert toxic == 1
+    assert answers["calls"] == 0
+    assert not results[0].get("Incomplete")
+
+
+def test_missing_client_falls_back_incomplete(engine, answers, monkeypatch):
+    monkeypatch.setattr(engine, "client", None)
+    results, _ = engine.analyze_comments(CLEAN)
+    assert answers["calls"] == 0
+    assert all(r.get("Incomplete") for r in results)
+
+
+def test_regex_only_runs_are_not_incomplete(engine, answers):
+    results, _ = engine.analyze_comments(CLEAN, use_ai=False)
+    assert answers["calls"] == 0
+    assert not any(r.get("Incomplete") for r in results)
+
+
+def test_harden_pattern_bounds_unbounded_gaps():
+    assert harden_pattern(r"a.*b", 80) == r"a.{0,80}b"
+    assert harden_pattern(r"a.+?b", 80) == r"a.{1,80}?b"
+    assert harden_pattern(r"a\.*b", 80) == r"a\.*b"
+
+
+def test_windows_overlap_so_matches_on_a_cut_survive(engine, monkeypatch):
+    monkeypatch.setattr(engine, "window_chars", 50)
+    monkeypatch.setattr(engine, "window_overlap", 20)
+    text = " ".join(["từ"] * 40)
+    windows = engine._windows(text)
+    assert len(windows) > 1
+    assert all(len(w) <= 50 for w in windows)
+    for left, right in zip(windows, windows[1:]):
+        assert left[-10:] in right
+    assert engine._windows("ngắn") == ("ngắn",)
+
+
+@pytest.fixture
+def no_budget(engine, monkeypatch):
+    monkeypatch.setattr(engine, "comment_budget", -1.0)
+
+
+def test_truncated_scan_is_escalated(engine, answers, no_budget, monkeypatch):
+    logged = []
+
+    class Log:
+        def append(self, comment, is_toxic, category, confidence):
+            logged.append(category)
+
+    monkeypatch.setattr(engine, "verdict_log", Log())
+    answers["answer"] = ("ok", None)
+    results, _ = engine.analyze_comments(CLEAN[:1])
+    assert answers["calls"] == 1
+    assert results[0]["Category"] == "Clean"
+    assert not results[0].get("Incomplete")
+    assert logged == ["Clean"]
+
+
+def test_truncated_scan_is_never_reported_clean(engine, answers, no_budget):
+    answers["answer"] = ("error", None)
+    results, _ = engine.analyze_comments(CLEAN[:1])
+    assert results[0]["Category"] == UNVERIFIED_CATEGORY
+    assert results[0]["Incomplete"]
+
+    results, _ = engine.analyze_comments(CLEAN[:1], use_ai=False)
+    assert results[0]["Category"] == UNVERIFIED_CATEGORY
+    assert results[0]["Incomplete"]
+
+
+def test_truncated_scan_skips_the_prefilter(engine, answers, no_budget, monkeypatch):
+    monkeypatch.setattr(engine, "trivial_filter", TrivialFilter())
+    results, _ = engine.analyze_comments(["ok"])
+    assert answers["calls"] == 1
+
+
+def test_regex_only_analyzer_matches_full_regex_verdicts(engine):
+    comments = ["đồ ngu", "", "bài viết hay", "l.ồ.n", "fuck you"]
+    light = ToxicityAnalyzer.regex_only()
+    assert light.client is None
+    expected, _ = engine.analyze_comments(comments, use_ai=False)
+    results, toxic = light.analyze_comments(comments, use_ai=False)
+    assert results == expected
+    assert toxic == 3
+
+
+def test_single_worker_runs_the_regex_layer_serially(monkeypatch):
+    monkeypatch.setenv("TOXICITY_PARALLEL_WORKERS", "1")
+    analyzer = ToxicityAnalyzer()
+    assert analyzer.parallel_min_comments == 0
+    monkeypatch.setattr(
+        analyzer, "_parallel_regex_scan", lambda comments: pytest.fail("pool used")
+    )
+    analyzer.warm_parallel_pool()
+    results, _ = analyzer.analyze_comments(CLEAN * 1500, use_ai=False)
+    assert len(results) == 3000
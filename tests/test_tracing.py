@@ -0,0 +1,60 @@
+import re
+
+from src.utils.tracing import (
+    add_timing,
+    current_trace,
+    stage,
+    start_trace,
+    trace_event,
+)
+
+
+def test_helpers_are_noops_without_a_trace():
+    assert current_trace() is None
+    with stage("toxicity"):
+        add_timing("regex", 0.5)
+        trace_event("ignored")
+    assert current_trace() is None
+
+
+def test_timings_accumulate_by_name():
+    with start_trace() as trace:
+        add_timing("regex", 0.25)
+        add_timing("regex", 0.5)
+        with stage("toxicity"):
+            pass
+    assert trace.timings["regex"] == 0.75
+    assert "toxicity" in trace.timings
+    assert current_trace() is None
+
+
+def test_server_timing_header_syntax():
+    with start_trace() as trace:
+        add_timing("gemini_call", 0.0123)
+    header = trace.server_timing_header()
+    assert header.startswith("gemini_call;dur=12.3, total;dur=")
+    assert all(re.fullmatch(r"\w+;dur=\d+\.\d", part) for part in header.split(", "))
+
+
+def test_debug_trace_nests_stages_and_events():
+    with start_trace(debug=True) as trace:
+        trace_event("start", where="root")
+        with stage("toxicity"):
+            with stage("gemini"):
+                trace_event("gemini_attempt", outcome="ok")
+    tree = trace.to_dict()
+    assert [e["event"] for e in tree["events"]] == ["start"]
+    toxicity = tree["stages"][0]
+    assert toxicity["name"] == "toxicity"
+    assert "dur_ms" in toxicity
+    gemini = toxicity["stages"][0]
+    assert gemini["events"][0]["outcome"] == "ok"
+
+
+def test_events_dropped_unless_debug():
+    with start_trace(debug=False) as trace:
+        with stage("toxicity"):
+            trace_event("gemini_attempt")
+    tree = trace.to_dict()
+    assert tree["events"] == []
+    assert tree["stages"] == []
@@ -0,0 +1,56 @@
+import pytest
+
+from src.utils.trivial_filter import CLEAN, NO_SIGNAL, TrivialFilter
+
+
+@pytest.fixture
+def prefilter():
+    return TrivialFilter()
+
+
+@pytest.mark.parametrize(
+    "text, reason",
+    [
+        ("😂😂😂", "no_text"),
+        ("+1", "no_text"),
+        ("https://example.vn/bai-viet/123", "url"),
+        ("[sticker]", "sticker"),
+        ("(GIF) 👍", "sticker"),
+        ("@lan.nguyen", "mention"),
+        ("@Trang", "mention"),
+    ],
+)
+def test_no_signal(prefilter, text, reason):
+    assert prefilter.classify(text) == (NO_SIGNAL, reason)
+
+
+@pytest.mark.parametrize(
+    "text", ["ok", "hay quá", "hahaha", "kkkkk", "hóng", "@Lan cảm ơn bạn nha"]
+)
+def test_stock_words_are_clean(prefilter, text):
+    assert prefilter.classify(text) == (CLEAN, "stock_words")
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "@Lan Đồ Ngu",
+        "@Lan Mặt Lợn",
+        "@Nguyễn Minh Anh",
+        "mày biết gì mà nói",
+        "hay quá nhưng mà sai rồi",
+        "ok ok ok ok ok",
+    ],
+)
+def test_anything_else_needs_a_verdict(prefilter, text):
+    assert prefilter.classify(text) is None
+
+
+def test_status_counts_checks_and_saves(prefilter):
+    prefilter.classify("ok")
+    prefilter.classify("mày biết gì")
+    prefilter.record("stock_words")
+    status = prefilter.get_status()
+    assert status["checked"] == 2
+    assert status["saved_escalations"] == 1
+    assert status["by_reason"] == {"stock_words": 1}
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from src.utils.verdict_store import (
+    CATEGORY_BYTES,
+    RECORD_SIZE,
+    MmapVerdictStore,
+    VerdictLog,
+    comment_key,
+    compact,
+    pack_record,
+    unpack_record,
+)
+
+
+def write_log(path, verdicts):
+    log = VerdictLog(str(path))
+    for text, is_toxic, category, confidence in verdicts:
+        log.append(text, is_toxic, category, confidence)
+    log.close()
+    return str(path)
+
+
+def test_record_round_trip_and_category_cap():
+    record = pack_record(42, True, "Insult (AI Detected)", 0.9, updated=1700000000)
+    assert len(record) == RECORD_SIZE == 64
+    assert unpack_record(record) == {
+        "is_toxic": True,
+        "category": "Insult (AI Detected)",
+        "confidence": 0.9,
+        "updated": 1700000000,
+    }
+    long_category = unpack_record(pack_record(1, False, "ồ" * 40, 0.0))["category"]
+    assert len(long_category.encode("utf-8")) <= CATEGORY_BYTES
+
+
+def test_comment_key_is_never_the_empty_slot():
+    assert comment_key("") != 0
+    assert comment_key("a") == comment_key("a") != comment_key("b")
+
+
+def test_compact_logs_into_a_readable_table(tmp_path):
+    log = write_log(
+        tmp_path / "a.log",
+        [("đồ ngu", True, "Insult", 0.9), ("bài hay", False, "Clean", 0.1)],
+    )
+    table = str(tmp_path / "v.vdb")
+    stats = compact(table, [log])
+    assert stats["records"] == 2
+    store = MmapVerdictStore(table)
+    assert len(store) == 2
+    assert store.get("đồ ngu")["category"] == "Insult"
+    assert store.get("bài hay")["is_toxic"] is False
+    assert store.get("chưa thấy") is None
+    assert store.get_status()["hits"] == 2
+
+
+def test_later_records_win_and_base_is_kept(tmp_path):
+    table = str(tmp_path / "v.vdb")
+    compact(table, [write_log(tmp_path / "a.log", [("x", False, "Clean", 0.1)])])
+    newer = write_log(
+        tmp_path / "b.log", [("x", True, "Scam", 0.8), ("y", True, "Insult", 0.7)]
+    )
+    stats = compact(table, [newer], base_path=table)
+    assert stats["records"] == 2
+    store = MmapVerdictStore(table)
+    assert store.get("x")["category"] == "Scam"
+    assert store.get("y")["category"] == "Insult"
+
+
+def test_many_records_stay_findable(tmp_path):
+    texts = [f"bình luận {i}" for i in range(500)]
+    log = write_log(tmp_path / "a.log", [(t, False, "Clean", 0.0) for t in texts])
+    table = str(tmp_path / "v.vdb")
+    stats = compact(table, [log], load_factor=0.9)
+    assert stats["capacity"] >= 500
+    store = MmapVerdictStore(table)
+    assert all(store.get(t) is not None for t in texts)
+
+
+def test_torn_log_tail_is_dropped(tmp_path):
+    log = write_log(tmp_path / "a.log", [("x", True, "Insult", 0.9)])
+    with open(log, "ab") as f:
+        f.write(b"\x01" * (RECORD_SIZE // 2))
+    table = str(tmp_path / "v.vdb")
+    assert compact(table, [log])["records"] == 1
+
+
+def test_store_remaps_after_compaction(tmp_path):
+    table = str(tmp_path / "v.vdb")
+    compact(table, [write_log(tmp_path / "a.log", [("x", False, "Clean", 0.0)])])
+    store = MmapVerdictStore(table, check_interval=0)
+    before = store.version
+    compact(table, [write_log(tmp_path / "b.log", [("y", True, "Insult", 0.9)])])
+    assert store.get("y") is not None
+    assert store.version != before
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "junk.vdb"
+    path.write_bytes(os.urandom(RECORD_SIZE * 4))
+    with pytest.raises(ValueError):
+        MmapVerdictStore(str(path))